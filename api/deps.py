@@ -5,6 +5,7 @@ import jwt
 from jwt import PyJWTError
 from pydantic import ValidationError
 
+from core.cache import user_cache
 from core.config import settings
 from core.security import ALGORITHM
 from models.user import User
@@ -13,6 +14,10 @@ from schemas.token import TokenData
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> User:
+    return await user_from_token(token)
+
+async def user_from_token(token: str) -> User:
+    # Also used by the WebSocket endpoints, which can't use oauth2_scheme
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -27,7 +32,20 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> Use
     except (PyJWTError, ValidationError):
         raise credentials_exception
     
+    user = user_cache.get(token_data.email)
+    if user is not None:
+        return user
+
     user = await User.find_one(User.email == token_data.email)
     if user is None:
         raise credentials_exception
+    user_cache.set(token_data.email, user)
     return user
+
+async def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+    if current_user.email not in settings.ADMIN_EMAILS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You don't have permission to access this resource",
+        )
+    return current_user
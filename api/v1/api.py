@@ -1,6 +1,7 @@
 from fastapi import APIRouter
-from api.v1.endpoints import auth, tasks
+from api.v1.endpoints import admin, auth, tasks
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(tasks.router, prefix="/tasks", tags=["tasks"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
@@ -0,0 +1,74 @@
+from fastapi import APIRouter, Depends
+
+from api.deps import get_current_admin
+from core import task_stats
+from core.cache import user_cache
+from core.coalesce import task_reads
+from core.idempotency import idempotency_store
+from core.rate_limit import auth_rate_limits
+from core.reminders import reminder_scheduler
+from core.startup import startup_timings
+from core.task_events import task_change_feed
+from db.mongodb import mongo_client_options
+from db.monitoring import pool_monitor, slow_query_monitor
+
+router = APIRouter(dependencies=[Depends(get_current_admin)])
+
+@router.get("/cache")
+async def cache_stats():
+    return {
+        "user_cache": user_cache.stats(),
+        "auth_rate_limits": auth_rate_limits.stats()
+    }
+
+@router.get("/task-stream")
+async def task_stream_stats():
+    return task_change_feed.stats()
+
+@router.get("/task-reads")
+async def task_read_stats():
+    return task_reads.stats()
+
+@router.get("/idempotency")
+async def idempotency_stats():
+    return idempotency_store.stats()
+
+@router.get("/reminders")
+async def reminder_stats():
+    return reminder_scheduler.stats()
+
+@router.get("/startup")
+async def startup_breakdown():
+    return startup_timings.report()
+
+@router.get("/slow-queries")
+async def slow_queries(limit: int = 50):
+    return {
+        "threshold_ms": slow_query_monitor.threshold_ms,
+        "entries": slow_query_monitor.recent(limit)
+    }
+
+@router.delete("/slow-queries")
+async def clear_slow_queries():
+    slow_query_monitor.clear()
+    return {
+        "message": "Slow query log cleared"
+    }
+
+@router.get("/db-pool")
+async def db_pool_stats():
+    return {
+        "options": mongo_client_options(),
+        "pools": pool_monitor.snapshot()
+    }
+
+@router.delete("/db-pool")
+async def reset_db_pool_stats():
+    pool_monitor.reset()
+    return {
+        "message": "Connection pool counters reset"
+    }
+
+@router.post("/stats/reconcile")
+async def reconcile_task_stats():
+    return await task_stats.reconcile()
@@ -1,46 +1,118 @@
 from datetime import timedelta
-from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Annotated, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import datetime, timezone
 import jwt
 
-from core.security import create_access_token, create_refresh_token, get_password_hash, verify_password
+from core.security import (
+    HashingPoolBusy,
+    create_access_token,
+    create_refresh_token,
+    get_password_hash_async,
+    password_needs_rehash,
+    verify_password_async,
+)
 from models.user import User
 from schemas.user import UserCreate, UserOut
 from schemas.token import Token, RefreshToken
 from core.config import settings
+from core.cache import user_cache
+from core.idempotency import fingerprint, idempotent_json
+from core.rate_limit import RateLimited, auth_rate_limits, retry_after_header
 from core.security import ALGORITHM
 
 router = APIRouter()
 
-@router.post("/signup", response_model=UserOut)
-async def signup(user_in: UserCreate):
-    user = await User.find_one(User.email == user_in.email)
-    if user:
+hashing_busy_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="We're handling a lot of sign-ins right now. Please try again in a moment.",
+    headers={"Retry-After": "1"},
+)
+
+def _client_ip(request: Request) -> str:
+    peer = request.client.host if request.client else "unknown"
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        # Each proxy appends the address it received the request from, so
+        # only the last RATE_LIMIT_TRUSTED_PROXY_HOPS entries come from our
+        # proxies; anything to their left is whatever the client sent.
+        hops = max(settings.RATE_LIMIT_TRUSTED_PROXY_HOPS, 1)
+        forwarded = [entry.strip() for entry in request.headers.get("x-forwarded-for", "").split(",") if entry.strip()]
+        if len(forwarded) >= hops:
+            return forwarded[-hops]
+    return peer
+
+def _enforce_rate_limit(route: str, request: Request, account: str):
+    # Runs first thing, so rejected requests never reach MongoDB or bcrypt
+    try:
+        auth_rate_limits.check(route, _client_ip(request), account)
+    except RateLimited as exc:
         raise HTTPException(
-            status_code=400,
-            detail="This Email is already registered"
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many attempts. Please wait a moment and try again.",
+            headers={"Retry-After": retry_after_header(exc.retry_after)},
         )
-    
-    hashed_password = get_password_hash(user_in.password)
-    user = User(
-        email=user_in.email,
-        hashed_password=hashed_password,
-        full_name=user_in.full_name
-    )
-    await user.insert()
-    return user
+
+@router.post("/signup", response_model=UserOut)
+async def signup(
+    user_in: UserCreate,
+    request: Request,
+    idempotency_key: Optional[str] = Header(
+        None, alias="Idempotency-Key", description="Retries with the same key get the first response back."
+    ),
+):
+    _enforce_rate_limit("signup", request, user_in.email)
+
+    async def create_account():
+        user = await User.find_one(User.email == user_in.email)
+        if user:
+            raise HTTPException(
+                status_code=400,
+                detail="This Email is already registered"
+            )
+
+        try:
+            hashed_password = await get_password_hash_async(user_in.password)
+        except HashingPoolBusy:
+            raise hashing_busy_exception
+        user = User(
+            email=user_in.email,
+            hashed_password=hashed_password,
+            full_name=user_in.full_name
+        )
+        await user.insert()
+        # Drop anything cached under this address (e.g. from a re-created account)
+        user_cache.invalidate(user.email)
+        return status.HTTP_200_OK, UserOut.model_validate(user).model_dump(mode="json")
+
+    # No account yet to scope keys by: use the address being registered, so
+    # unrelated clients that happen to pick the same key don't collide
+    scope = f"signup:{fingerprint(user_in.email.lower())}"
+    return await idempotent_json(scope, idempotency_key, user_in.model_dump(mode="json"), create_account)
 
 @router.post("/login", response_model=Token)
-async def login(form_data: Annotated[OAuth2PasswordRequestForm, Depends()]):
+async def login(form_data: Annotated[OAuth2PasswordRequestForm, Depends()], request: Request):
+    _enforce_rate_limit("login", request, form_data.username)
     user = await User.find_one(User.email == form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    try:
+        is_valid = user is not None and await verify_password_async(form_data.password, user.hashed_password)
+    except HashingPoolBusy:
+        raise hashing_busy_exception
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    if password_needs_rehash(user.hashed_password):
+        # BCRYPT_ROUNDS changed since this hash was stored: upgrade it now that
+        # we have the plain password. Skipped under load, retried next login.
+        try:
+            new_hash = await get_password_hash_async(form_data.password)
+            await user.set({User.hashed_password: new_hash})
+        except HashingPoolBusy:
+            pass
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -1,89 +1,901 @@
-from typing import List, Annotated
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import csv
+import io
+from datetime import datetime, timezone
+from typing import List, Annotated, Literal, Optional, Union
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import Response, StreamingResponse
 from beanie import PydanticObjectId
+from beanie.odm.utils.dump import get_dict
+from bson.errors import InvalidId
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateOne
+from pydantic import TypeAdapter, ValidationError
+from pymongo.errors import BulkWriteError
 
-from models.task import Task
+from models.task import Task, owner_filter
 from models.user import User
-from schemas.task import TaskCreate, TaskUpdate, TaskOut
-from api.deps import get_current_user
-from core.utils import enhance_task_context
+from schemas.task import (
+    BulkItemResult,
+    BulkResult,
+    ImportRowError,
+    ImportSummary,
+    TaskBulkCreate,
+    TaskBulkDelete,
+    TaskBulkUpdate,
+    TaskCreate,
+    TaskImport,
+    TASK_OUT_PROJECTION,
+    TaskOut,
+    TaskPage,
+    TaskPatch,
+    TaskSearchHit,
+    TaskStatsOut,
+    TaskUpdate,
+    UTCDateTime,
+)
+from api.deps import get_current_user, user_from_token
+from core.coalesce import task_reads
+from core.config import settings
+from core.etag import bump_task_version, get_task_version, if_none_match, make_etag, matching_version, with_coding
+from core.formats import MSGPACK_MEDIA_TYPE, packb, wants_msgpack
+from core.idempotency import idempotent_json
+from core import task_stats
+from core.pagination import decode_cursor, encode_cursor
+from core.reminders import reminder_scheduler
+from core.search import search_indexes
+from core.task_events import Subscription, sse_frame, task_change_feed, ws_message
+from core.task_import import RowTooLarge, iter_import_rows
+from core.utils import enhance_many, enhance_task_context
 
 router = APIRouter()
 
-@router.post("/", response_model=TaskOut)
-async def create_task(
-    task_in: TaskCreate,
-    current_user: User = Depends(get_current_user)
-):
-    # Smart Logic: Infer priority and tags if not provided or to enhance
-    inferred_priority, inferred_tags = enhance_task_context(task_in.title, task_in.description or "", task_in.tags)
-    
+def _owner_query(owner: User, allow_legacy: bool = True) -> dict:
+    # Raw filter for queries that go straight to the Motor collection
+    return owner_filter(owner.id, allow_legacy)
+
+def _task_query(
+    owner: User,
+    priority: Optional[str],
+    is_completed: Optional[bool],
+    overdue: Optional[bool] = None,
+    due_before: Optional[datetime] = None,
+) -> dict:
+    query = _owner_query(owner)
+    if priority:
+        query["priority"] = priority
+    if is_completed is not None:
+        query["is_completed"] = is_completed
+    # Both are due_at ranges on the owner_id_due index
+    due_at = {}
+    if due_before is not None:
+        due_at["$lt"] = due_before
+    if overdue:
+        now = datetime.now(timezone.utc)
+        due_at["$lt"] = min(due_at.get("$lt", now), now)
+        query.setdefault("is_completed", False)
+    elif overdue is False:
+        query.setdefault("$and", []).append({"$nor": [{"due_at": {"$lt": datetime.now(timezone.utc)}, "is_completed": False}]})
+    if due_at:
+        query["due_at"] = due_at
+    return query
+
+task_list_adapter = TypeAdapter(List[TaskOut])
+
+# Clients may keep a copy but must revalidate it (ETag) before reuse
+CACHE_CONTROL = "private, no-cache"
+
+task_page_adapter = TypeAdapter(TaskPage)
+
+def _wire_format(request: Request) -> str:
+    # JSON by default; MessagePack when the Accept header prefers it
+    return "msgpack" if wants_msgpack(request.headers.get("accept")) else "json"
+
+def _serialize(wire_format: str, adapter: TypeAdapter, value) -> bytes:
+    if wire_format == "msgpack":
+        return packb(adapter.dump_python(value, mode="json"))
+    return adapter.dump_json(value)
+
+def _content_coding(request: Request) -> str:
+    # The coding GZipMiddleware negotiates (the same test it applies). A gzip
+    # body is its own representation, so it gets its own ETag.
+    if settings.GZIP_MINIMUM_SIZE > 0 and "gzip" in request.headers.get("accept-encoding", ""):
+        return "gzip"
+    return "identity"
+
+def _vary(coding: str, body: Optional[bytes], *fields: str) -> str:
+    # GZipMiddleware adds Accept-Encoding itself to the bodies it compresses
+    if coding == "identity" or body is None or len(body) < settings.GZIP_MINIMUM_SIZE:
+        fields += ("Accept-Encoding",)
+    return ", ".join(fields)
+
+def _body_response(wire_format: str, body: bytes, etag: Optional[str] = None, coding: str = "identity") -> Response:
+    media_type = MSGPACK_MEDIA_TYPE if wire_format == "msgpack" else "application/json"
+    headers = {"Vary": _vary(coding, body, "Accept")}
+    if etag:
+        headers.update({"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    return Response(content=body, media_type=media_type, headers=headers)
+
+def _list_response(request: Request, adapter: TypeAdapter, value, etag: Optional[str] = None) -> Response:
+    wire_format = _wire_format(request)
+    return _body_response(wire_format, _serialize(wire_format, adapter, value), etag, _content_coding(request))
+
+def _not_modified(etag: str, *vary: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": _vary("identity", None, *vary)}
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+# If-Match may carry the ETag of either representation
+TASK_ETAG_CODINGS = ("identity", "gzip")
+
+def _task_etag(owner: User, revision: int, task_id: str, coding: str = "identity") -> str:
+    # Per task: only a write to this task changes it
+    return with_coding(make_etag(owner.id, revision, "task", task_id), coding)
+
+def _task_response(request: Request, owner: User, revision: int, task_id: str, body: bytes) -> Response:
+    coding = _content_coding(request)
+    headers = {"ETag": _task_etag(owner, revision, task_id, coding), "Cache-Control": CACHE_CONTROL}
+    vary = _vary(coding, body)
+    if vary:
+        headers["Vary"] = vary
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _task_dict(task) -> dict:
+    # Common shape for the write hooks, whether we hold a Task or a raw document
+    return TaskOut.model_validate(task).model_dump()
+
+async def _on_tasks_changed(
+    owner: User,
+    created: List[dict] = (),
+    updated: List[tuple[dict, dict]] = (),
+    deleted: List[dict] = (),
+) -> int:
+    """
+    Called after every successful task write with the affected tasks
+    (updated as (before, after) pairs). Keeps the per-user counters in step,
+    bumps the ETag version (returned), drops cached reads and feeds the
+    search index, the reminder scheduler and the change feed.
+    """
+    await task_stats.apply_delta(owner.id, task_stats.changes_delta(created, updated, deleted))
+    version = await bump_task_version(owner.id)
+    search_indexes.apply(owner.id, version, created, updated, deleted)
+    task_reads.invalidate(owner.id)
+    reminder_scheduler.notify([*created, *(after for _, after in updated)])
+    task_change_feed.publish_changes(owner.id, created, updated, deleted, version)
+    return version
+
+def _build_task(task_in: TaskCreate, inferred: tuple[str, List[str]], owner: User) -> Task:
+    inferred_priority, inferred_tags = inferred
+
     # If user didn't specify priority, use inferred. If they did, keep theirs.
     # Same for tags: merge them.
     final_priority = task_in.priority if task_in.priority != "medium" else inferred_priority
     final_tags = list(set(task_in.tags + inferred_tags))
     
-    task = Task(
+    return Task(
         **task_in.model_dump(exclude={"priority", "tags"}),
         priority=final_priority,
         tags=final_tags,
-        owner=current_user
+        owner_id=owner.id
+    )
+
+@router.post("/", response_model=TaskOut)
+async def create_task(
+    task_in: TaskCreate,
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(
+        None, alias="Idempotency-Key", description="Retries with the same key get the first response back."
+    ),
+):
+    async def create():
+        # Smart Logic: Infer priority and tags if not provided or to enhance
+        inferred = enhance_task_context(task_in.title, task_in.description or "", task_in.tags)
+        task = _build_task(task_in, inferred, current_user)
+        await task.insert()
+        await _on_tasks_changed(current_user, created=[_task_dict(task)])
+        return status.HTTP_200_OK, TaskOut.model_validate(task).model_dump(mode="json")
+
+    return await idempotent_json(
+        f"create_task:{current_user.id}", idempotency_key, task_in.model_dump(mode="json"), create
     )
-    await task.insert()
-    return task
 
-@router.get("/", response_model=List[TaskOut])
+@router.get("/", response_model=Union[List[TaskOut], TaskPage])
 async def read_tasks(
+    request: Request,
     current_user: User = Depends(get_current_user),
-    skip: int = 0,
-    limit: int = 100,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
     priority: str = None,
-    is_completed: bool = None
+    is_completed: bool = None,
+    overdue: Optional[bool] = Query(None, description="Open tasks whose due date has passed (or, with false, all others)."),
+    due_before: Optional[UTCDateTime] = Query(None, description="Tasks due before this time."),
+    cursor: Optional[str] = Query(
+        None,
+        description="Keyset pagination: pass an empty value for the first page, then the returned next_cursor.",
+    ),
+    if_none_match_header: Optional[str] = Header(None, alias="If-None-Match"),
 ):
-    query = [Task.owner.id == current_user.id]
-    if priority:
-        query.append(Task.priority == priority)
-    if is_completed is not None:
-        query.append(Task.is_completed == is_completed)
-        
-    tasks = await Task.find(*query).skip(skip).limit(limit).to_list()
-    return tasks
+    # The version is read before the query, so a write racing with this
+    # request can only make the ETag older than the data, never newer.
+    version = await get_task_version(current_user.id)
+    # Each representation (JSON / MessagePack, gzip or not) needs its own ETag
+    wire_format = _wire_format(request)
+    coding = _content_coding(request)
+    params = sorted(f"{k}={v}" for k, v in request.query_params.multi_items())
+    etag = with_coding(make_etag(current_user.id, version, "list", wire_format, *params), coding)
+    if overdue is not None:
+        # The result changes as time passes, not only on writes
+        etag = None
+    elif if_none_match(if_none_match_header, etag):
+        return _not_modified(etag, "Accept")
+
+    # Fast path: project straight from Motor into TaskOut (no Beanie documents)
+    # and serialize once to JSON bytes, skipping FastAPI's response re-validation.
+    query = _task_query(current_user, priority, is_completed, overdue, due_before)
+    collection = Task.get_motor_collection()
+
+    if cursor is None:
+        async def load_list() -> bytes:
+            docs = await collection.find(query, projection=TASK_OUT_PROJECTION).skip(skip).limit(limit).to_list(length=None)
+            return _serialize(wire_format, task_list_adapter, task_list_adapter.validate_python(docs))
+
+        # Identical concurrent reads share one query and its bytes
+        body = await task_reads.get(current_user.id, version, ("list", wire_format, *params), load_list)
+        return _body_response(wire_format, body, etag, coding)
+
+    # Cursor mode: newest first, seeking past the last (created_at, _id) seen.
+    # Cost stays flat however deep the page is, unlike skip().
+    if cursor:
+        try:
+            last_created_at, last_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+        # Under $and: the owner filter may be an $or of its own
+        query.setdefault("$and", []).append({"$or": [
+            {"created_at": {"$lt": last_created_at}},
+            {"created_at": last_created_at, "_id": {"$lt": last_id}},
+        ]})
+
+    async def load_page() -> bytes:
+        # Fetch one extra item to know whether another page exists
+        docs = await collection.find(query, projection=TASK_OUT_PROJECTION).sort(
+            [("created_at", -1), ("_id", -1)]
+        ).limit(limit + 1).to_list(length=None)
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(docs[-1]["created_at"], docs[-1]["_id"])
+        page = TaskPage(items=task_list_adapter.validate_python(docs), next_cursor=next_cursor)
+        return _serialize(wire_format, task_page_adapter, page)
+
+    body = await task_reads.get(current_user.id, version, ("page", wire_format, *params), load_page)
+    return _body_response(wire_format, body, etag, coding)
+
+@router.get("/stats", response_model=TaskStatsOut)
+async def read_task_stats(current_user: User = Depends(get_current_user)):
+    # Served from the per-user counters document, never by counting tasks
+    return await task_stats.get_stats(current_user.id)
+
+search_hits_adapter = TypeAdapter(List[TaskSearchHit])
+
+async def _fuzzy_search(owner: User, q: str, skip: int, limit: int) -> list:
+    version = await get_task_version(owner.id)
+    index = search_indexes.get(owner.id, version)
+    if index is None:
+        # Cold (or stale) for this user: build from a projected scan once,
+        # then the write hooks keep it current
+        cursor = Task.get_motor_collection().find(_owner_query(owner), projection=TASK_OUT_PROJECTION)
+        index = search_indexes.build(owner.id, version, [_task_dict(doc) async for doc in cursor])
+
+    ranked = index.search(q, settings.SEARCH_MAX_TYPOS)[skip:skip + limit]
+    if not ranked:
+        return []
+    scores = dict(ranked)
+    docs = await Task.get_motor_collection().find(
+        {"_id": {"$in": [PydanticObjectId(task_id) for task_id in scores]}, **_owner_query(owner)},
+        projection=TASK_OUT_PROJECTION,
+    ).to_list(length=None)
+    for doc in docs:
+        doc["score"] = round(scores[str(doc["_id"])], 4)
+    return sorted(docs, key=lambda doc: -doc["score"])
+
+@router.get("/search", response_model=List[TaskSearchHit])
+async def search_tasks(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    current_user: User = Depends(get_current_user),
+    mode: Literal["text", "fuzzy"] = Query(None, description="Defaults to SEARCH_DEFAULT_MODE"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+):
+    mode = mode or settings.SEARCH_DEFAULT_MODE
+    if mode == "fuzzy":
+        docs = await _fuzzy_search(current_user, q, skip, limit)
+    else:
+        # The text index is prefixed by owner_id and needs an equality match
+        # on it, so tasks not yet migrated off the owner DBRef aren't searchable
+        docs = await Task.get_motor_collection().find(
+            {**_owner_query(current_user, allow_legacy=False), "$text": {"$search": q}},
+            projection={**TASK_OUT_PROJECTION, "score": {"$meta": "textScore"}},
+        ).sort([("score", {"$meta": "textScore"})]).skip(skip).limit(limit).to_list(length=None)
+    return _list_response(request, search_hits_adapter, search_hits_adapter.validate_python(docs))
+
+EXPORT_FIELDS = ["id", "title", "description", "is_completed", "priority", "tags", "created_at", "due_at"]
+
+async def _export_lines(cursor, export_format: str):
+    """
+    Yields one encoded line per task straight off the Motor cursor, so only
+    one batch is ever held in memory.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def csv_line(row: list) -> str:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        return buffer.getvalue()
+
+    try:
+        if export_format == "csv":
+            yield csv_line(EXPORT_FIELDS)
+        async for doc in cursor:
+            task = TaskOut.model_validate(doc)
+            if export_format == "csv":
+                yield csv_line([
+                    task.id,
+                    task.title,
+                    task.description or "",
+                    task.is_completed,
+                    task.priority,
+                    ";".join(task.tags),
+                    task.created_at.isoformat(),
+                    task.due_at.isoformat() if task.due_at else "",
+                ])
+            else:
+                yield task.model_dump_json() + "\n"
+    finally:
+        await cursor.close()
+
+@router.get("/export")
+async def export_tasks(
+    current_user: User = Depends(get_current_user),
+    format: Literal["ndjson", "csv"] = "ndjson",
+    priority: str = None,
+    is_completed: bool = None,
+    batch_size: int = Query(settings.EXPORT_BATCH_SIZE, ge=1, le=10000),
+):
+    cursor = Task.get_motor_collection().find(
+        _task_query(current_user, priority, is_completed),
+        projection=TASK_OUT_PROJECTION,
+        batch_size=batch_size,
+    ).sort([("created_at", 1), ("_id", 1)])
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_lines(cursor, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format}"'},
+    )
+
+SSE_RETRY_MS = 3000
+
+async def _sse_events(owner: User, last_event_id: Optional[str]):
+    # Subscribing here rather than in the endpoint ties the subscription's
+    # lifetime to the generator, which Starlette closes on disconnect
+    subscription = task_change_feed.subscribe(owner.id, last_event_id)
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        while True:
+            kind, event = await subscription.next()
+            yield sse_frame(kind, event)
+    finally:
+        task_change_feed.unsubscribe(subscription)
+
+def _stream_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many open change streams, please retry shortly",
+        headers={"Retry-After": "5"},
+    )
+
+@router.get("/stream")
+async def stream_task_changes(
+    current_user: User = Depends(get_current_user),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Server-Sent Events: one event per task created, updated or deleted by
+    this user. A "reset" event means changes were missed; refetch the list.
+    """
+    if task_change_feed.full():
+        raise _stream_unavailable()
+    return StreamingResponse(
+        _sse_events(current_user, last_event_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            # Keeps GZipMiddleware from buffering frames in its compressor
+            "Content-Encoding": "identity",
+        },
+    )
+
+async def _wait_for_disconnect(websocket: WebSocket, subscription: Subscription):
+    # Client messages are ignored; this only notices the connection closing
+    try:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        subscription.close()
+
+@router.websocket("/stream")
+async def stream_task_changes_ws(
+    websocket: WebSocket,
+    token: Optional[str] = None,
+    last_event_id: Optional[str] = None,
+):
+    """
+    The same feed over a WebSocket, one JSON message per event. Browsers
+    can't set headers here, so the access token may come as ?token=.
+    """
+    authorization = websocket.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    try:
+        current_user = await user_from_token(token or "")
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if task_change_feed.full():
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+
+    await websocket.accept()
+    subscription = task_change_feed.subscribe(current_user.id, last_event_id)
+    receiver = asyncio.create_task(_wait_for_disconnect(websocket, subscription))
+    try:
+        while True:
+            kind, event = await subscription.next()
+            if kind == "closed":
+                break
+            await websocket.send_text(ws_message(kind, event))
+    except (WebSocketDisconnect, RuntimeError, OSError):
+        # Closed mid-send (servers differ in what they raise)
+        pass
+    finally:
+        task_change_feed.unsubscribe(subscription)
+        receiver.cancel()
+
+async def _insert_import_chunk(chunk: List[tuple[int, TaskImport]], owner: User, summary: ImportSummary):
+    inferred = enhance_many((t.title, t.description, t.tags) for _, t in chunk)
+    documents = []
+    for (_, task_in), task_inferred in zip(chunk, inferred):
+        task = _build_task(task_in, task_inferred, owner)
+        task.id = PydanticObjectId()
+        documents.append(get_dict(task, to_db=True))
+    failed_ops = {}
+    try:
+        # Unordered: one bad document shouldn't hold back the rest of the chunk
+        await Task.get_motor_collection().bulk_write([InsertOne(doc) for doc in documents], ordered=False)
+    except BulkWriteError as exc:
+        failed_ops = {err["index"]: err.get("errmsg") for err in exc.details.get("writeErrors", [])}
+    summary.chunks += 1
+    summary.inserted += len(chunk) - len(failed_ops)
+    for op_index, message in failed_ops.items():
+        _record_import_error(summary, chunk[op_index][0], message)
+    inserted = [_task_dict(doc) for op_index, doc in enumerate(documents) if op_index not in failed_ops]
+    if inserted:
+        await _on_tasks_changed(owner, created=inserted)
+
+def _record_import_error(summary: ImportSummary, row: int, message: str):
+    summary.failed += 1
+    if len(summary.errors) < settings.IMPORT_MAX_REPORTED_ERRORS:
+        summary.errors.append(ImportRowError(row=row, message=message))
+    else:
+        summary.errors_truncated = True
+
+@router.post("/import", response_model=ImportSummary)
+async def import_tasks(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    format: Optional[Literal["ndjson", "csv"]] = None,
+):
+    """
+    Imports tasks from a raw NDJSON or CSV request body (same layout as /export).
+    The body is parsed as it arrives and inserted in IMPORT_CHUNK_SIZE batches;
+    the next batch isn't read until the previous one is written.
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if "csv" in content_type else "ndjson"
+
+    summary = ImportSummary(received=0, inserted=0, failed=0, chunks=0, errors=[])
+    chunk: List[tuple[int, TaskImport]] = []
+    try:
+        async for row_number, row in iter_import_rows(request.stream(), format, settings.IMPORT_MAX_ROW_BYTES):
+            summary.received += 1
+            if isinstance(row, ValueError):
+                _record_import_error(summary, row_number, str(row))
+                continue
+            try:
+                chunk.append((row_number, TaskImport.model_validate(row)))
+            except ValidationError as exc:
+                error = exc.errors()[0]
+                field = error.get("loc", ["unknown"])[-1]
+                _record_import_error(summary, row_number, f"'{field}': {error.get('msg', 'Invalid input')}")
+                continue
+            if len(chunk) >= settings.IMPORT_CHUNK_SIZE:
+                await _insert_import_chunk(chunk, current_user, summary)
+                chunk = []
+    except RowTooLarge:
+        # The stream can't be resynchronised past it, so stop here. Earlier
+        # chunks are already stored; report them so a retry can resume.
+        summary.received += 1
+        summary.stopped_at_row = summary.received
+        _record_import_error(summary, summary.received, f"Row is larger than {settings.IMPORT_MAX_ROW_BYTES} bytes")
+    except ValueError as exc:
+        # Only an unreadable CSV header raises: nothing has been inserted yet
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    if chunk:
+        await _insert_import_chunk(chunk, current_user, summary)
+    return summary
+
+BULK_SUCCESS_STATUSES = {"created", "updated", "unchanged", "deleted"}
+
+def _parse_object_id(task_id: str) -> Optional[PydanticObjectId]:
+    try:
+        return PydanticObjectId(task_id)
+    except (InvalidId, TypeError):
+        return None
+
+async def _owned_tasks(ids: List[PydanticObjectId], owner: User) -> dict:
+    # One projected lookup tells which ids exist and belong to the caller,
+    # so every item gets its own result instead of aggregate counts. The
+    # current state also feeds the write hooks (counter transitions).
+    cursor = Task.get_motor_collection().find(
+        {"_id": {"$in": ids}, **_owner_query(owner)},
+        projection=TASK_OUT_PROJECTION,
+    )
+    return {doc["_id"]: _task_dict(doc) async for doc in cursor}
+
+async def _run_bulk_write(
+    operations: list,
+    op_items: List[int],
+    results: List[BulkItemResult],
+    ordered: bool,
+    success_status: str,
+):
+    """
+    Sends all operations in one bulk_write and maps write errors back onto
+    the per-item results. op_items[i] is the index of the item behind operation i.
+    """
+    if not operations:
+        return
+    failed_ops = {}
+    try:
+        await Task.get_motor_collection().bulk_write(operations, ordered=ordered)
+    except BulkWriteError as exc:
+        failed_ops = {err["index"]: err.get("errmsg") for err in exc.details.get("writeErrors", [])}
+    # An ordered bulk write stops at the first error
+    stop_at = min(failed_ops) if ordered and failed_ops else None
+
+    for op_index, item_index in enumerate(op_items):
+        result = results[item_index]
+        if op_index in failed_ops:
+            result.status = "failed"
+            result.error = failed_ops[op_index]
+            result.task = None
+        elif stop_at is not None and op_index > stop_at:
+            result.status = "skipped"
+            result.task = None
+        else:
+            result.status = success_status
+
+def _bulk_response(results: List[BulkItemResult]) -> BulkResult:
+    succeeded = sum(1 for result in results if result.status in BULK_SUCCESS_STATUSES)
+    return BulkResult(succeeded=succeeded, failed=len(results) - succeeded, results=results)
+
+@router.post("/bulk", response_model=BulkResult)
+async def create_tasks_bulk(
+    bulk_in: TaskBulkCreate,
+    current_user: User = Depends(get_current_user)
+):
+    inferred = enhance_many((t.title, t.description, t.tags) for t in bulk_in.tasks)
+
+    operations, op_items, results = [], [], []
+    for index, (task_in, task_inferred) in enumerate(zip(bulk_in.tasks, inferred)):
+        task = _build_task(task_in, task_inferred, current_user)
+        task.id = PydanticObjectId()
+        operations.append(InsertOne(get_dict(task, to_db=True)))
+        op_items.append(index)
+        results.append(BulkItemResult(index=index, id=str(task.id), status="pending", task=TaskOut.model_validate(task)))
+
+    await _run_bulk_write(operations, op_items, results, bulk_in.ordered, "created")
+    created = [result.task.model_dump() for result in results if result.status == "created"]
+    if created:
+        await _on_tasks_changed(current_user, created=created)
+    return _bulk_response(results)
+
+@router.patch("/bulk", response_model=BulkResult)
+async def update_tasks_bulk(
+    bulk_in: TaskBulkUpdate,
+    current_user: User = Depends(get_current_user)
+):
+    results = [BulkItemResult(index=index, id=item.id, status="pending") for index, item in enumerate(bulk_in.items)]
+    object_ids = [_parse_object_id(item.id) for item in bulk_in.items]
+    owned = await _owned_tasks([oid for oid in object_ids if oid is not None], current_user)
+
+    operations, op_items = [], []
+    for index, (item, oid) in enumerate(zip(bulk_in.items, object_ids)):
+        update_data = item.model_dump(exclude_unset=True, exclude={"id"})
+        if oid is None:
+            results[index].status = "invalid_id"
+        elif oid not in owned:
+            results[index].status = "not_found"
+        elif not update_data:
+            results[index].status = "unchanged"
+        else:
+            operations.append(UpdateOne({"_id": oid, **_owner_query(current_user)}, _patch_update(update_data)))
+            op_items.append(index)
+
+    await _run_bulk_write(operations, op_items, results, bulk_in.ordered, "updated")
+    updated, current = [], dict(owned)
+    for item, oid, result in zip(bulk_in.items, object_ids, results):
+        if result.status == "updated":
+            # Chain states so the same id updated twice counts transitions once each
+            before = current[oid]
+            current[oid] = {**before, **item.model_dump(exclude_unset=True, exclude={"id"}), "revision": before["revision"] + 1}
+            updated.append((before, current[oid]))
+    if updated:
+        await _on_tasks_changed(current_user, updated=updated)
+    return _bulk_response(results)
+
+@router.delete("/bulk", response_model=BulkResult)
+async def delete_tasks_bulk(
+    bulk_in: TaskBulkDelete,
+    current_user: User = Depends(get_current_user)
+):
+    results = [BulkItemResult(index=index, id=task_id, status="pending") for index, task_id in enumerate(bulk_in.ids)]
+    object_ids = [_parse_object_id(task_id) for task_id in bulk_in.ids]
+    owned = await _owned_tasks([oid for oid in object_ids if oid is not None], current_user)
+
+    operations, op_items = [], []
+    for index, oid in enumerate(object_ids):
+        if oid is None:
+            results[index].status = "invalid_id"
+        elif oid not in owned:
+            results[index].status = "not_found"
+        else:
+            operations.append(DeleteOne({"_id": oid, **_owner_query(current_user)}))
+            op_items.append(index)
+
+    await _run_bulk_write(operations, op_items, results, bulk_in.ordered, "deleted")
+    # Duplicate ids in one request must only be counted once
+    deleted = {oid: owned[oid] for oid, result in zip(object_ids, results) if result.status == "deleted"}
+    if deleted:
+        await _on_tasks_changed(current_user, deleted=list(deleted.values()))
+    return _bulk_response(results)
 
 @router.get("/{task_id}", response_model=TaskOut)
 async def read_task(
     task_id: str,
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    if_none_match_header: Optional[str] = Header(None, alias="If-None-Match"),
 ):
-    # Retrieve task and ensure ownership
-    task = await Task.find_one(Task.id == PydanticObjectId(task_id), Task.owner.id == current_user.id)
-    if not task:
+    # Retrieve task and ensure ownership. The lookup comes before the
+    # If-None-Match check, so a deleted task is a 404, never a 304.
+    oid = _parse_object_id(task_id)
+    if not oid:
+        raise HTTPException(status_code=404, detail="Task not found")
+    # Only keys the shared read: any write by this user starts a fresh one
+    version = await get_task_version(current_user.id)
+
+    async def load_task() -> Optional[tuple[int, bytes]]:
+        doc = await Task.get_motor_collection().find_one(
+            {"_id": oid, **_owner_query(current_user)}, projection=TASK_OUT_PROJECTION
+        )
+        if doc is None:
+            return None
+        task = TaskOut.model_validate(doc)
+        return task.revision, task.model_dump_json().encode("utf-8")
+
+    loaded = await task_reads.get(current_user.id, version, ("task", task_id), load_task)
+    if loaded is None:
         raise HTTPException(status_code=404, detail="Task not found")
-    return task
+    revision, body = loaded
+    etag = _task_etag(current_user, revision, task_id, _content_coding(request))
+    if if_none_match(if_none_match_header, etag):
+        return _not_modified(etag)
+    return _task_response(request, current_user, revision, task_id, body)
+
+def _expected_revision(owner: User, task_id: str, if_match_header: Optional[str], revision: Optional[int]) -> Optional[int]:
+    """
+    Optimistic concurrency for PUT/PATCH/DELETE: folds an If-Match ETag into
+    the revision the write is conditional on, so the write itself checks it
+    and two writers holding the same ETag can't both pass.
+    """
+    if if_match_header is None or if_match_header.strip() == "*":
+        return revision
+    expected = matching_version(
+        if_match_header, lambda candidate: _task_etag(owner, candidate, task_id), TASK_ETAG_CODINGS
+    )
+    if expected is None or (revision is not None and revision != expected):
+        raise _precondition_failed()
+    return expected
+
+def _precondition_failed() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="This task was changed by someone else. Fetch it again and retry.",
+    )
+
+def _revision_filter(revision: int):
+    # Tasks written before the revision field existed are at revision 0
+    return {"$in": [0, None]} if revision == 0 else revision
+
+def _single_task_filter(oid: PydanticObjectId, owner: User, revision: Optional[int]) -> dict:
+    query = {"_id": oid, **_owner_query(owner)}
+    if revision is not None:
+        query["revision"] = _revision_filter(revision)
+    return query
+
+async def _write_missed(
+    oid: Optional[PydanticObjectId], owner: User, revision: Optional[int], if_match: bool = False
+) -> HTTPException:
+    """
+    Error for a conditional write that matched nothing. Only this failure
+    path pays for a second lookup to tell a stale revision from a missing task.
+    """
+    if oid is not None and revision is not None:
+        if await Task.get_motor_collection().count_documents({"_id": oid, **_owner_query(owner)}, limit=1):
+            if if_match:
+                return _precondition_failed()
+            return HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="This task was changed by someone else. Fetch it again and retry.",
+            )
+    return HTTPException(status_code=404, detail="Task not found")
+
+def _tags_expression(add: List[str], remove: List[str]) -> dict:
+    # $addToSet and $pull can't touch the same field in one update, so a
+    # PATCH that does both rewrites tags with an aggregation expression:
+    # keep what isn't removed, then append the additions not already there.
+    return {"$let": {
+        "vars": {"kept": {"$filter": {
+            "input": {"$ifNull": ["$tags", []]},
+            "as": "tag",
+            "cond": {"$not": {"$in": ["$$tag", {"$literal": remove}]}},
+        }}},
+        "in": {"$concatArrays": ["$$kept", {"$filter": {
+            "input": {"$literal": add},
+            "as": "tag",
+            "cond": {"$not": {"$in": ["$$tag", "$$kept"]}},
+        }}]},
+    }}
+
+def _rearm_reminder(due_at) -> dict:
+    # A moved (or cleared) due date re-arms the task's reminder; resending
+    # the same one leaves a sent reminder alone. Expressions in a $set
+    # stage see the document as it was before the stage.
+    if due_at is not None:
+        # Stored datetimes keep milliseconds only
+        due_at = due_at.replace(microsecond=due_at.microsecond // 1000 * 1000)
+    return {"$cond": [{"$eq": ["$due_at", {"$literal": due_at}]}, "$reminded_at", None]}
+
+def _patch_update(set_data: dict, add: List[str] = (), remove: List[str] = ()) -> Union[dict, list]:
+    if (add and remove) or "due_at" in set_data:
+        # Needs the stored document: an aggregation pipeline update
+        stage = {field: {"$literal": value} for field, value in set_data.items()}
+        if "due_at" in set_data:
+            stage["reminded_at"] = _rearm_reminder(set_data["due_at"])
+        if add or remove:
+            stage["tags"] = _tags_expression(list(add), list(remove))
+        stage["revision"] = {"$add": [{"$ifNull": ["$revision", 0]}, 1]}
+        return [{"$set": stage}]
+    update = {"$inc": {"revision": 1}}
+    if set_data:
+        update["$set"] = set_data
+    if add:
+        update["$addToSet"] = {"tags": {"$each": add}}
+    if remove:
+        update["$pull"] = {"tags": {"$in": remove}}
+    return update
+
+def _apply_patch(before: dict, set_data: dict, add: List[str], remove: List[str]) -> dict:
+    # Mirrors _patch_update on the pre-image returned by the database
+    after = {**before, **set_data, "revision": before["revision"] + 1}
+    if add or remove:
+        tags = [tag for tag in after["tags"] if tag not in remove]
+        after["tags"] = tags + [tag for tag in add if tag not in tags]
+    return after
+
+async def _update_one(
+    task_id: str,
+    owner: User,
+    revision: Optional[int],
+    set_data: dict,
+    add: List[str] = (),
+    remove: List[str] = (),
+    if_match: bool = False,
+) -> dict:
+    """
+    Applies an update in one owner-scoped find_one_and_update and runs the
+    write hooks with the returned pre-image. Returns the task after it.
+    """
+    oid = _parse_object_id(task_id)
+    # Dedupe while keeping order; $addToSet with $each does the same
+    add = list(dict.fromkeys(add))
+    before_doc = None
+    if oid is not None:
+        before_doc = await Task.get_motor_collection().find_one_and_update(
+            _single_task_filter(oid, owner, revision),
+            _patch_update(set_data, add, list(remove)),
+            projection=TASK_OUT_PROJECTION,
+            return_document=ReturnDocument.BEFORE,
+        )
+    if before_doc is None:
+        raise await _write_missed(oid, owner, revision, if_match)
+    before = _task_dict(before_doc)
+    after = _apply_patch(before, set_data, add, list(remove))
+    await _on_tasks_changed(owner, updated=[(before, after)])
+    return after
 
 @router.put("/{task_id}", response_model=TaskOut)
 async def update_task(
     task_id: str,
     task_in: TaskUpdate,
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    if_match_header: Optional[str] = Header(None, alias="If-Match"),
+    revision: Optional[int] = Query(None, ge=0),
 ):
-    task = await Task.find_one(Task.id == PydanticObjectId(task_id), Task.owner.id == current_user.id)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    
-    update_data = task_in.model_dump(exclude_unset=True)
-    await task.set(update_data)
-    return task
+    expected = _expected_revision(current_user, task_id, if_match_header, revision)
+    after = await _update_one(
+        task_id, current_user, expected, task_in.model_dump(exclude_unset=True), if_match=if_match_header is not None
+    )
+    body = TaskOut.model_validate(after).model_dump_json().encode("utf-8")
+    return _task_response(request, current_user, after["revision"], task_id, body)
+
+@router.patch("/{task_id}", response_model=TaskOut)
+async def patch_task(
+    task_id: str,
+    patch_in: TaskPatch,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    if_match_header: Optional[str] = Header(None, alias="If-Match"),
+    revision: Optional[int] = Query(None, ge=0),
+):
+    expected = _expected_revision(current_user, task_id, if_match_header, revision)
+    set_data = patch_in.model_dump(exclude_unset=True, exclude={"add_tags", "remove_tags"})
+    after = await _update_one(
+        task_id, current_user, expected, set_data, patch_in.add_tags or [], patch_in.remove_tags or [],
+        if_match=if_match_header is not None,
+    )
+    body = TaskOut.model_validate(after).model_dump_json().encode("utf-8")
+    return _task_response(request, current_user, after["revision"], task_id, body)
 
 @router.delete("/{task_id}")
 async def delete_task(
     task_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    if_match_header: Optional[str] = Header(None, alias="If-Match"),
+    revision: Optional[int] = Query(None, ge=0),
 ):
-    task = await Task.find_one(Task.id == PydanticObjectId(task_id), Task.owner.id == current_user.id)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    
-    await task.delete()
+    expected = _expected_revision(current_user, task_id, if_match_header, revision)
+    oid = _parse_object_id(task_id)
+    deleted = None
+    if oid is not None:
+        # find_one_and_delete rather than delete_one: still one round trip,
+        # and the removed document feeds the counters and search index
+        deleted = await Task.get_motor_collection().find_one_and_delete(
+            _single_task_filter(oid, current_user, expected),
+            projection=TASK_OUT_PROJECTION,
+        )
+    if deleted is None:
+        raise await _write_missed(oid, current_user, expected, if_match_header is not None)
+
+    await _on_tasks_changed(current_user, deleted=[_task_dict(deleted)])
     return {
         "message": "Task deleted successfully"
     }
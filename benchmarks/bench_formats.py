@@ -0,0 +1,96 @@
+"""
+Benchmark: wire size and CPU cost of a GET /tasks page as JSON vs
+MessagePack, each with and without gzip (GZIP_COMPRESS_LEVEL).
+
+Encoding follows the endpoint: validated TaskOut items dumped with the
+TypeAdapter, either straight to JSON bytes or to JSON-mode Python packed
+with msgpack; decoding is what a Python client does with the body.
+No database needed. Run from the project root:
+    python -m benchmarks.bench_formats
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import msgpack
+from beanie import PydanticObjectId
+from pydantic import TypeAdapter
+
+from core.config import settings
+from core.formats import packb
+from schemas.task import TaskOut
+
+task_list_adapter = TypeAdapter(List[TaskOut])
+
+WORDS = "buy call fix plan review email report meeting groceries dentist invoice release".split()
+
+
+def make_page(size: int) -> list:
+    rng = random.Random(size)
+    now = datetime.now(timezone.utc)
+    docs = [
+        {
+            "_id": PydanticObjectId(),
+            "title": " ".join(rng.choices(WORDS, k=5)).capitalize(),
+            "description": " ".join(rng.choices(WORDS, k=15)),
+            "is_completed": rng.random() < 0.3,
+            "priority": rng.choice(["low", "medium", "high"]),
+            "tags": rng.sample(["work", "shopping", "health", "finance", "communication"], k=2),
+            "created_at": now - timedelta(minutes=index),
+            "revision": rng.randint(0, 5),
+        }
+        for index in range(size)
+    ]
+    return task_list_adapter.validate_python(docs)
+
+
+def cpu_us(func, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        func()
+    return round((time.process_time() - start) / iterations * 1e6, 1)
+
+
+def measure(page: list, iterations: int) -> dict:
+    level = settings.GZIP_COMPRESS_LEVEL
+    encoders = {
+        "json": lambda: task_list_adapter.dump_json(page),
+        "msgpack": lambda: packb(task_list_adapter.dump_python(page, mode="json")),
+    }
+    decoders = {"json": json.loads, "msgpack": msgpack.unpackb}
+
+    results = {}
+    for name, encode in encoders.items():
+        body = encode()
+        compressed = gzip.compress(body, compresslevel=level)
+        results[name] = {
+            "bytes": len(body),
+            "encode_cpu_us": cpu_us(encode, iterations),
+            "decode_cpu_us": cpu_us(lambda: decoders[name](body), iterations),
+        }
+        results[f"{name}+gzip"] = {
+            "bytes": len(compressed),
+            "encode_cpu_us": cpu_us(lambda: gzip.compress(encode(), compresslevel=level), iterations),
+            "decode_cpu_us": cpu_us(lambda: decoders[name](gzip.decompress(compressed)), iterations),
+        }
+    baseline = results["json"]["bytes"]
+    for result in results.values():
+        result["bytes_vs_json"] = round(result["bytes"] / baseline, 3)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    report = [{"page_size": size, "formats": measure(make_page(size), args.iterations)} for size in args.page_sizes]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
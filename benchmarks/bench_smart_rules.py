@@ -0,0 +1,90 @@
+"""
+Micro-benchmark: compiled smart-tagging rule engine vs the original
+per-keyword substring scans, on growing descriptions and rule sets.
+
+Run from the project root:
+    python -m benchmarks.bench_smart_rules
+"""
+import argparse
+import json
+import random
+import timeit
+
+from core.smart_rules import DEFAULT_RULES, RuleEngine
+
+
+def legacy_scan(rules, title, description, current_tags):
+    # How enhance_task_context worked before the rule engine: lowercase the
+    # text, then one any(word in text) substring scan per rule.
+    priority = "medium"
+    new_tags = set(current_tags)
+    text = (title + " " + (description or "")).lower()
+    for rule in rules:
+        if rule["kind"] == "priority":
+            if priority == "medium" and any(word in text for word in rule["keywords"]):
+                priority = rule["value"]
+        elif any(word in text for word in rule["keywords"]):
+            new_tags.add(rule["value"])
+    return priority, list(new_tags)
+
+
+def compiled_scan(engine, title, description, current_tags):
+    priority, tags = engine.analyze(title + " " + (description or ""))
+    return priority or "medium", list(tags.union(current_tags))
+
+
+FILLER = (
+    "please review the quarterly planning notes and summarise the open points for the team "
+    "before friday so everyone has context on what changed since the last sync"
+).split()
+
+
+def make_description(words: int, seed: int = 42) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(FILLER) for _ in range(words))
+
+
+def make_rules(extra_rules: int, seed: int = 7) -> list:
+    # Synthetic tag rules standing in for a user-extended rule set
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    rules = list(DEFAULT_RULES)
+    for index in range(extra_rules):
+        keywords = ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(5)]
+        rules.append({"kind": "tag", "value": f"custom-{index}", "keywords": keywords})
+    return rules
+
+
+def bench(description_words: int, extra_rules: int, repeat: int, number: int) -> dict:
+    rules = make_rules(extra_rules)
+    engine = RuleEngine(rules)
+    title = "Prepare notes"
+    description = make_description(description_words)
+    legacy = min(timeit.repeat(lambda: legacy_scan(rules, title, description, []), repeat=repeat, number=number))
+    compiled = min(timeit.repeat(lambda: compiled_scan(engine, title, description, []), repeat=repeat, number=number))
+    return {
+        "description_words": description_words,
+        "keywords": sum(len(rule["keywords"]) for rule in rules),
+        "legacy_us_per_call": round(legacy / number * 1e6, 2),
+        "compiled_us_per_call": round(compiled / number * 1e6, 2),
+        "speedup": round(legacy / compiled, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--extra-rules", type=int, nargs="+", default=[0, 40])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+    results = [
+        bench(size, extra, args.repeat, args.number)
+        for extra in args.extra_rules
+        for size in args.sizes
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark: one GET /tasks page, old path vs the projection + single
+serialization fast path.
+
+Old path: Task.find() builds full Beanie documents (owner_id included),
+FastAPI re-validates them through response_model=List[TaskOut], dumps to
+JSON-able Python and json.dumps it. New path: a projected Motor query whose
+raw documents are validated once by a TypeAdapter and dumped straight to
+JSON bytes.
+
+Needs a MongoDB at MONGODB_URL (like the test suite); data goes into a
+throwaway "<DB_NAME>_bench" database that is dropped afterwards.
+Run from the project root:
+    python -m benchmarks.bench_task_list
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import List
+
+from beanie import init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+from pydantic import TypeAdapter
+
+from core.config import settings
+from db.mongodb import DOCUMENT_MODELS
+from models.task import Task
+from models.user import User
+from schemas.task import TASK_OUT_PROJECTION, TaskOut
+
+task_list_adapter = TypeAdapter(List[TaskOut])
+
+
+async def old_path(owner: User, limit: int) -> bytes:
+    tasks = await Task.find(Task.owner_id == owner.id).limit(limit).to_list()
+    validated = task_list_adapter.validate_python(tasks, from_attributes=True)
+    content = task_list_adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+async def new_path(owner: User, limit: int) -> bytes:
+    docs = await Task.get_motor_collection().find(
+        {"owner_id": owner.id}, projection=TASK_OUT_PROJECTION
+    ).limit(limit).to_list(length=None)
+    return task_list_adapter.dump_json(task_list_adapter.validate_python(docs))
+
+
+async def timed(func, owner: User, limit: int, iterations: int) -> dict:
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    for _ in range(iterations):
+        await func(owner, limit)
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    return {"wall_ms_per_page": round(wall / iterations * 1000, 3), "cpu_ms_per_page": round(cpu / iterations * 1000, 3)}
+
+
+async def run(page_sizes: List[int], iterations: int) -> list:
+    db_name = f"{settings.DB_NAME}_bench"
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    await init_beanie(database=client[db_name], document_models=DOCUMENT_MODELS)
+    try:
+        owner = User(email="bench@example.com", hashed_password="x")
+        await owner.insert()
+        await Task.insert_many([
+            Task(
+                title=f"Task number {index}",
+                description="Pick up the dry cleaning and call the bank about the card",
+                is_completed=index % 3 == 0,
+                priority=("low", "medium", "high")[index % 3],
+                tags=["errands", "communication"],
+                owner_id=owner.id,
+            )
+            for index in range(max(page_sizes))
+        ])
+
+        results = []
+        for size in page_sizes:
+            assert json.loads(await old_path(owner, size)) == json.loads(await new_path(owner, size))
+            old = await timed(old_path, owner, size, iterations)
+            new = await timed(new_path, owner, size, iterations)
+            results.append({
+                "page_size": size,
+                "old": old,
+                "new": new,
+                "cpu_speedup": round(old["cpu_ms_per_page"] / max(new["cpu_ms_per_page"], 1e-9), 2),
+            })
+        return results
+    finally:
+        await client.drop_database(db_name)
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.page_sizes, args.iterations)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Load test: drive main.app in-process through httpx.ASGITransport with a
+weighted request mix and report per-endpoint throughput and latency.
+
+Requests never touch the network; the database is the in-memory stand-in
+(db.memory, needs the mongomock-motor dev dependency) unless --mongodb-url
+is given, in which case a throwaway "<DB_NAME>_load" database is used and
+dropped afterwards. Numbers from the stand-in measure the application's own
+CPU cost (routing, validation, hashing, serialization), not MongoDB's, so
+compare runs against the same backend only.
+
+The mix is "operation=weight" pairs; operations are signup, login, create,
+list, get, update and delete. get/update/delete fall back to create while
+the chosen account has no tasks.
+
+Run from the project root:
+    python -m benchmarks.load_test --concurrency 16 --duration 10
+    python -m benchmarks.load_test --mix list=1 --requests 5000 --output run.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from beanie import init_beanie
+from httpx import ASGITransport, AsyncClient
+
+from core import security
+from core.config import settings
+from db.mongodb import DOCUMENT_MODELS
+
+ENDPOINTS = {
+    "signup": "POST /api/v1/auth/signup",
+    "login": "POST /api/v1/auth/login",
+    "create": "POST /api/v1/tasks/",
+    "list": "GET /api/v1/tasks/",
+    "get": "GET /api/v1/tasks/{task_id}",
+    "update": "PUT /api/v1/tasks/{task_id}",
+    "delete": "DELETE /api/v1/tasks/{task_id}",
+}
+DEFAULT_MIX = "signup=1,login=2,create=4,list=8,get=4,update=3,delete=1"
+PASSWORD = "load-test-password"
+TITLES = [
+    "Urgent: fix the login bug before the release",
+    "Buy groceries and pay the electricity bill",
+    "Call the dentist to reschedule the appointment",
+    "Review the quarterly report draft",
+    "Plan the weekend trip",
+]
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.strip().partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown operation {name!r}; expected one of {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+        if mix[name] < 0:
+            raise ValueError(f"Weight for {name!r} must not be negative")
+    if not any(mix.values()):
+        raise ValueError("The request mix needs at least one positive weight")
+    return mix
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    # Nearest-rank percentile of an already sorted sample.
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+@dataclass
+class Account:
+    email: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    task_ids: List[str] = field(default_factory=list)
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.errors: Counter = Counter()
+
+    def record(self, operation: str, seconds: float, status: int, ok: bool) -> None:
+        self.latencies[operation].append(seconds * 1000)
+        self.statuses[operation][status] += 1
+        if not ok:
+            self.errors[operation] += 1
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for operation, samples in sorted(self.latencies.items()):
+            ordered = sorted(samples)
+            endpoints[operation] = {
+                "endpoint": ENDPOINTS[operation],
+                "requests": len(ordered),
+                "errors": self.errors[operation],
+                "status_codes": {str(code): count for code, count in sorted(self.statuses[operation].items())},
+                "throughput_rps": round(len(ordered) / elapsed, 2),
+                "latency_ms": {
+                    "mean": round(sum(ordered) / len(ordered), 3),
+                    "p50": round(percentile(ordered, 50), 3),
+                    "p95": round(percentile(ordered, 95), 3),
+                    "p99": round(percentile(ordered, 99), 3),
+                    "max": round(ordered[-1], 3),
+                },
+            }
+        total = sum(len(samples) for samples in self.latencies.values())
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "throughput_rps": round(total / elapsed, 2),
+            "endpoints": endpoints,
+        }
+
+
+class LoadTest:
+    def __init__(self, client: AsyncClient, mix: Dict[str, float], seed: Optional[int]):
+        self.client = client
+        self.operations = list(mix)
+        self.weights = list(mix.values())
+        self.random = random.Random(seed)
+        self.accounts: List[Account] = []
+        self.recorder = Recorder()
+        self._emails = itertools.count()
+        self._run_id = f"{time.time_ns():x}"
+
+    def _new_email(self) -> str:
+        return f"load-{self._run_id}-{next(self._emails)}@example.com"
+
+    async def _signup(self, email: str):
+        return await self.client.post(
+            "/api/v1/auth/signup", json={"email": email, "password": PASSWORD, "full_name": "Load Test"}
+        )
+
+    async def _login(self, account: Account):
+        response = await self.client.post("/api/v1/auth/login", data={"username": account.email, "password": PASSWORD})
+        if response.status_code == 200:
+            account.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return response
+
+    async def setup(self, users: int, tasks_per_user: int) -> None:
+        for _ in range(users):
+            account = Account(self._new_email())
+            (await self._signup(account.email)).raise_for_status()
+            (await self._login(account)).raise_for_status()
+            if tasks_per_user:
+                response = await self.client.post(
+                    "/api/v1/tasks/bulk",
+                    json={"tasks": [{"title": self.random.choice(TITLES)} for _ in range(tasks_per_user)]},
+                    headers=account.headers,
+                )
+                response.raise_for_status()
+                account.task_ids = [item["id"] for item in response.json()["results"]]
+            self.accounts.append(account)
+
+    async def _execute(self, operation: str, account: Account):
+        if operation in ("get", "update", "delete") and not account.task_ids:
+            operation = "create"
+
+        if operation == "signup":
+            new_account = Account(self._new_email())
+            response = await self._signup(new_account.email)
+            if response.status_code == 200:
+                # Usable by later logins; it gets a token on its first login.
+                self.accounts.append(new_account)
+            return operation, response
+        if operation == "login":
+            return operation, await self._login(account)
+        if not account.headers:
+            return await self._execute("login", account)
+        if operation == "create":
+            response = await self.client.post(
+                "/api/v1/tasks/", json={"title": self.random.choice(TITLES)}, headers=account.headers
+            )
+            if response.status_code == 200:
+                account.task_ids.append(response.json()["id"])
+            return operation, response
+        if operation == "list":
+            return operation, await self.client.get("/api/v1/tasks/", params={"limit": 20}, headers=account.headers)
+
+        task_id = self.random.choice(account.task_ids)
+        if operation == "get":
+            return operation, await self.client.get(f"/api/v1/tasks/{task_id}", headers=account.headers)
+        if operation == "update":
+            return operation, await self.client.put(
+                f"/api/v1/tasks/{task_id}", json={"is_completed": self.random.random() < 0.5}, headers=account.headers
+            )
+        account.task_ids.remove(task_id)
+        return operation, await self.client.delete(f"/api/v1/tasks/{task_id}", headers=account.headers)
+
+    async def worker(self, deadline: float, budget: itertools.count, max_requests: Optional[int]) -> None:
+        while time.perf_counter() < deadline:
+            if max_requests is not None and next(budget) >= max_requests:
+                return
+            operation = self.random.choices(self.operations, self.weights)[0]
+            account = self.random.choice(self.accounts)
+            started = time.perf_counter()
+            operation, response = await self._execute(operation, account)
+            self.recorder.record(operation, time.perf_counter() - started, response.status_code, response.is_success)
+
+    async def run(self, concurrency: int, duration: float, max_requests: Optional[int]) -> dict:
+        budget = itertools.count()
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(self.worker(deadline, budget, max_requests) for _ in range(concurrency)))
+        return self.recorder.report(time.perf_counter() - started)
+
+
+async def run(args) -> dict:
+    mix = parse_mix(args.mix)
+    if args.bcrypt_rounds is not None:
+        settings.BCRYPT_ROUNDS = args.bcrypt_rounds
+    # Every virtual client shares one address, so the auth limits would
+    # measure the limiter rather than the app
+    settings.RATE_LIMIT_ENABLED = args.keep_rate_limits
+
+    if args.mongodb_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client, db_name, backend = AsyncIOMotorClient(args.mongodb_url), f"{settings.DB_NAME}_load", "mongodb"
+    else:
+        from db.memory import create_memory_client
+        client, db_name, backend = create_memory_client(), f"{settings.DB_NAME}_load", "memory"
+    await init_beanie(database=client[db_name], document_models=DOCUMENT_MODELS)
+
+    # Imported late so the app picks up the settings overrides above.
+    from main import app
+
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://loadtest") as http:
+            load_test = LoadTest(http, mix, args.seed)
+            await load_test.setup(args.users, args.tasks_per_user)
+            report = await load_test.run(args.concurrency, args.duration, args.requests)
+    finally:
+        await client.drop_database(db_name)
+        client.close()
+        security.shutdown_hash_pool()
+
+    return {
+        "config": {
+            "backend": backend,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "max_requests": args.requests,
+            "users": args.users,
+            "tasks_per_user": args.tasks_per_user,
+            "mix": mix,
+            "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+            "rate_limits": settings.RATE_LIMIT_ENABLED,
+            "seed": args.seed,
+        },
+        **report,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent virtual clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run for")
+    parser.add_argument("--requests", type=int, default=None, help="stop after this many requests")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="comma separated operation=weight pairs")
+    parser.add_argument("--users", type=int, default=10, help="accounts created before the run")
+    parser.add_argument("--tasks-per-user", type=int, default=20, help="tasks seeded per account")
+    parser.add_argument("--bcrypt-rounds", type=int, default=None, help="override BCRYPT_ROUNDS for the run")
+    parser.add_argument("--keep-rate-limits", action="store_true", help="leave the auth rate limits on")
+    parser.add_argument("--mongodb-url", default=None, help="use this MongoDB instead of the in-memory stand-in")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for a repeatable request sequence")
+    parser.add_argument("--output", default=None, help="also write the JSON report to this file")
+    args = parser.parse_args()
+    if args.concurrency < 1 or args.users < 1:
+        parser.error("--concurrency and --users must be at least 1")
+    try:
+        parse_mix(args.mix)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    report = json.dumps(asyncio.run(run(args)), indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            out.write(report + "\n")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from core.config import settings
+
+# Single-flight reads for GET /tasks and GET /tasks/{id}.
+#
+# Identical reads (same owner, same query, same wire format) that arrive
+# while one is already running wait for it and share its serialized body
+# instead of sending their own query. Finished bodies may also be kept for a
+# short TTL, so reads landing just after it still skip MongoDB.
+#
+# Keys include the owner's task_version, which the endpoints read first
+# anyway for the ETag. A write on any worker bumps it, so a read never joins
+# or reuses a result from before a write it has already seen, and the body
+# always matches the ETag sent with it. Writes on this worker also drop the
+# owner's results right away (invalidate) to free the memory.
+
+Loader = Callable[[], Awaitable[Any]]
+
+
+class ReadCoalescer:
+    def __init__(self, ttl_seconds: float, max_owners: int, max_entries_per_owner: int, clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_owners = max_owners
+        self.max_entries_per_owner = max_entries_per_owner
+        self._clock = clock
+        # owner -> (task version, {key: (expires_at, value)}), least recently used first
+        self._results: "OrderedDict[Hashable, Tuple[int, Dict[Hashable, Tuple[float, Any]]]]" = OrderedDict()
+        self._inflight: Dict[Tuple[Hashable, int, Hashable], asyncio.Future] = {}
+        self.requests = 0
+        self.executed = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+        self.invalidations = 0
+
+    def _cached(self, owner: Hashable, version: int, key: Hashable):
+        entry = self._results.get(owner)
+        if entry is None or entry[0] != version:
+            return None
+        hit = entry[1].get(key)
+        if hit is None:
+            return None
+        if hit[0] < self._clock():
+            del entry[1][key]
+            return None
+        self._results.move_to_end(owner)
+        return hit
+
+    def _store(self, owner: Hashable, version: int, key: Hashable, value: Any) -> None:
+        entry = self._results.get(owner)
+        if entry is None or entry[0] < version:
+            entry = (version, {})
+            self._results[owner] = entry
+        elif entry[0] > version:
+            # A newer version's results are already here
+            return
+        results = entry[1]
+        results[key] = (self._clock() + self.ttl_seconds, value)
+        if len(results) > self.max_entries_per_owner:
+            results.pop(next(iter(results)))
+        self._results.move_to_end(owner)
+        while len(self._results) > self.max_owners:
+            self._results.popitem(last=False)
+
+    async def get(self, owner: Hashable, version: int, key: Hashable, loader: Loader) -> Any:
+        """
+        Returns loader()'s result for this owner, task version and key,
+        running it only if no identical read is in flight or cached.
+        """
+        self.requests += 1
+        if self.ttl_seconds > 0:
+            hit = self._cached(owner, version, key)
+            if hit is not None:
+                self.cache_hits += 1
+                return hit[1]
+
+        flight_key = (owner, version, key)
+        flight = self._inflight.get(flight_key)
+        if flight is not None:
+            self.coalesced += 1
+        else:
+            self.executed += 1
+            # A task of its own, so the readers sharing it aren't cut off
+            # when the one that started it disconnects
+            flight = asyncio.ensure_future(loader())
+            self._inflight[flight_key] = flight
+            flight.add_done_callback(lambda done: self._finish(owner, version, key, done))
+        return await asyncio.shield(flight)
+
+    def _finish(self, owner: Hashable, version: int, key: Hashable, flight: asyncio.Future) -> None:
+        del self._inflight[(owner, version, key)]
+        if self.ttl_seconds > 0 and not flight.cancelled() and flight.exception() is None:
+            self._store(owner, version, key, flight.result())
+
+    def invalidate(self, owner: Hashable) -> None:
+        if self._results.pop(owner, None) is not None:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self._results.clear()
+
+    def stats(self) -> dict:
+        shared = self.coalesced + self.cache_hits
+        return {
+            "requests": self.requests,
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "cache_hits": self.cache_hits,
+            "coalescing_rate": round(shared / self.requests, 4) if self.requests else 0.0,
+            "invalidations": self.invalidations,
+            "in_flight": len(self._inflight),
+            "owners_cached": len(self._results),
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+task_reads = ReadCoalescer(
+    settings.TASK_READ_CACHE_TTL_SECONDS,
+    settings.TASK_READ_CACHE_MAX_OWNERS,
+    settings.TASK_READ_CACHE_ENTRIES_PER_OWNER,
+)
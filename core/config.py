@@ -1,6 +1,8 @@
-from typing import List
+from typing import List, Literal, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from core.startup import startup_timings
+
 class Settings(BaseSettings):
     PROJECT_NAME: str
     MONGODB_URL: str
@@ -9,7 +11,143 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     ALGORITHM: str
+
+    # MongoDB client: connection pool, timeouts, wire compression ("zlib";
+    # "zstd"/"snappy" need the matching pymongo extra) and read preference.
+    # Unset (None) values keep the driver defaults.
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 0
+    MONGODB_MAX_CONNECTING: int = 2
+    MONGODB_MAX_IDLE_TIME_MS: Optional[int] = None
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None
+    MONGODB_CONNECT_TIMEOUT_MS: int = 20000
+    MONGODB_SOCKET_TIMEOUT_MS: Optional[int] = None
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 30000
+    MONGODB_COMPRESSORS: List[str] = []
+    MONGODB_ZLIB_COMPRESSION_LEVEL: Optional[int] = None
+    MONGODB_READ_PREFERENCE: str = "primary"
+    MONGODB_APP_NAME: Optional[str] = None
+
+    # Worker processes started by `python -m core.launcher` (0 = one per
+    # CPU core available to the process)
+    WEB_CONCURRENCY: int = 0
+
+    # Accounts allowed to hit the /admin diagnostics endpoints
+    ADMIN_EMAILS: List[str] = []
+
+    # In-process cache of authenticated users (keyed by token subject)
+    USER_CACHE_MAX_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 60.0
+
+    # Token-bucket limits for the auth endpoints, per client IP and per
+    # account ("<requests>/<second|minute|hour|day>", empty = no limit).
+    # Only trust X-Forwarded-For behind a proxy that sets it; the client IP
+    # is read TRUSTED_PROXY_HOPS entries from the right (one per proxy in
+    # front of the app), so entries the client wrote itself are ignored.
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_LOGIN_PER_IP: str = "30/minute"
+    RATE_LIMIT_LOGIN_PER_ACCOUNT: str = "10/minute"
+    RATE_LIMIT_SIGNUP_PER_IP: str = "10/minute"
+    RATE_LIMIT_SIGNUP_PER_ACCOUNT: str = "5/hour"
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = False
+    RATE_LIMIT_TRUSTED_PROXY_HOPS: int = 1
+
+    # Password hashing: bcrypt work factor and the dedicated hashing pool
+    BCRYPT_ROUNDS: int = 12
+    HASH_POOL_WORKERS: int = 4
+    HASH_POOL_MAX_QUEUE: int = 64
+
+    # Slow query log: commands slower than the threshold are kept (with a
+    # sampled explain plan) in a ring buffer served on /admin/slow-queries.
+    # Each query shape is explained at most once per interval.
+    SLOW_QUERY_THRESHOLD_MS: float = 100.0
+    SLOW_QUERY_LOG_SIZE: int = 200
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = 0.05
+    SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS: float = 300.0
+    SLOW_QUERY_MAX_DOCS_RATIO: float = 10.0
+
+    # Health probe behind /health and the landing page status: seconds a
+    # MongoDB ping result is reused, and how long a ping may take
+    HEALTH_CACHE_SECONDS: float = 5.0
+    HEALTH_PROBE_TIMEOUT_SECONDS: float = 2.0
+
+    # Response compression: gzip bodies of at least this many bytes (0 = off)
+    GZIP_MINIMUM_SIZE: int = 1024
+    GZIP_COMPRESS_LEVEL: int = 6
+
+    # Task change feed (GET /tasks/stream): event source ("auto" uses a
+    # MongoDB change stream when the server supports it, else in-process
+    # events; "change_stream" / "local" force one), events buffered per
+    # connection before it is reset, events kept for Last-Event-ID resumes,
+    # seconds between heartbeats and open connections allowed per worker
+    CHANGE_FEED_SOURCE: Literal["auto", "change_stream", "local"] = "auto"
+    CHANGE_FEED_BUFFER_SIZE: int = 64
+    CHANGE_FEED_REPLAY_SIZE: int = 10000
+    CHANGE_FEED_HEARTBEAT_SECONDS: float = 15.0
+    CHANGE_FEED_MAX_SUBSCRIBERS: int = 50000
+
+    # Due date reminders: how far ahead pending reminders are loaded into
+    # memory, rows per index read, cap on reminders held in memory, how late
+    # a missed reminder may still fire, and the scheduler's shortest sleep
+    REMINDERS_ENABLED: bool = True
+    REMINDER_WINDOW_SECONDS: float = 300.0
+    REMINDER_BATCH_SIZE: int = 1000
+    REMINDER_MAX_PENDING: int = 100000
+    REMINDER_LOOKBACK_SECONDS: float = 3600.0
+    REMINDER_MIN_SLEEP_SECONDS: float = 0.05
+
+    # Idempotency-Key on POST /tasks and /auth/signup: how long a stored
+    # response is replayed, completed responses kept in memory per worker,
+    # how long a claim by a request that may have died blocks the key, and
+    # how long a duplicate waits for the first request before a 409
+    IDEMPOTENCY_TTL_SECONDS: float = 86400.0
+    IDEMPOTENCY_CACHE_SIZE: int = 10000
+    IDEMPOTENCY_LOCK_SECONDS: float = 30.0
+    IDEMPOTENCY_WAIT_SECONDS: float = 5.0
+
+    # Task reads (GET /tasks, /tasks/{id}): identical concurrent reads share
+    # one query. Their serialized result is then reused for this many
+    # seconds (0 = share in-flight reads only), for up to this many owners
+    # and distinct queries per owner
+    TASK_READ_CACHE_TTL_SECONDS: float = 1.0
+    TASK_READ_CACHE_MAX_OWNERS: int = 1000
+    TASK_READ_CACHE_ENTRIES_PER_OWNER: int = 16
+
+    # Prometheus metrics: request/DB/bcrypt timings served on /metrics
+    METRICS_ENABLED: bool = True
+
+    # Also match tasks by their legacy owner DBRef; turn off once
+    # `python -m db.migrate_owner_id` reports the backfill complete
+    TASK_OWNER_LEGACY_FALLBACK: bool = True
+
+    # Upper bound on items in a single /tasks/bulk request
+    BULK_MAX_ITEMS: int = 1000
+
+    # Default Motor cursor batch size for /tasks/export
+    EXPORT_BATCH_SIZE: int = 500
+
+    # /tasks/import: rows per insert_many chunk, longest accepted row and
+    # how many row errors are echoed back in the summary
+    IMPORT_CHUNK_SIZE: int = 500
+    IMPORT_MAX_ROW_BYTES: int = 64 * 1024
+    IMPORT_MAX_REPORTED_ERRORS: int = 100
+
+    # Optional JSON file with extra smart tagging rules (see core/smart_rules.py)
+    SMART_RULES_FILE: Optional[str] = None
+
+    # Seconds between background task-counter reconciliations (0 = off;
+    # POST /admin/stats/reconcile runs one on demand)
+    STATS_RECONCILE_INTERVAL_SECONDS: float = 0
+
+    # /tasks/search: default mode ("text" = MongoDB text index, "fuzzy" =
+    # in-process prefix/typo-tolerant index), typo allowance and how many
+    # users' fuzzy indexes are kept warm
+    SEARCH_DEFAULT_MODE: str = "text"
+    SEARCH_MAX_TYPOS: int = 1
+    SEARCH_INDEX_MAX_USERS: int = 1000
     
     model_config = SettingsConfigDict(env_file=".env")
 
-settings = Settings()
+with startup_timings.phase("settings"):
+    settings = Settings()
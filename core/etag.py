@@ -0,0 +1,60 @@
+import hashlib
+from typing import Callable, Iterable, Optional
+
+from pymongo import ReturnDocument
+
+from models.user import User
+
+# Every task write bumps the owner's task_version (a counter on the user
+# document). List ETags are derived from it, so conditional list requests
+# can be answered with a single point read on users instead of a task
+# query. A single task's ETag comes from its own revision instead, so
+# writes to other tasks don't invalidate it.
+
+async def get_task_version(user_id) -> int:
+    doc = await User.get_motor_collection().find_one({"_id": user_id}, projection={"task_version": 1})
+    return (doc or {}).get("task_version", 0)
+
+async def bump_task_version(user_id) -> Optional[int]:
+    """Atomically increments the owner's task_version and returns the new value."""
+    doc = await User.get_motor_collection().find_one_and_update(
+        {"_id": user_id},
+        {"$inc": {"task_version": 1}},
+        projection={"task_version": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    return doc["task_version"] if doc else None
+
+def make_etag(user_id, version: int, *parts: str) -> str:
+    digest = hashlib.sha1(":".join([str(user_id), *parts]).encode("utf-8")).hexdigest()[:16]
+    return f'"{version}-{digest}"'
+
+def with_coding(etag: str, coding: str) -> str:
+    """
+    The ETag of the representation sent in this content coding: a gzip body
+    is a different representation from the identity one ("3-ab" -> "3-ab-gzip").
+    """
+    return etag if coding == "identity" else f'{etag[:-1]}-{coding}"'
+
+def _parse_etags(header: str) -> list:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+def if_none_match(header: Optional[str], etag: str) -> bool:
+    """True when the client's cached copy is current (answer 304). Weak comparison."""
+    if not header:
+        return False
+    tags = _parse_etags(header)
+    return "*" in tags or etag in (tag.removeprefix("W/") for tag in tags)
+
+def matching_version(header: str, etag_for: Callable[[int], str], codings: Iterable[str] = ("identity",)) -> Optional[int]:
+    """
+    The version named by an If-Match tag that is valid for this resource
+    (etag_for(version) == tag, in any of the given content codings), or None
+    when no tag qualifies. Lets the write itself check the precondition
+    instead of a separate read.
+    """
+    for tag in _parse_etags(header):
+        version = tag.strip('"').split("-", 1)[0]
+        if version.isdigit() and tag in {with_coding(etag_for(int(version)), coding) for coding in codings}:
+            return int(version)
+    return None
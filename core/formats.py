@@ -0,0 +1,109 @@
+"""
+MessagePack as an alternative wire format to JSON.
+
+Responses: list endpoints call wants_msgpack() and, when the client's
+Accept header prefers MessagePack, pack the same JSON-mode data (datetimes
+stay ISO strings) so both formats carry identical values.
+
+Requests: MessagePackBodyMiddleware turns a MessagePack body into JSON
+before routing, so every JSON endpoint (create, bulk, ...) accepts it
+without changes to its validation.
+"""
+import json
+from typing import Any, Optional
+
+import msgpack
+from starlette.datastructures import Headers, MutableHeaders
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = {MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack"}
+
+
+def _media_ranges(accept: str):
+    for part in accept.split(","):
+        media_type, *params = (piece.strip() for piece in part.split(";"))
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        yield media_type.lower(), q
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    """True when the Accept header ranks MessagePack above JSON."""
+    if not accept:
+        return False
+    msgpack_q = json_q = 0.0
+    for media_type, q in _media_ranges(accept):
+        if media_type in MSGPACK_MEDIA_TYPES:
+            msgpack_q = max(msgpack_q, q)
+        elif media_type in ("application/json", "application/*", "*/*"):
+            json_q = max(json_q, q)
+    return msgpack_q > 0 and msgpack_q >= json_q
+
+
+def packb(data: Any) -> bytes:
+    return msgpack.packb(data, use_bin_type=True)
+
+
+async def _send_error(send, status: int, message: str) -> None:
+    body = json.dumps({"message": message}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class MessagePackBodyMiddleware:
+    """
+    Re-encodes MessagePack request bodies as JSON (and fixes Content-Type /
+    Content-Length) so the route's JSON validation applies unchanged.
+    Bodies that aren't valid MessagePack, or hold values JSON can't carry
+    (binary, non-string keys), get a 400.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        content_type = Headers(scope=scope).get("content-type", "")
+        if content_type.split(";")[0].strip().lower() not in MSGPACK_MEDIA_TYPES:
+            await self.app(scope, receive, send)
+            return
+
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        try:
+            body = json.dumps(msgpack.unpackb(b"".join(chunks), raw=False), allow_nan=False).encode("utf-8")
+        except (ValueError, TypeError, msgpack.UnpackException):
+            await _send_error(send, 400, "Whoops! The request body isn't valid MessagePack.")
+            return
+
+        scope = dict(scope)
+        headers = MutableHeaders(scope=scope)
+        headers["content-type"] = "application/json"
+        headers["content-length"] = str(len(body))
+        sent = False
+
+        async def receive_json():
+            nonlocal sent
+            if sent:
+                return await receive()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        await self.app(scope, receive_json, send)
@@ -0,0 +1,54 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from core.config import settings
+from models.user import User
+
+
+class HealthProbe:
+    """
+    Pings MongoDB at most once per ttl_seconds and serves the cached result
+    in between; concurrent callers during a refresh share one ping.
+    """
+
+    def __init__(self, ttl_seconds: float, timeout_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.timeout_seconds = timeout_seconds
+        self._clock = clock
+        self._result: Optional[dict] = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def check(self) -> dict:
+        if self._result is not None and self._clock() < self._expires_at:
+            return self._result
+        async with self._lock:
+            if self._result is None or self._clock() >= self._expires_at:
+                self._result = await self._probe()
+                self._expires_at = self._clock() + self.ttl_seconds
+        return self._result
+
+    async def _ping(self) -> None:
+        await User.get_motor_collection().database.command("ping")
+
+    async def _probe(self) -> dict:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._ping(), self.timeout_seconds)
+            database = {"status": "up", "latency_ms": round((time.perf_counter() - started) * 1000, 3)}
+        except Exception as exc:
+            database = {"status": "down", "error": type(exc).__name__}
+        return {
+            "status": "ok" if database["status"] == "up" else "degraded",
+            "database": database,
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+    def reset(self) -> None:
+        self._result = None
+        self._expires_at = 0.0
+
+
+health_probe = HealthProbe(settings.HEALTH_CACHE_SECONDS, settings.HEALTH_PROBE_TIMEOUT_SECONDS)
@@ -0,0 +1,259 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from pymongo.errors import DuplicateKeyError
+
+from core.cache import TTLCache
+from core.config import settings
+from models.idempotency import IdempotencyRecord
+
+logger = logging.getLogger(__name__)
+
+# Idempotency-Key support for POST endpoints that clients retry (create
+# task, signup). The first request with a key runs normally and its
+# response is stored; retries with the same key get that response back
+# (Idempotent-Replayed: true) without running the handler again.
+#
+# Completed responses live in a bounded in-process LRU in front of the
+# "idempotency_keys" collection (expired by a TTL index), so most retries
+# never reach MongoDB. A duplicate that arrives while the first request is
+# still running waits for it: on the same worker through a shared future,
+# across workers by polling the record the first request claimed.
+# Only successful responses are stored; if the handler fails, the claim is
+# released so the client's next retry runs it again. While the handler
+# runs, its claim is renewed so a slow request isn't taken over by another
+# worker, and the handler runs shielded from the request so a client that
+# disconnects can't stop it between its side effect and storing the result.
+
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+Handler = Callable[[], Awaitable[Tuple[int, Any]]]
+
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used for a request with a different body."""
+
+
+class IdempotencyInProgress(Exception):
+    """The first request with this key is still running."""
+
+
+def fingerprint(payload: Any) -> str:
+    # Keyed so the stored value reveals nothing about the body (signup
+    # bodies hold passwords)
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+    return hmac.new(settings.SECRET_KEY.encode("utf-8"), canonical, hashlib.sha256).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(self, cache_size: int, ttl_seconds: float, lock_seconds: float, wait_seconds: float, poll_seconds: float = 0.05):
+        self.ttl_seconds = ttl_seconds
+        self.lock_seconds = lock_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+        self._cache = TTLCache(cache_size, ttl_seconds)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.executed = 0
+        self.replayed = 0
+        self.waited = 0
+        self.conflicts = 0
+        self.unsaved = 0
+
+    def _collection(self):
+        return IdempotencyRecord.get_motor_collection()
+
+    def _lock_expiry(self) -> datetime:
+        return datetime.now(timezone.utc) + timedelta(seconds=self.lock_seconds)
+
+    async def _claim(self, record_id: str, token: str, fingerprint: str) -> Optional[dict]:
+        """
+        Claims the key for this request. Returns None when the claim is ours,
+        otherwise the record that holds it.
+        """
+        now = datetime.now(timezone.utc)
+        claim = {"status": "in_progress", "token": token, "fingerprint": fingerprint, "expires_at": self._lock_expiry()}
+        try:
+            await self._collection().insert_one({"_id": record_id, **claim})
+            return None
+        except DuplicateKeyError:
+            pass
+        # An expired record (the TTL monitor runs about once a minute) or a
+        # claim left behind by a crashed worker can be taken over
+        taken = await self._collection().find_one_and_update(
+            {"_id": record_id, "expires_at": {"$lte": now}}, {"$set": claim, "$unset": {"status_code": "", "body": ""}}
+        )
+        if taken is not None:
+            return None
+        existing = await self._collection().find_one({"_id": record_id})
+        # Gone in between (released by a failed first request): try again
+        return existing if existing is not None else await self._claim(record_id, token, fingerprint)
+
+    async def _renew(self, record_id: str, token: str) -> None:
+        # Runs for as long as the handler does
+        while True:
+            await asyncio.sleep(self.lock_seconds / 3)
+            try:
+                await self._collection().update_one(
+                    {"_id": record_id, "token": token, "status": "in_progress"},
+                    {"$set": {"expires_at": self._lock_expiry()}},
+                )
+            except Exception:
+                logger.warning("Could not renew the idempotency claim on %s", record_id, exc_info=True)
+
+    async def _complete(self, record_id: str, token: str, fingerprint: str, status_code: int, body: Any) -> dict:
+        record = {"status": "completed", "fingerprint": fingerprint, "status_code": status_code, "body": body}
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds)
+        self._cache.set(record_id, record)
+        await self._collection().update_one({"_id": record_id, "token": token}, {"$set": {**record, "expires_at": expires_at}})
+        return record
+
+    async def _release(self, record_id: str, token: str) -> None:
+        await self._collection().delete_one({"_id": record_id, "token": token, "status": "in_progress"})
+
+    async def _execute(self, record_id: str, token: str, fingerprint: str, handler: Handler, done: asyncio.Future):
+        try:
+            renewer = asyncio.ensure_future(self._renew(record_id, token))
+            try:
+                status_code, body = await handler()
+            except BaseException:
+                # Nothing was done (handlers raise before their side effect
+                # or roll it back): let the next retry run it
+                await asyncio.shield(self._release(record_id, token))
+                raise
+            finally:
+                renewer.cancel()
+            self.executed += 1
+            try:
+                await self._complete(record_id, token, fingerprint, status_code, body)
+            except Exception:
+                # The side effect has happened, so the key must not be freed
+                # for a second run. The claim stays until its lock expires;
+                # this worker replays from memory meanwhile.
+                self.unsaved += 1
+                logger.exception("Could not store the response for idempotency key %s", record_id)
+            return status_code, body, False
+        finally:
+            del self._inflight[record_id]
+            done.set_result(None)
+
+    def _replay(self, record: dict, fingerprint: str) -> Tuple[int, Any, bool]:
+        if record["fingerprint"] != fingerprint:
+            raise IdempotencyKeyReused()
+        self.replayed += 1
+        return record["status_code"], record["body"], True
+
+    async def run(self, scope: str, key: str, payload: Any, handler: Handler) -> Tuple[int, Any, bool]:
+        """
+        Runs handler (returning (status code, JSON body)) at most once per
+        scope and key. Returns (status code, body, replayed).
+        """
+        record_id = f"{scope}:{key}"
+        request_fingerprint = fingerprint(payload)
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            record = self._cache.get(record_id)
+            if record is not None:
+                return self._replay(record, request_fingerprint)
+
+            pending = self._inflight.get(record_id)
+            if pending is not None:
+                # Same worker: wait for the first request instead of polling
+                self.waited += 1
+                try:
+                    await asyncio.wait_for(asyncio.shield(pending), max(deadline - time.monotonic(), 0))
+                except asyncio.TimeoutError:
+                    self.conflicts += 1
+                    raise IdempotencyInProgress()
+                continue
+
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[record_id] = future
+            claimed = False
+            token = uuid.uuid4().hex
+            try:
+                holder = await self._claim(record_id, token, request_fingerprint)
+                claimed = holder is None
+                if claimed:
+                    break
+                if holder["status"] == "completed":
+                    self._cache.set(record_id, holder)
+                    return self._replay(holder, request_fingerprint)
+                if holder["fingerprint"] != request_fingerprint:
+                    raise IdempotencyKeyReused()
+            finally:
+                if not claimed:
+                    # Not ours to run: let local waiters re-check
+                    del self._inflight[record_id]
+                    future.set_result(None)
+
+            # Another worker holds it
+            self.waited += 1
+            if time.monotonic() >= deadline:
+                self.conflicts += 1
+                raise IdempotencyInProgress()
+            await asyncio.sleep(self.poll_seconds)
+
+        work = asyncio.ensure_future(self._execute(record_id, token, request_fingerprint, handler, future))
+        # Retrieved here in case the request is gone by the time it fails
+        work.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return await asyncio.shield(work)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "waited": self.waited,
+            "conflicts": self.conflicts,
+            "unsaved": self.unsaved,
+            "in_flight": len(self._inflight),
+            "cache": self._cache.stats(),
+        }
+
+
+async def idempotent_json(scope: str, key: Optional[str], payload: Any, handler: Handler) -> JSONResponse:
+    """
+    The endpoint side: validates the Idempotency-Key header value, runs the
+    handler through the store and maps the store's errors to responses.
+    Without a key the handler simply runs.
+    """
+    if key is None:
+        status_code, body = await handler()
+        return JSONResponse(status_code=status_code, content=body)
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+    try:
+        status_code, body, replayed = await idempotency_store.run(scope, key, payload, handler)
+    except IdempotencyKeyReused:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="This Idempotency-Key was already used for a different request",
+        )
+    except IdempotencyInProgress:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still being processed",
+            headers={"Retry-After": "1"},
+        )
+    headers = {REPLAYED_HEADER: "true"} if replayed else None
+    return JSONResponse(status_code=status_code, content=body, headers=headers)
+
+
+idempotency_store = IdempotencyStore(
+    settings.IDEMPOTENCY_CACHE_SIZE,
+    settings.IDEMPOTENCY_TTL_SECONDS,
+    settings.IDEMPOTENCY_LOCK_SECONDS,
+    settings.IDEMPOTENCY_WAIT_SECONDS,
+)
@@ -0,0 +1,140 @@
+"""
+Production launcher: runs main:app in several worker processes.
+
+With gunicorn installed (`pip install gunicorn`, POSIX only), the app is
+imported once in the master (preload) and workers are forked from it, so
+imports, settings and the pre-built pages are shared copy-on-write and a
+restart doesn't repeat them per worker. Otherwise uvicorn's own process
+manager is used, where every worker imports the app itself.
+
+Either way each worker opens its own MongoDB client in the app lifespan,
+after the fork, and logs its startup breakdown (also on GET
+/api/v1/admin/startup).
+
+Run from the project root:
+    python -m core.launcher                        # one worker per core
+    python -m core.launcher --workers 4 --port 8080
+    python -m core.launcher --server uvicorn
+"""
+import argparse
+import logging
+import os
+from typing import Optional
+
+from core.startup import startup_timings
+
+logger = logging.getLogger(__name__)
+
+
+def available_cores() -> int:
+    try:
+        # Honours CPU affinity / container cpusets, unlike os.cpu_count()
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def worker_count(requested: Optional[int] = None) -> int:
+    from core.config import settings
+
+    workers = requested or settings.WEB_CONCURRENCY
+    return workers if workers > 0 else available_cores()
+
+
+def gunicorn_available() -> bool:
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        return False
+    return os.name == "posix"
+
+
+def load_app():
+    from main import app
+
+    return app
+
+
+def gunicorn_options(args) -> dict:
+    return {
+        "bind": f"{args.host}:{args.port}",
+        "workers": worker_count(args.workers),
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "timeout": args.timeout,
+        "graceful_timeout": args.timeout,
+        "keepalive": args.keepalive,
+        "loglevel": args.log_level,
+        "forwarded_allow_ips": args.forwarded_allow_ips,
+    }
+
+
+def run_gunicorn(args) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def __init__(self, options: dict):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Runs once, in the master (preload_app)
+            app = load_app()
+            logger.info("Preloaded the app: %s", startup_timings.report()["phases_ms"])
+            return app
+
+    Server(gunicorn_options(args)).run()
+
+
+def run_uvicorn(args) -> None:
+    import uvicorn
+
+    workers = worker_count(args.workers)
+    options = {
+        "host": args.host,
+        "port": args.port,
+        "log_level": args.log_level,
+        "timeout_keep_alive": args.keepalive,
+        "forwarded_allow_ips": args.forwarded_allow_ips,
+    }
+    if workers == 1:
+        # Single process: import here so the imports phase is reported too
+        uvicorn.run(load_app(), **options)
+    else:
+        # uvicorn spawns fresh interpreters; each worker imports the app
+        uvicorn.run("main:app", workers=workers, **options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: WEB_CONCURRENCY, else one per core)")
+    parser.add_argument("--server", choices=["auto", "gunicorn", "uvicorn"], default="auto")
+    parser.add_argument("--timeout", type=int, default=30, help="seconds a worker may hang before it is restarted (gunicorn)")
+    parser.add_argument("--keepalive", type=int, default=5, help="seconds to hold idle keep-alive connections")
+    parser.add_argument("--forwarded-allow-ips", default="127.0.0.1", help="proxies trusted for X-Forwarded-* headers")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(process)d %(name)s %(levelname)s %(message)s")
+    server = args.server
+    if server == "auto":
+        server = "gunicorn" if gunicorn_available() else "uvicorn"
+    elif server == "gunicorn" and not gunicorn_available():
+        parser.error("gunicorn isn't installed (pip install gunicorn) or this platform doesn't support it")
+
+    if server == "gunicorn":
+        run_gunicorn(args)
+    else:
+        run_uvicorn(args)
+
+
+if __name__ == "__main__":
+    main()
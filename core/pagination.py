@@ -0,0 +1,31 @@
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Any, Tuple
+
+from beanie import PydanticObjectId
+
+
+def encode_cursor(created_at: datetime, task_id: Any) -> str:
+    """
+    Builds an opaque keyset cursor from the (created_at, _id) of the last item on a page.
+    """
+    if created_at.tzinfo is None:
+        # MongoDB hands back naive UTC datetimes
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    payload = {"t": int(created_at.timestamp() * 1000), "i": str(task_id)}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, PydanticObjectId]:
+    """
+    Reverses encode_cursor. Raises ValueError for anything that isn't a cursor we issued.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        created_at = datetime.fromtimestamp(payload["t"] / 1000, tz=timezone.utc)
+        return created_at, PydanticObjectId(payload["i"])
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
@@ -0,0 +1,145 @@
+import math
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from core.config import settings
+
+PERIODS = {"second": 1.0, "minute": 60.0, "hour": 3600.0, "day": 86400.0}
+
+
+class RateLimited(Exception):
+    """Raised when a request is over its limit; retry_after is in seconds."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limited, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+def parse_rate(text: Optional[str]) -> Optional[Tuple[int, float]]:
+    """
+    Parses "10/minute" (also "10/30s"-style seconds) into (requests, period
+    in seconds). An empty value or zero requests means no limit.
+    """
+    if not text:
+        return None
+    count, _, period = text.partition("/")
+    count = int(count)
+    if count <= 0:
+        return None
+    period = period.strip().lower() or "second"
+    if period in PERIODS:
+        seconds = PERIODS[period]
+    elif period.endswith("s") and period[:-1].replace(".", "", 1).isdigit():
+        seconds = float(period[:-1])
+    else:
+        raise ValueError(f"Unknown rate period in {text!r}; use second, minute, hour, day or e.g. 30s")
+    return count, seconds
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets keyed by client (IP, account, ...): each key may burst up
+    to `capacity` requests and regains capacity/period tokens per second.
+    Buckets live in a bounded LRU; evicting one only forgets that key's
+    usage, which errs on the side of letting it through.
+    """
+
+    def __init__(self, capacity: int, period_seconds: float, max_keys: int, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.refill_per_second = capacity / period_seconds
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: "OrderedDict[Hashable, tuple[float, float]]" = OrderedDict()
+        self._lock = Lock()
+        self.allowed = 0
+        self.rejected = 0
+        self.evictions = 0
+
+    def acquire(self, key: Hashable) -> float:
+        """Takes one token. Returns 0 when allowed, else seconds until one is available."""
+        now = self._clock()
+        with self._lock:
+            entry = self._buckets.pop(key, None)
+            if entry is None:
+                tokens = float(self.capacity)
+            else:
+                tokens, updated_at = entry
+                tokens = min(self.capacity, tokens + (now - updated_at) * self.refill_per_second)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+                self.allowed += 1
+            else:
+                wait = (1 - tokens) / self.refill_per_second
+                self.rejected += 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+            return wait
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "refill_per_second": round(self.refill_per_second, 4),
+            "keys": len(self._buckets),
+            "max_keys": self.max_keys,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "evictions": self.evictions,
+        }
+
+
+class RouteRateLimits:
+    """
+    Per-route limiters, each with an optional per-IP and per-account bucket.
+    rules: {"login": {"ip": "30/minute", "account": "10/minute"}, ...}
+    """
+
+    def __init__(self, rules: Dict[str, Dict[str, Optional[str]]], max_keys: int, clock: Callable[[], float] = time.monotonic):
+        self.limiters: Dict[Tuple[str, str], TokenBucketLimiter] = {}
+        for route, scopes in rules.items():
+            for scope, rate in scopes.items():
+                parsed = parse_rate(rate)
+                if parsed is not None:
+                    self.limiters[(route, scope)] = TokenBucketLimiter(*parsed, max_keys=max_keys, clock=clock)
+
+    def check(self, route: str, ip: Optional[str], account: Optional[str] = None) -> None:
+        """Raises RateLimited if either the client IP or the account is over the route's limit."""
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        for scope, key in (("ip", ip), ("account", account.strip().lower() if account else None)):
+            limiter = self.limiters.get((route, scope))
+            if limiter is None or key is None:
+                continue
+            wait = limiter.acquire(key)
+            if wait:
+                raise RateLimited(wait)
+
+    def clear(self) -> None:
+        for limiter in self.limiters.values():
+            limiter.clear()
+
+    def stats(self) -> dict:
+        return {f"{route}:{scope}": limiter.stats() for (route, scope), limiter in self.limiters.items()}
+
+
+def retry_after_header(retry_after: float) -> str:
+    # Retry-After takes whole seconds; round up so clients don't retry early
+    return str(max(1, math.ceil(retry_after)))
+
+
+# Applied by the auth endpoints before any database lookup or bcrypt work.
+auth_rate_limits = RouteRateLimits(
+    {
+        "login": {"ip": settings.RATE_LIMIT_LOGIN_PER_IP, "account": settings.RATE_LIMIT_LOGIN_PER_ACCOUNT},
+        "signup": {"ip": settings.RATE_LIMIT_SIGNUP_PER_IP, "account": settings.RATE_LIMIT_SIGNUP_PER_ACCOUNT},
+    },
+    max_keys=settings.RATE_LIMIT_MAX_KEYS,
+)
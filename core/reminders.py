@@ -0,0 +1,249 @@
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from core.config import settings
+from core.task_events import task_change_feed
+from models.task import Task
+from schemas.task import TASK_OUT_PROJECTION
+
+logger = logging.getLogger(__name__)
+
+# Fires a reminder when an open task's due_at arrives.
+#
+# Only the next window (REMINDER_WINDOW_SECONDS) of pending reminders is
+# held in memory, as a heap ordered by due_at. It is read from the
+# pending_reminders index with a (due_at, _id) seek, at most
+# REMINDER_BATCH_SIZE at a time, so the cost doesn't grow with the number
+# of reminders further out. Task writes that land inside the loaded window
+# are pushed onto the heap directly (notify), everything else is picked up
+# by a later window.
+#
+# Each reminder is claimed by setting reminded_at with a conditional update
+# before it fires, so with several workers (or a stale heap entry after the
+# due date moved or the task was completed) it fires at most once.
+
+MAX_OBJECT_ID = ObjectId("f" * 24)
+MIN_OBJECT_ID = ObjectId("0" * 24)
+
+Handler = Callable[[object, dict], None]
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def as_utc(value: datetime) -> datetime:
+    # Motor returns naive datetimes (UTC)
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def publish_reminder(owner_id, task: dict) -> None:
+    # With a change stream every worker sees the reminded_at update and
+    # publishes it there (core/task_events.py)
+    if not task_change_feed.streaming:
+        task_change_feed.publish(owner_id, "reminder", task)
+
+
+class ReminderScheduler:
+    def __init__(
+        self,
+        window_seconds: float,
+        batch_size: int,
+        max_pending: int,
+        lookback_seconds: float,
+        handlers: Iterable[Handler] = (publish_reminder,),
+        clock: Callable[[], datetime] = utcnow,
+    ):
+        self.window = timedelta(seconds=window_seconds)
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.lookback = timedelta(seconds=lookback_seconds)
+        self.handlers = list(handlers)
+        self._clock = clock
+        # (due_at, task_id) entries; a task may appear twice if its due date
+        # moved, the claim sorts that out
+        self._heap: List[Tuple[datetime, ObjectId]] = []
+        # Everything pending up to this (due_at, _id) is in the heap
+        self._loaded: Optional[Tuple[datetime, ObjectId]] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.loads = 0
+        self.loaded = 0
+        self.fired = 0
+        self.skipped = 0
+        self.dropped = 0
+
+    @property
+    def horizon(self) -> Optional[datetime]:
+        return self._loaded[0] if self._loaded else None
+
+    def _collection(self):
+        return Task.get_motor_collection()
+
+    # -- loading --------------------------------------------------------
+
+    async def load_window(self, now: datetime) -> int:
+        """
+        Tops the heap up with pending reminders due up to now + window.
+        Returns how many were loaded.
+        """
+        if self._loaded is None:
+            # Reminders missed while no scheduler ran are still sent, up to
+            # `lookback` late
+            self._loaded = (now - self.lookback, MIN_OBJECT_ID)
+        until = now + self.window
+        total = 0
+        while self._loaded[0] < until and len(self._heap) < self.max_pending:
+            last_due, last_id = self._loaded
+            query = {
+                "is_completed": False,
+                "reminded_at": None,
+                "due_at": {"$gte": last_due, "$lte": until},
+                "$or": [{"due_at": {"$gt": last_due}}, {"_id": {"$gt": last_id}}],
+            }
+            limit = min(self.batch_size, self.max_pending - len(self._heap))
+            docs = await self._collection().find(query, projection={"due_at": 1}).sort(
+                [("due_at", 1), ("_id", 1)]
+            ).limit(limit).to_list(length=None)
+            self.loads += 1
+            for doc in docs:
+                heapq.heappush(self._heap, (as_utc(doc["due_at"]), doc["_id"]))
+            total += len(docs)
+            if len(docs) < limit:
+                self._loaded = (until, MAX_OBJECT_ID)
+            else:
+                self._loaded = (as_utc(docs[-1]["due_at"]), docs[-1]["_id"])
+        self.loaded += total
+        return total
+
+    def notify(self, tasks: Iterable[dict]) -> None:
+        """
+        Called by the task write hook with tasks as written. New or moved due
+        dates inside the loaded window go straight onto the heap.
+        """
+        if self._loaded is None:
+            return
+        woke = False
+        oldest = self._clock() - self.lookback
+        for task in tasks:
+            due_at = task.get("due_at")
+            if due_at is None or task.get("is_completed"):
+                continue
+            entry = (as_utc(due_at), ObjectId(str(task["id"])))
+            if not (oldest <= entry[0] and entry <= self._loaded):
+                continue
+            if len(self._heap) >= self.max_pending:
+                # Same cap as load_window: pull the horizon back in front
+                # of this entry instead, so a later load picks it up
+                self._loaded = min(self._loaded, (entry[0], MIN_OBJECT_ID))
+                self.dropped += 1
+                continue
+            heapq.heappush(self._heap, entry)
+            woke = True
+        if woke and self._wakeup is not None:
+            self._wakeup.set()
+
+    # -- firing ---------------------------------------------------------
+
+    async def _claim(self, due_at: datetime, task_id: ObjectId, now: datetime) -> Optional[dict]:
+        return await self._collection().find_one_and_update(
+            {"_id": task_id, "due_at": due_at, "is_completed": False, "reminded_at": None},
+            {"$set": {"reminded_at": now}},
+            projection={**TASK_OUT_PROJECTION, "owner_id": 1, "owner": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def fire_due(self, now: datetime) -> int:
+        """Claims and fires every reminder due by now. Returns how many fired."""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap))
+        fired = 0
+        for start in range(0, len(due), self.batch_size):
+            batch = due[start:start + self.batch_size]
+            claimed = await asyncio.gather(*(self._claim(due_at, task_id, now) for due_at, task_id in batch))
+            for doc in claimed:
+                if doc is None:
+                    # Completed, rescheduled, deleted or fired by another worker
+                    self.skipped += 1
+                    continue
+                owner_id = doc.get("owner_id") or getattr(doc.get("owner"), "id", None)
+                for handler in self.handlers:
+                    try:
+                        handler(owner_id, doc)
+                    except Exception:
+                        logger.exception("Reminder handler failed for task %s", doc["_id"])
+                fired += 1
+        self.fired += fired
+        return fired
+
+    # -- loop -----------------------------------------------------------
+
+    def _seconds_until_next(self, now: datetime) -> float:
+        wake_at = now + self.window / 2
+        if len(self._heap) < self.max_pending and self.horizon is not None:
+            # Load the next window before the current one runs out
+            wake_at = min(wake_at, self.horizon - self.window / 2)
+        if self._heap:
+            wake_at = min(wake_at, self._heap[0][0])
+        return max((wake_at - now).total_seconds(), settings.REMINDER_MIN_SLEEP_SECONDS)
+
+    async def run(self) -> None:
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                now = self._clock()
+                await self.fire_due(now)
+                await self.load_window(now)
+                await self.fire_due(now)
+                timeout = self._seconds_until_next(self._clock())
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Reminder scheduler tick failed")
+                timeout = self.window.total_seconds() / 2
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._wakeup = None
+        self._heap.clear()
+        self._loaded = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "pending_in_memory": len(self._heap),
+            "next_due_at": self._heap[0][0].isoformat() if self._heap else None,
+            "loaded_until": self.horizon.isoformat() if self.horizon else None,
+            "loads": self.loads,
+            "loaded": self.loaded,
+            "fired": self.fired,
+            "skipped": self.skipped,
+            "dropped": self.dropped,
+        }
+
+
+reminder_scheduler = ReminderScheduler(
+    settings.REMINDER_WINDOW_SECONDS,
+    settings.REMINDER_BATCH_SIZE,
+    settings.REMINDER_MAX_PENDING,
+    settings.REMINDER_LOOKBACK_SECONDS,
+)
@@ -0,0 +1,182 @@
+import bisect
+import re
+from collections import OrderedDict, defaultdict
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.config import settings
+
+# In-process, per-user inverted index behind /tasks/search?mode=fuzzy.
+# Query words match indexed terms exactly, as a prefix, or within a small
+# edit distance, so "grocer" and "grocreis" both find "groceries".
+
+_TOKEN = re.compile(r"\w+")
+
+FIELD_WEIGHTS = {"title": 3.0, "tags": 2.0, "description": 1.0}
+EXACT, PREFIX, TYPO = 1.0, 0.7, 0.5
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+def _task_terms(task: dict) -> Dict[str, float]:
+    terms: Dict[str, float] = {}
+    fields = {
+        "title": tokenize(task.get("title")),
+        "description": tokenize(task.get("description")),
+        "tags": [token for tag in task.get("tags") or [] for token in tokenize(tag)],
+    }
+    for field, tokens in fields.items():
+        for token in tokens:
+            terms[token] = terms.get(token, 0.0) + FIELD_WEIGHTS[field]
+    return terms
+
+
+def within_edits(a: str, b: str, max_edits: int) -> bool:
+    """
+    Edit distance (insert, delete, substitute, swap adjacent letters)
+    <= max_edits, giving up as soon as a whole row exceeds it.
+    """
+    if abs(len(a) - len(b)) > max_edits:
+        return False
+    before_previous = None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            cost = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            )
+            if before_previous is not None and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                cost = min(cost, before_previous[j - 2] + 1)
+            current.append(cost)
+        if min(current) > max_edits:
+            return False
+        before_previous, previous = previous, current
+    return previous[-1] <= max_edits
+
+
+class UserSearchIndex:
+    def __init__(self, version: int):
+        # task_version this index reflects (see core/etag.py)
+        self.version = version
+        self.postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self.doc_terms: Dict[str, Dict[str, float]] = {}
+        self._sorted_terms: Optional[List[str]] = None
+
+    def add(self, task: dict):
+        task_id = str(task["id"])
+        self.remove(task_id)
+        terms = _task_terms(task)
+        self.doc_terms[task_id] = terms
+        for term, weight in terms.items():
+            self.postings[term][task_id] = weight
+        self._sorted_terms = None
+
+    def remove(self, task_id: str):
+        for term in self.doc_terms.pop(str(task_id), {}):
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(str(task_id), None)
+                if not posting:
+                    del self.postings[term]
+        self._sorted_terms = None
+
+    def _terms(self) -> List[str]:
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self.postings)
+        return self._sorted_terms
+
+    def _matches(self, word: str, max_typos: int) -> Dict[str, float]:
+        # Best match quality per indexed term for one query word
+        matches: Dict[str, float] = {}
+        if word in self.postings:
+            matches[word] = EXACT
+        terms = self._terms()
+        if len(word) >= 2:
+            start = bisect.bisect_left(terms, word)
+            for term in terms[start:]:
+                if not term.startswith(word):
+                    break
+                matches.setdefault(term, PREFIX)
+        # Short words get no typo allowance; longer ones up to max_typos
+        allowed = min(max_typos, 0 if len(word) < 4 else 1 if len(word) < 8 else 2)
+        if allowed:
+            for term in terms:
+                if term not in matches and within_edits(word, term, allowed):
+                    matches[term] = TYPO
+        return matches
+
+    def search(self, query: str, max_typos: int) -> List[Tuple[str, float]]:
+        scores: Dict[str, float] = defaultdict(float)
+        for word in set(tokenize(query)):
+            best: Dict[str, float] = {}
+            for term, quality in self._matches(word, max_typos).items():
+                for task_id, weight in self.postings[term].items():
+                    best[task_id] = max(best.get(task_id, 0.0), quality * weight)
+            for task_id, score in best.items():
+                scores[task_id] += score
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+class SearchIndexRegistry:
+    """
+    Bounded LRU of per-user indexes. Task writes in this process patch the
+    loaded index in place; if the owner's task_version moved without us
+    (a write served by another worker) the index is rebuilt on next use.
+    """
+
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self._indexes: "OrderedDict[str, UserSearchIndex]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, owner_id, version: int) -> Optional[UserSearchIndex]:
+        with self._lock:
+            index = self._indexes.get(str(owner_id))
+            if index is None or index.version != version:
+                return None
+            self._indexes.move_to_end(str(owner_id))
+            return index
+
+    def build(self, owner_id, version: int, tasks: Iterable[dict]) -> UserSearchIndex:
+        index = UserSearchIndex(version)
+        for task in tasks:
+            index.add(task)
+        with self._lock:
+            self._indexes[str(owner_id)] = index
+            self._indexes.move_to_end(str(owner_id))
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+        return index
+
+    def apply(
+        self,
+        owner_id,
+        new_version: int,
+        created: Iterable[dict] = (),
+        updated: Iterable[Tuple[dict, dict]] = (),
+        deleted: Iterable[dict] = (),
+    ):
+        with self._lock:
+            index = self._indexes.get(str(owner_id))
+            if index is None:
+                return
+            for task in created:
+                index.add(task)
+            for _, after in updated:
+                index.add(after)
+            for task in deleted:
+                index.remove(str(task["id"]))
+            # Only current if this write is the very next version; otherwise
+            # a write elsewhere was missed and the next search rebuilds it
+            index.version = new_version if index.version == new_version - 1 else -1
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+
+search_indexes = SearchIndexRegistry(settings.SEARCH_INDEX_MAX_USERS)
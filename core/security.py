@@ -1,11 +1,18 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Any, Union
 import jwt
 import bcrypt
 from core.config import settings
+from core.metrics import password_hash_duration_seconds
 
 ALGORITHM = settings.ALGORITHM
 
+class HashingPoolBusy(Exception):
+    """Raised when the password hashing queue is full."""
+
 def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
@@ -28,11 +35,67 @@ def create_refresh_token(subject: Union[str, Any], expires_delta: timedelta = No
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     # bcrypt requires bytes
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    started = time.perf_counter()
+    try:
+        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    finally:
+        password_hash_duration_seconds.observe(time.perf_counter() - started, "verify")
 
 def get_password_hash(password: str) -> str:
     # bcrypt requires bytes, hashpw returns bytes
     pwd_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
+    started = time.perf_counter()
     hashed_password = bcrypt.hashpw(pwd_bytes, salt)
+    password_hash_duration_seconds.observe(time.perf_counter() - started, "hash")
     return hashed_password.decode('utf-8')
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    # bcrypt hashes look like "$2b$12$<salt+hash>", the second field is the cost
+    try:
+        rounds = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds != settings.BCRYPT_ROUNDS
+
+# bcrypt releases the GIL while hashing, so a thread pool keeps the event loop
+# free without the pickling overhead of a process pool.
+_hash_executor: ThreadPoolExecutor | None = None
+_hash_slots: asyncio.Semaphore | None = None
+
+def _get_hash_executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(
+            max_workers=settings.HASH_POOL_WORKERS,
+            thread_name_prefix="bcrypt",
+        )
+    return _hash_executor
+
+def _get_hash_slots() -> asyncio.Semaphore:
+    # Workers + queue bound the number of hashes admitted at once
+    global _hash_slots
+    if _hash_slots is None:
+        _hash_slots = asyncio.Semaphore(settings.HASH_POOL_WORKERS + settings.HASH_POOL_MAX_QUEUE)
+    return _hash_slots
+
+async def _run_in_hash_pool(func, *args):
+    slots = _get_hash_slots()
+    if slots.locked():
+        raise HashingPoolBusy()
+    async with slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_hash_executor(), func, *args)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_in_hash_pool(get_password_hash, password)
+
+def shutdown_hash_pool() -> None:
+    global _hash_executor, _hash_slots
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+    _hash_executor = None
+    _hash_slots = None
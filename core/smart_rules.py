@@ -0,0 +1,106 @@
+import json
+import re
+import string
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Data-driven keyword rules behind smart tagging. Priority rules are checked
+# in table order (first match wins); every matching tag rule adds its tag.
+# Keywords match whole words, with common suffixes (s/es/ed/ing) allowed;
+# a keyword containing spaces matches that exact phrase.
+DEFAULT_RULES: List[Dict] = [
+    {"kind": "priority", "value": "high", "keywords": ["urgent", "asap", "deadline", "important", "critical"]},
+    {"kind": "priority", "value": "low", "keywords": ["low", "whenever", "maybe", "eventually"]},
+    {"kind": "tag", "value": "shopping", "keywords": ["buy", "purchase", "shopping", "grocery", "groceries"]},
+    {"kind": "tag", "value": "work", "keywords": ["code", "debug", "api", "database", "deploy"]},
+    {"kind": "tag", "value": "health", "keywords": ["gym", "run", "running", "workout", "health"]},
+    {"kind": "tag", "value": "communication", "keywords": ["call", "email", "meet", "meeting"]},
+]
+
+SUFFIXES = ("s", "es", "ed", "ing")
+
+# ASCII punctuation becomes whitespace so split() yields whole words. Matching
+# runs on UTF-8 bytes: bytes.translate with a flat table is much cheaper than
+# str.translate, and non-ASCII bytes pass through untouched.
+_WORD_SEPARATORS = bytes(32 if chr(byte) in string.punctuation else byte for byte in range(256))
+
+
+def _normalize(text: str) -> bytes:
+    return text.lower().encode("utf-8").translate(_WORD_SEPARATORS)
+
+
+class RuleEngine:
+    """
+    Compiles a rule table into one lookup of every keyword form (keyword plus
+    allowed suffixes) so a task's text is tokenized once and matched with a
+    single set intersection, however many keywords the rules define.
+    Multi-word keywords go through one alternation regex instead.
+    """
+
+    def __init__(self, rules: Iterable[Dict]):
+        self.rules = [self._validate(rule) for rule in rules]
+        self._word_forms: Dict[bytes, List[int]] = {}
+        self._phrase_rules: Dict[bytes, List[int]] = {}
+        for index, rule in enumerate(self.rules):
+            for keyword in rule["keywords"]:
+                keyword = b" ".join(_normalize(keyword).split())
+                if b" " in keyword:
+                    self._phrase_rules.setdefault(keyword, []).append(index)
+                    continue
+                for form in (keyword, *(keyword + suffix.encode() for suffix in SUFFIXES)):
+                    self._word_forms.setdefault(form, []).append(index)
+        self._word_form_keys = frozenset(self._word_forms)
+
+        self._phrase_pattern = None
+        if self._phrase_rules:
+            # Longest first so the most specific phrase wins at a position
+            phrases = sorted(self._phrase_rules, key=len, reverse=True)
+            alternation = b"|".join(re.escape(phrase) for phrase in phrases)
+            self._phrase_pattern = re.compile(rb"\b(" + alternation + rb")\b")
+
+    @staticmethod
+    def _validate(rule: Dict) -> Dict:
+        if rule.get("kind") not in ("priority", "tag"):
+            raise ValueError(f"Rule kind must be 'priority' or 'tag': {rule!r}")
+        if not rule.get("value") or not rule.get("keywords"):
+            raise ValueError(f"Rule needs a value and at least one keyword: {rule!r}")
+        return {"kind": rule["kind"], "value": rule["value"], "keywords": list(rule["keywords"])}
+
+    def extend(self, rules: Iterable[Dict]) -> "RuleEngine":
+        return RuleEngine(self.rules + list(rules))
+
+    def analyze(self, text: str) -> Tuple[Optional[str], Set[str]]:
+        """
+        Returns (priority or None, tags) for the given text.
+        """
+        if not text:
+            return None, set()
+
+        words = _normalize(text).split()
+        matched: Set[int] = set()
+        for form in self._word_form_keys.intersection(words):
+            matched.update(self._word_forms[form])
+        if self._phrase_pattern is not None:
+            for match in self._phrase_pattern.finditer(b" ".join(words)):
+                matched.update(self._phrase_rules[match.group(1)])
+
+        priority = None
+        tags = set()
+        for index in sorted(matched):
+            rule = self.rules[index]
+            if rule["kind"] == "priority":
+                if priority is None:
+                    priority = rule["value"]
+            else:
+                tags.add(rule["value"])
+        return priority, tags
+
+
+def load_rules(path: str) -> List[Dict]:
+    """
+    Reads extra rules from a JSON file: a list of {"kind", "value", "keywords"} objects.
+    """
+    with open(path, encoding="utf-8") as rules_file:
+        rules = json.load(rules_file)
+    if not isinstance(rules, list):
+        raise ValueError(f"{path} must contain a JSON list of rules")
+    return rules
@@ -0,0 +1,64 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimings:
+    """
+    Wall-clock time spent in each startup phase of this process. Phases may
+    nest; a phase's own time excludes the phases recorded inside it, so the
+    breakdown adds up to the total.
+
+    With a preloading launcher, the import-time phases run once in the
+    parent and every worker inherits them; the lifespan phases are per
+    worker.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self._open: List[Tuple[str, float, float]] = []
+
+    def begin(self, name: str) -> None:
+        self._open.append((name, time.perf_counter(), self._recorded()))
+
+    def end(self, name: str) -> float:
+        open_name, started, recorded_before = self._open.pop()
+        if open_name != name:
+            raise RuntimeError(f"Startup phase {name!r} ended while {open_name!r} was open")
+        elapsed = time.perf_counter() - started
+        own = elapsed - (self._recorded() - recorded_before)
+        self.record(name, own)
+        return elapsed
+
+    @contextmanager
+    def phase(self, name: str):
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + max(seconds, 0.0)
+
+    def _recorded(self) -> float:
+        return sum(self.phases.values())
+
+    def report(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "phases_ms": {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()},
+            "total_ms": round(self._recorded() * 1000, 3),
+        }
+
+    def log(self) -> None:
+        report = self.report()
+        breakdown = " ".join(f"{name}={ms:.1f}ms" for name, ms in report["phases_ms"].items())
+        logger.info("Startup of pid %s took %.1fms: %s", report["pid"], report["total_ms"], breakdown)
+
+
+startup_timings = StartupTimings()
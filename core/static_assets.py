@@ -0,0 +1,70 @@
+import gzip
+import hashlib
+from typing import Dict, Optional
+
+import brotli
+from fastapi import Request
+from fastapi.responses import Response
+
+from core.etag import if_none_match, with_coding
+
+# Preferred first when the client accepts several
+ENCODINGS = ("br", "gzip")
+
+
+def accepted_encodings(header: Optional[str]) -> Dict[str, float]:
+    """Parses Accept-Encoding into {coding: q}."""
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class PrecompressedAsset:
+    """
+    A response body built once and compressed once up front (br and gzip)
+    at maximum level, then served per request with content negotiation, a
+    strong ETag per representation and Cache-Control.
+    """
+
+    def __init__(self, body: bytes, media_type: str, cache_control: str):
+        self.media_type = media_type
+        self.cache_control = cache_control
+        etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+        self.variants: Dict[str, tuple[bytes, str]] = {"identity": (body, etag)}
+        compressed = {
+            "br": brotli.compress(body, quality=11),
+            "gzip": gzip.compress(body, compresslevel=9, mtime=0),
+        }
+        for coding, data in compressed.items():
+            # Only worth serving when it actually saves bytes
+            if len(data) < len(body):
+                self.variants[coding] = (data, with_coding(etag, coding))
+
+    def choose(self, accept_encoding: Optional[str]) -> str:
+        accepted = accepted_encodings(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        for coding in ENCODINGS:
+            if coding in self.variants and accepted.get(coding, wildcard) > 0:
+                return coding
+        return "identity"
+
+    def response(self, request: Request) -> Response:
+        coding = self.choose(request.headers.get("accept-encoding"))
+        body, etag = self.variants[coding]
+        headers = {"ETag": etag, "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+        if if_none_match(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        return Response(content=body, media_type=self.media_type, headers=headers)
@@ -0,0 +1,372 @@
+import asyncio
+import json
+import logging
+import os
+from collections import deque
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from core.config import settings
+from schemas.task import TaskOut
+
+logger = logging.getLogger(__name__)
+
+# Per-user feed of task changes behind GET /tasks/stream (SSE) and the
+# WebSocket on the same path, so clients stop polling GET /tasks.
+#
+# Events come from a MongoDB change stream on the tasks collection when the
+# server supports one (replica set / Atlas), which also carries writes made
+# by other workers. On a standalone server the task write hook publishes
+# them in-process instead.
+#
+# Each event is serialized once (SSE and WebSocket frames) and the same
+# frames are handed to every subscriber. Subscribers hold a small bounded
+# buffer; one that falls behind (or resumes from an id the replay ring no
+# longer has) gets a "reset" event and should refetch GET /tasks once.
+
+EVENT_TYPES = {"insert": "created", "update": "updated", "replace": "updated", "delete": "deleted"}
+# ChangeStreamHistoryLost / ChangeStreamFatalError
+HISTORY_LOST_CODES = {280, 286}
+
+
+class Subscription:
+    __slots__ = ("owner", "buffer", "overflowed", "heartbeat_due", "closed", "_wakeup")
+
+    def __init__(self, owner: str, buffer_size: int):
+        self.owner = owner
+        self.buffer: deque = deque(maxlen=buffer_size)
+        self.overflowed = False
+        self.heartbeat_due = False
+        self.closed = False
+        self._wakeup = asyncio.Event()
+
+    def push(self, event: dict) -> None:
+        if len(self.buffer) == self.buffer.maxlen:
+            # Dropping the oldest would silently lose a change; make the
+            # client resync instead
+            self.buffer.clear()
+            self.overflowed = True
+        else:
+            self.buffer.append(event)
+        self._wakeup.set()
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._wakeup.set()
+
+    async def next(self) -> Tuple[str, Optional[dict]]:
+        """
+        Waits for the next thing to send: ("event", event), ("reset", None)
+        after an overflow, ("heartbeat", None) on the feed's heartbeat tick,
+        or ("closed", None) once close() was called.
+        """
+        while True:
+            if self.closed:
+                return "closed", None
+            if self.overflowed:
+                self.overflowed = False
+                return "reset", None
+            if self.buffer:
+                return "event", self.buffer.popleft()
+            if self.heartbeat_due:
+                self.heartbeat_due = False
+                return "heartbeat", None
+            self._wakeup.clear()
+            await self._wakeup.wait()
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+class TaskChangeFeed:
+    """
+    Fans task change events out to per-owner subscribers. Event ids are
+    "<feed id>-<sequence>"; the recent events are kept in a replay ring so
+    a reconnecting client (Last-Event-ID) receives what it missed.
+    """
+
+    def __init__(self, buffer_size: int, replay_size: int, heartbeat_seconds: float, max_subscribers: int):
+        self.buffer_size = buffer_size
+        self.replay_size = replay_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_subscribers = max_subscribers
+        self._reset_state()
+
+    def _reset_state(self) -> None:
+        self.feed_id = os.urandom(4).hex()
+        self._sequence = 0
+        self._replay: deque = deque(maxlen=self.replay_size)
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._count = 0
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._watch_task: Optional[asyncio.Task] = None
+        # True while the change stream is open; the write hook stops
+        # publishing so events aren't delivered twice
+        self.streaming = False
+        self.published = 0
+        self.resets = 0
+        self.unroutable = 0
+        self.failed = 0
+
+    # -- publishing -----------------------------------------------------
+
+    def _event(self, owner: str, event_type: str, task: dict, version: Optional[int]) -> dict:
+        data = {"type": event_type, "task": TaskOut.model_validate(task).model_dump(mode="json")}
+        self._sequence += 1
+        event_id = f"{self.feed_id}-{self._sequence}"
+        if version is not None:
+            data["version"] = version
+        return {
+            "seq": self._sequence,
+            "owner": owner,
+            "sse": f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n",
+            "ws": json.dumps({"id": event_id, **data}),
+        }
+
+    def publish(self, owner_id, event_type: str, task: dict, version: Optional[int] = None) -> None:
+        owner = str(owner_id)
+        event = self._event(owner, event_type, task, version)
+        self._replay.append(event)
+        self.published += 1
+        for subscription in self._subscribers.get(owner, ()):
+            subscription.push(event)
+
+    def publish_changes(
+        self,
+        owner_id,
+        created: Iterable[dict] = (),
+        updated: Iterable[Tuple[dict, dict]] = (),
+        deleted: Iterable[dict] = (),
+        version: Optional[int] = None,
+    ) -> None:
+        """Called by the task write hook; a no-op while the change stream is the source."""
+        if self.streaming:
+            return
+        for task in created:
+            self.publish(owner_id, "created", task, version)
+        for _, after in updated:
+            self.publish(owner_id, "updated", after, version)
+        for task in deleted:
+            self.publish(owner_id, "deleted", task, version)
+
+    # -- subscribing ----------------------------------------------------
+
+    def full(self) -> bool:
+        return self._count >= self.max_subscribers
+
+    def subscribe(self, owner_id, last_event_id: Optional[str] = None) -> Subscription:
+        if self.full():
+            raise TooManySubscribers()
+        owner = str(owner_id)
+        subscription = Subscription(owner, self.buffer_size)
+        if last_event_id:
+            self._replay_into(subscription, last_event_id)
+        self._subscribers.setdefault(owner, set()).add(subscription)
+        self._count += 1
+        self._ensure_heartbeat()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.owner)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        self._count -= 1
+        if not subscribers:
+            del self._subscribers[subscription.owner]
+
+    def reset_all(self) -> None:
+        for subscribers in self._subscribers.values():
+            for subscription in subscribers:
+                subscription.overflowed = True
+                subscription.wake()
+        self.resets += self._count
+
+    def _replay_into(self, subscription: Subscription, last_event_id: str) -> None:
+        feed_id, _, sequence = last_event_id.partition("-")
+        try:
+            after = int(sequence)
+        except ValueError:
+            after = -1
+        oldest = self._replay[0]["seq"] if self._replay else self._sequence + 1
+        # Another worker's (or a previous process's) id, or older than the
+        # ring: we can't tell what was missed
+        if feed_id != self.feed_id or after < oldest - 1 or after > self._sequence:
+            subscription.overflowed = True
+            self.resets += 1
+            return
+        for event in self._replay:
+            if event["seq"] > after and event["owner"] == subscription.owner:
+                subscription.push(event)
+        if subscription.overflowed:
+            self.resets += 1
+
+    # -- heartbeats -----------------------------------------------------
+
+    def _ensure_heartbeat(self) -> None:
+        # One timer for every connection instead of a timeout per connection
+        if self.heartbeat_seconds <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        task = self._heartbeat_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._heartbeat_task = loop.create_task(self._heartbeat())
+
+    async def _heartbeat(self) -> None:
+        while self._count:
+            await asyncio.sleep(self.heartbeat_seconds)
+            for subscribers in list(self._subscribers.values()):
+                for subscription in subscribers:
+                    subscription.heartbeat_due = True
+                    subscription.wake()
+
+    # -- change stream --------------------------------------------------
+
+    def start(self, collection) -> None:
+        """Starts watching the tasks collection (from the app lifespan)."""
+        if settings.CHANGE_FEED_SOURCE == "local" or self._watch_task is not None:
+            return
+        self._watch_task = asyncio.get_running_loop().create_task(self._watch(collection))
+
+    async def stop(self) -> None:
+        tasks = [task for task in (self._watch_task, self._heartbeat_task) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._watch_task = self._heartbeat_task = None
+        self.streaming = False
+
+    def _owner_of(self, doc: Optional[dict]) -> Optional[str]:
+        if not doc:
+            return None
+        if doc.get("owner_id") is not None:
+            return str(doc["owner_id"])
+        legacy = doc.get("owner")
+        return str(legacy.id) if getattr(legacy, "id", None) is not None else None
+
+    def _handle_change(self, change: dict) -> None:
+        event_type = EVENT_TYPES.get(change["operationType"])
+        if event_type is None:
+            return
+        updated_fields = change.get("updateDescription", {}).get("updatedFields", {})
+        if event_type == "updated" and set(updated_fields) == {"reminded_at"}:
+            # The reminder scheduler claiming a due task (core/reminders.py)
+            event_type = "reminder"
+        doc = change.get("fullDocumentBeforeChange") if event_type == "deleted" else change.get("fullDocument")
+        owner = self._owner_of(doc)
+        if owner is None:
+            # A delete without a pre-image, or an update of a task deleted
+            # before the lookup ran (its delete event follows)
+            self.unroutable += 1
+            return
+        self.publish(owner, event_type, doc)
+
+    async def _enable_pre_images(self, collection) -> None:
+        # Deletes only carry the task (and so its owner) with pre-images on;
+        # needs MongoDB 6.0+
+        try:
+            await collection.database.command(
+                "collMod", collection.name, changeStreamPreAndPostImages={"enabled": True}
+            )
+        except PyMongoError as exc:
+            logger.warning("Change stream pre-images unavailable, deletes won't be streamed: %s", exc)
+
+    async def _watch(self, collection) -> None:
+        pipeline = [{"$match": {"operationType": {"$in": list(EVENT_TYPES)}}}]
+        resume_after = None
+        retry_delay = 1.0
+        cancelled = False
+        await self._enable_pre_images(collection)
+        try:
+            while True:
+                try:
+                    async with collection.watch(
+                        pipeline,
+                        full_document="updateLookup",
+                        full_document_before_change="whenAvailable",
+                        resume_after=resume_after,
+                    ) as stream:
+                        self.streaming = True
+                        retry_delay = 1.0
+                        async for change in stream:
+                            resume_after = stream.resume_token
+                            try:
+                                self._handle_change(change)
+                            except Exception:
+                                # One bad document (e.g. a legacy task
+                                # TaskOut rejects) mustn't end the stream
+                                self.failed += 1
+                                logger.exception("Could not publish task change %s", change.get("documentKey"))
+                except asyncio.CancelledError:
+                    cancelled = True
+                    raise
+                except (PyMongoError, NotImplementedError) as exc:
+                    if settings.CHANGE_FEED_SOURCE == "auto" and resume_after is None:
+                        # Standalone server (or no change stream support): the
+                        # write hook keeps publishing in-process
+                        self.streaming = False
+                        logger.info("Change streams unavailable, using in-process task events: %s", exc)
+                        return
+                    if isinstance(exc, OperationFailure) and exc.code in HISTORY_LOST_CODES:
+                        # The oplog moved past our resume token: start afresh
+                        # and have every client resync
+                        resume_after = None
+                        self.reset_all()
+                    # Stays the source meanwhile: resuming from the token
+                    # delivers the writes made during the outage
+                    logger.warning("Task change stream interrupted, retrying in %.0fs: %s", retry_delay, exc)
+                    await asyncio.sleep(retry_delay)
+                    retry_delay = min(retry_delay * 2, 30.0)
+        finally:
+            if not cancelled and self.streaming:
+                # Died on something unexpected: hand publishing back to the
+                # write hook rather than drop every event until a restart.
+                # Whatever the stream had not delivered yet is lost.
+                logger.error("Task change stream stopped, falling back to in-process task events")
+                self.streaming = False
+                self.reset_all()
+
+    def stats(self) -> dict:
+        return {
+            "source": "change_stream" if self.streaming else "local",
+            "subscribers": self._count,
+            "owners": len(self._subscribers),
+            "published": self.published,
+            "replay_events": len(self._replay),
+            "resets": self.resets,
+            "unroutable": self.unroutable,
+            "failed": self.failed,
+        }
+
+
+def sse_frame(kind: str, event: Optional[dict]) -> str:
+    if kind == "event":
+        return event["sse"]
+    if kind == "reset":
+        return 'event: reset\ndata: {"type": "reset"}\n\n'
+    # Comment line: keeps proxies from closing the idle connection
+    return ": heartbeat\n\n"
+
+
+def ws_message(kind: str, event: Optional[dict]) -> str:
+    if kind == "event":
+        return event["ws"]
+    return json.dumps({"type": kind})
+
+
+task_change_feed = TaskChangeFeed(
+    settings.CHANGE_FEED_BUFFER_SIZE,
+    settings.CHANGE_FEED_REPLAY_SIZE,
+    settings.CHANGE_FEED_HEARTBEAT_SECONDS,
+    settings.CHANGE_FEED_MAX_SUBSCRIBERS,
+)
+
+# A preloading launcher imports this module once and then forks: give each
+# worker its own feed id, or workers would hand out clashing event ids
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=task_change_feed._reset_state)
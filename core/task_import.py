@@ -0,0 +1,106 @@
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, Tuple, Union
+
+
+class RowTooLarge(Exception):
+    """Raised when a single upload row exceeds the configured size."""
+
+
+async def iter_lines(stream: AsyncIterator[bytes], max_row_bytes: int) -> AsyncIterator[str]:
+    """
+    Splits a byte stream into text lines as chunks arrive, holding at most
+    one partial line in memory.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in stream:
+        pending += decoder.decode(chunk)
+        if "\n" in pending:
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                # Same limit whether the line arrived whole or in pieces
+                if len(line) > max_row_bytes:
+                    raise RowTooLarge()
+                yield line.rstrip("\r")
+        if len(pending) > max_row_bytes:
+            raise RowTooLarge()
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def _iter_csv_records(lines: AsyncIterator[str], max_row_bytes: int) -> AsyncIterator[str]:
+    # A quoted field may span lines: keep joining until the quotes balance
+    record = None
+    async for line in lines:
+        record = line if record is None else record + "\n" + line
+        if record.count('"') % 2 == 0:
+            yield record
+            record = None
+        elif len(record) > max_row_bytes:
+            raise RowTooLarge()
+    if record is not None:
+        yield record
+
+
+def _csv_row_to_task(header: list, values: list) -> Dict[str, Any]:
+    row = {key: value for key, value in zip(header, values) if value != ""}
+    # Export writes ids/created_at; imported tasks always get fresh ones
+    row.pop("id", None)
+    row.pop("created_at", None)
+    if "tags" in row:
+        row["tags"] = [tag.strip() for tag in row["tags"].replace(",", ";").split(";") if tag.strip()]
+    return row
+
+
+async def iter_import_rows(
+    stream: AsyncIterator[bytes],
+    import_format: str,
+    max_row_bytes: int,
+) -> AsyncIterator[Tuple[int, Union[Dict[str, Any], ValueError]]]:
+    """
+    Yields (row_number, row) for every data row of an NDJSON or CSV upload.
+    Rows that can't be parsed come back as a ValueError instead of aborting
+    the whole import. Row numbers are 1-based and exclude the CSV header.
+    """
+    lines = iter_lines(stream, max_row_bytes)
+    row_number = 0
+
+    if import_format == "csv":
+        header = None
+        async for record in _iter_csv_records(lines, max_row_bytes):
+            if not record.strip():
+                continue
+            try:
+                values = next(csv.reader([record]))
+            except csv.Error as exc:
+                values = exc
+            if header is None:
+                if isinstance(values, Exception):
+                    raise ValueError("Could not read the CSV header row")
+                header = [name.strip() for name in values]
+                continue
+            row_number += 1
+            if isinstance(values, Exception):
+                yield row_number, ValueError(f"Malformed CSV row: {values}")
+            else:
+                yield row_number, _csv_row_to_task(header, values)
+        return
+
+    async for line in lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield row_number, ValueError(f"Invalid JSON: {exc.msg}")
+            continue
+        if not isinstance(row, dict):
+            yield row_number, ValueError("Each line must be a JSON object")
+            continue
+        row.pop("id", None)
+        row.pop("created_at", None)
+        yield row_number, row
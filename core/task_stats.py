@@ -0,0 +1,189 @@
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from core.config import settings
+from models.task import Task, owner_filter
+from models.task_stats import TaskStats
+
+logger = logging.getLogger(__name__)
+
+# Counters are kept in step with task writes using $inc deltas; the
+# reconciliation below recomputes them from the tasks collection to repair
+# any drift (e.g. a crash between a task write and its counter update).
+# Every delta also bumps the document's revision, so a reconciliation only
+# rewrites counters that no delta touched while it was counting.
+
+# Attempts per owner before a reconciliation leaves a busy owner's
+# counters for the next run
+RECONCILE_ATTEMPTS = 3
+
+def _priority_key(priority: Optional[str]) -> str:
+    # Priorities are free-form strings; keep them safe as field names
+    if not priority or "." in priority or priority.startswith("$"):
+        return "other"
+    return priority
+
+def _add(delta: Counter, task: dict, sign: int):
+    delta["total"] += sign
+    if task.get("is_completed"):
+        delta["completed"] += sign
+    delta[f"by_priority.{_priority_key(task.get('priority'))}"] += sign
+
+def changes_delta(
+    created: Iterable[dict] = (),
+    updated: Iterable[Tuple[dict, dict]] = (),
+    deleted: Iterable[dict] = (),
+) -> Dict[str, int]:
+    """
+    Net $inc document for a batch of task writes. Updates count as removing
+    the old state and adding the new one, so only completion/priority
+    transitions leave a non-zero delta.
+    """
+    delta: Counter = Counter()
+    for task in created:
+        _add(delta, task, 1)
+    for before, after in updated:
+        _add(delta, before, -1)
+        _add(delta, after, 1)
+    for task in deleted:
+        _add(delta, task, -1)
+    return {field: value for field, value in delta.items() if value}
+
+async def apply_delta(owner_id, delta: Dict[str, int]):
+    if not delta:
+        return
+    result = await TaskStats.get_motor_collection().update_one(
+        {"_id": owner_id},
+        {"$inc": {**delta, "revision": 1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+    )
+    if result.matched_count == 0:
+        # No counters yet (a new user, or tasks from before counters
+        # existed): count everything once, including this write. An upsert
+        # would start them at this one delta.
+        await reconcile(owner_id)
+
+def _empty() -> dict:
+    return {"total": 0, "completed": 0, "by_priority": {}}
+
+async def _compute(owner_id=None) -> Dict:
+    # One aggregation pass: counts per (owner, priority)
+    pipeline = []
+    if owner_id is not None:
+        pipeline.append({"$match": owner_filter(owner_id)})
+        group_owner = {"$literal": owner_id}
+    else:
+        # Tasks not yet migrated to owner_id fall back to their owner DBRef;
+        # "$owner.$id" isn't a valid expression path ($-prefixed field name)
+        group_owner = {"$ifNull": ["$owner_id", {"$getField": {"field": {"$literal": "$id"}, "input": "$owner"}}]}
+    pipeline.append({
+        "$group": {
+            "_id": {"owner": group_owner, "priority": "$priority"},
+            "total": {"$sum": 1},
+            "completed": {"$sum": {"$cond": ["$is_completed", 1, 0]}},
+        }
+    })
+    computed = defaultdict(_empty)
+    async for row in Task.get_motor_collection().aggregate(pipeline):
+        counters = computed[row["_id"]["owner"]]
+        counters["total"] += row["total"]
+        counters["completed"] += row["completed"]
+        key = _priority_key(row["_id"].get("priority"))
+        counters["by_priority"][key] = counters["by_priority"].get(key, 0) + row["total"]
+    return computed
+
+def _same(stored: dict, expected: dict) -> bool:
+    stored_priorities = {k: v for k, v in stored.get("by_priority", {}).items() if v}
+    return (
+        stored.get("total", 0) == expected["total"]
+        and stored.get("completed", 0) == expected["completed"]
+        and stored_priorities == expected["by_priority"]
+    )
+
+async def _rewrite(owner, stored: Optional[dict], expected: dict) -> bool:
+    """
+    Replaces the counters with the recomputed ones, unless a delta was applied
+    since `stored` was read (that write would be lost). Returns False then.
+    """
+    collection = TaskStats.get_motor_collection()
+    now = datetime.now(timezone.utc)
+    if stored is None:
+        try:
+            await collection.insert_one({"_id": owner, **expected, "revision": 0, "updated_at": now})
+        except DuplicateKeyError:
+            return False
+        return True
+    result = await collection.update_one(
+        # None also matches documents from before the revision field
+        {"_id": owner, "revision": stored.get("revision")},
+        {"$set": {**expected, "updated_at": now}, "$inc": {"revision": 1}},
+    )
+    return result.modified_count == 1
+
+async def reconcile(owner_id=None) -> Dict[str, int]:
+    """
+    Recomputes counters from the tasks collection and rewrites the ones that
+    drifted. Pass owner_id to repair a single user.
+    """
+    collection = TaskStats.get_motor_collection()
+    stored_query = {"_id": owner_id} if owner_id is not None else {}
+    # Read before counting: a delta applied after this changes the revision
+    stored_docs = {doc["_id"]: doc async for doc in collection.find(stored_query)}
+    computed = await _compute(owner_id)
+    checked = repaired = 0
+
+    # Owners with tasks but no counters document yet are included
+    for owner in [*stored_docs, *(owner for owner in computed if owner not in stored_docs)]:
+        checked += 1
+        stored, expected = stored_docs.get(owner), computed.get(owner, _empty())
+        for _ in range(RECONCILE_ATTEMPTS):
+            if stored is not None and _same(stored, expected):
+                break
+            if await _rewrite(owner, stored, expected):
+                repaired += 1
+                break
+            # A task write landed meanwhile: count this owner again
+            stored = await collection.find_one({"_id": owner})
+            expected = (await _compute(owner)).get(owner, _empty())
+        else:
+            logger.warning("Task stats for %s kept changing during reconciliation; left for the next run", owner)
+
+    return {"checked": checked, "repaired": repaired}
+
+async def get_stats(owner_id) -> dict:
+    doc = await TaskStats.get_motor_collection().find_one({"_id": owner_id})
+    if doc is None:
+        # First request for this user (or counters predate this feature)
+        await reconcile(owner_id)
+        doc = await TaskStats.get_motor_collection().find_one_and_update(
+            {"_id": owner_id},
+            {"$setOnInsert": {**_empty(), "revision": 0, "updated_at": datetime.now(timezone.utc)}},
+            upsert=True,
+            return_document=True,
+        )
+    total = doc.get("total", 0)
+    completed = doc.get("completed", 0)
+    return {
+        "total": total,
+        "completed": completed,
+        "open": total - completed,
+        "by_priority": {k: v for k, v in doc.get("by_priority", {}).items() if v},
+    }
+
+async def reconcile_periodically():
+    """
+    Background loop started from the app lifespan when
+    STATS_RECONCILE_INTERVAL_SECONDS is set.
+    """
+    while True:
+        await asyncio.sleep(settings.STATS_RECONCILE_INTERVAL_SECONDS)
+        try:
+            result = await reconcile()
+            if result["repaired"]:
+                logger.warning("Task stats reconciliation repaired %s of %s counters", result["repaired"], result["checked"])
+        except Exception:
+            logger.exception("Task stats reconciliation failed")
@@ -1,29 +1,33 @@
-from typing import List
+from typing import Iterable, List, Optional, Tuple
+
+from core.config import settings
+from core.smart_rules import DEFAULT_RULES, RuleEngine, load_rules
+
+def _build_engine() -> RuleEngine:
+    rules = list(DEFAULT_RULES)
+    if settings.SMART_RULES_FILE:
+        rules += load_rules(settings.SMART_RULES_FILE)
+    return RuleEngine(rules)
+
+# Compiled once at import; every create reuses the same matcher
+rule_engine = _build_engine()
 
 def enhance_task_context(title: str, description: str, current_tags: List[str]) -> tuple[str, List[str]]:
     """
     Analyzes task content to infer priority and suggest tags.
     Returns (priority, tags).
     """
-    priority = "medium"
-    new_tags = set(current_tags)
-    
-    text = (title + " " + (description or "")).lower()
-    
-    # Priority Logic
-    if any(word in text for word in ["urgent", "asap", "deadline", "important", "critical"]):
-        priority = "high"
-    elif any(word in text for word in ["low", "whenever", "maybe", "eventually"]):
-        priority = "low"
-    
-    # Tag Logic
-    if any(word in text for word in ["buy", "purchase", "shopping", "grocery"]):
-        new_tags.add("shopping")
-    if any(word in text for word in ["code", "debug", "api", "database", "deploy"]):
-        new_tags.add("work")
-    if any(word in text for word in ["gym", "run", "workout", "health"]):
-        new_tags.add("health")
-    if any(word in text for word in ["call", "email", "meet", "meeting"]):
-        new_tags.add("communication")
-        
-    return priority, list(new_tags)
+    priority, tags = rule_engine.analyze(title + " " + (description or ""))
+    return priority or "medium", list(tags.union(current_tags))
+
+def enhance_many(items: Iterable[Tuple[str, Optional[str], List[str]]]) -> List[tuple[str, List[str]]]:
+    """
+    Batch version of enhance_task_context for bulk creates and imports.
+    Takes (title, description, tags) tuples and returns (priority, tags) in the same order.
+    """
+    analyze = rule_engine.analyze
+    results = []
+    for title, description, tags in items:
+        priority, inferred = analyze(title + " " + (description or ""))
+        results.append((priority or "medium", list(inferred.union(tags))))
+    return results
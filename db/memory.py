@@ -0,0 +1,41 @@
+"""
+In-memory, Motor-compatible MongoDB stand-in (mongomock-motor) for the load
+test harness and for running the test suite without a MongoDB server
+(USE_MEMORY_MONGO=1). Not for production: no $text search, no change
+streams, and every operation runs synchronously in-process.
+"""
+
+
+def create_memory_client():
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError as exc:
+        raise RuntimeError(
+            "The in-memory MongoDB stand-in needs the dev dependency mongomock-motor "
+            "(uv sync, or pip install mongomock-motor)"
+        ) from exc
+    _patch_dbref_paths()
+    return AsyncMongoMockClient()
+
+
+_patched = False
+
+
+def _patch_dbref_paths():
+    # Legacy tasks store their owner as a DBRef, queried as "owner.$id"; mongomock
+    # doesn't look inside DBRef values, so expose them as plain documents.
+    global _patched
+    if _patched:
+        return
+    from bson import DBRef
+    from mongomock import filtering
+
+    original = filtering.iter_key_candidates
+
+    def iter_key_candidates(key, doc):
+        if isinstance(doc, DBRef):
+            doc = doc.as_doc()
+        return original(key, doc)
+
+    filtering.iter_key_candidates = iter_key_candidates
+    _patched = True
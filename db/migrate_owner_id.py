@@ -0,0 +1,211 @@
+"""
+Backfills tasks.owner_id from the legacy "owner" DBRef, online.
+
+Tasks are walked in _id order in small batches. Each batch is one unordered
+bulk_write whose updates only touch documents still missing owner_id, so it
+is safe to run while the API serves traffic (new tasks are written with
+owner_id already). After every batch the last _id is saved in the
+"migrations" collection, so an interrupted run resumes where it stopped.
+Progress is printed as one JSON line per batch.
+
+Run from the project root:
+    python -m db.migrate_owner_id                     # backfill (resumes)
+    python -m db.migrate_owner_id --status            # progress only
+    python -m db.migrate_owner_id --batch-size 200 --pause 0.5
+    python -m db.migrate_owner_id --finalize          # once complete
+
+--finalize checks that nothing is left, then drops the legacy owner.$id
+indexes. Set TASK_OWNER_LEGACY_FALLBACK=false (and restart the API) first:
+the fallback queries rely on those indexes, and the API declares them for
+as long as the fallback is on. --finalize refuses to run until it is off.
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from bson import DBRef
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+
+from core.config import settings
+from models.task import LEGACY_OWNER_INDEXES
+
+MIGRATIONS_COLLECTION = "migrations"
+MIGRATION_ID = "tasks_owner_id"
+
+# Indexes keyed on the DBRef, replaced by the owner_id ones in models/task.py
+LEGACY_TASK_INDEXES = [index.document["name"] for index in LEGACY_OWNER_INDEXES]
+# A collection can only have one text index, so this one has to go before
+# the owner_id text index can be built
+LEGACY_TEXT_INDEX = "owner_text"
+
+PENDING = {"owner_id": {"$exists": False}}
+
+
+async def drop_legacy_text_index(tasks: AsyncIOMotorCollection) -> bool:
+    """Called at startup, before Beanie creates the owner_id text index."""
+    try:
+        await tasks.drop_index(LEGACY_TEXT_INDEX)
+    except OperationFailure:
+        # Already gone (or the collection doesn't exist yet)
+        return False
+    return True
+
+
+async def load_checkpoint(db: AsyncIOMotorDatabase) -> dict:
+    checkpoint = await db[MIGRATIONS_COLLECTION].find_one({"_id": MIGRATION_ID})
+    return checkpoint or {"_id": MIGRATION_ID, "last_id": None, "migrated": 0, "orphaned": 0}
+
+
+async def save_checkpoint(db: AsyncIOMotorDatabase, checkpoint: dict) -> None:
+    checkpoint["updated_at"] = datetime.now(timezone.utc)
+    await db[MIGRATIONS_COLLECTION].replace_one({"_id": MIGRATION_ID}, checkpoint, upsert=True)
+
+
+async def migrate_batch(tasks: AsyncIOMotorCollection, last_id, batch_size: int, drop_dbref: bool) -> tuple:
+    """
+    Backfills the next batch after last_id. Returns (docs seen, docs
+    migrated, docs without a usable owner, last _id seen).
+    """
+    query = dict(PENDING)
+    if last_id is not None:
+        query["_id"] = {"$gt": last_id}
+    docs = await tasks.find(query, projection={"owner": 1}).sort("_id", 1).limit(batch_size).to_list(length=None)
+    if not docs:
+        return 0, 0, 0, last_id
+
+    operations, orphaned = [], 0
+    for doc in docs:
+        owner = doc.get("owner")
+        if not isinstance(owner, DBRef):
+            orphaned += 1
+            continue
+        update = {"$set": {"owner_id": owner.id}}
+        if drop_dbref:
+            update["$unset"] = {"owner": ""}
+        # Re-check PENDING so a concurrent write that set owner_id wins
+        operations.append(UpdateOne({"_id": doc["_id"], **PENDING}, update))
+
+    migrated = 0
+    if operations:
+        result = await tasks.bulk_write(operations, ordered=False)
+        migrated = result.modified_count
+    return len(docs), migrated, orphaned, docs[-1]["_id"]
+
+
+async def run(
+    db: AsyncIOMotorDatabase,
+    batch_size: int,
+    pause: float,
+    max_batches: Optional[int] = None,
+    drop_dbref: bool = False,
+    restart: bool = False,
+    report=print,
+) -> dict:
+    tasks = db["tasks"]
+    checkpoint = await load_checkpoint(db)
+    if restart:
+        checkpoint.update(last_id=None, migrated=0, orphaned=0, completed_at=None)
+    checkpoint.setdefault("started_at", datetime.now(timezone.utc))
+
+    remaining = await tasks.count_documents(PENDING)
+    batches = 0
+    started = time.monotonic()
+    while max_batches is None or batches < max_batches:
+        seen, migrated, orphaned, last_id = await migrate_batch(tasks, checkpoint["last_id"], batch_size, drop_dbref)
+        if not seen:
+            checkpoint["completed_at"] = datetime.now(timezone.utc)
+            break
+        batches += 1
+        checkpoint.update(
+            last_id=last_id,
+            migrated=checkpoint["migrated"] + migrated,
+            orphaned=checkpoint["orphaned"] + orphaned,
+            completed_at=None,
+        )
+        await save_checkpoint(db, checkpoint)
+        remaining = max(remaining - migrated, 0)
+        elapsed = time.monotonic() - started
+        report(json.dumps({
+            "batch": batches,
+            "migrated": checkpoint["migrated"],
+            "orphaned": checkpoint["orphaned"],
+            "remaining_estimate": remaining,
+            "docs_per_second": round(checkpoint["migrated"] / elapsed, 1) if elapsed else None,
+            "last_id": str(last_id),
+        }))
+        # Throttle so the backfill doesn't crowd out live traffic
+        if pause:
+            await asyncio.sleep(pause)
+
+    await save_checkpoint(db, checkpoint)
+    return await status(db)
+
+
+async def status(db: AsyncIOMotorDatabase) -> dict:
+    checkpoint = await load_checkpoint(db)
+    return {
+        "migration": MIGRATION_ID,
+        "migrated": checkpoint["migrated"],
+        "orphaned": checkpoint["orphaned"],
+        "remaining": await db["tasks"].count_documents(PENDING),
+        "last_id": str(checkpoint["last_id"]) if checkpoint["last_id"] is not None else None,
+        "started_at": checkpoint.get("started_at"),
+        "completed_at": checkpoint.get("completed_at"),
+    }
+
+
+async def finalize(db: AsyncIOMotorDatabase) -> dict:
+    if settings.TASK_OWNER_LEGACY_FALLBACK:
+        raise RuntimeError("set TASK_OWNER_LEGACY_FALLBACK=false first; the fallback queries need the legacy indexes")
+    remaining = await db["tasks"].count_documents({**PENDING, "owner": {"$type": "object"}})
+    if remaining:
+        raise RuntimeError(f"{remaining} tasks still have no owner_id; run the backfill first")
+    dropped = []
+    for name in LEGACY_TASK_INDEXES:
+        try:
+            await db["tasks"].drop_index(name)
+            dropped.append(name)
+        except OperationFailure:
+            pass
+    return {"dropped_indexes": dropped}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.1, help="seconds to sleep between batches")
+    parser.add_argument("--max-batches", type=int, default=None, help="stop after this many batches (resume later)")
+    parser.add_argument("--drop-dbref", action="store_true", help="also $unset the legacy owner DBRef")
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint and start over")
+    parser.add_argument("--status", action="store_true", help="print progress and exit")
+    parser.add_argument("--finalize", action="store_true", help="drop the legacy owner.$id indexes")
+    args = parser.parse_args()
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+
+    async def execute():
+        client = AsyncIOMotorClient(settings.MONGODB_URL)
+        db = client[settings.DB_NAME]
+        try:
+            if args.status:
+                return await status(db)
+            if args.finalize:
+                return await finalize(db)
+            return await run(db, args.batch_size, args.pause, args.max_batches, args.drop_dbref, args.restart)
+        finally:
+            client.close()
+
+    try:
+        result = asyncio.run(execute())
+    except RuntimeError as exc:
+        parser.exit(1, f"error: {exc}\n")
+    print(json.dumps(result, default=str, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,61 @@
+import asyncio
+from typing import Any, Dict
+
 from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
 from core.config import settings
+from core.startup import startup_timings
+from db.migrate_owner_id import drop_legacy_text_index
+from db.monitoring import command_metrics, index_command_timer, pool_monitor, slow_query_monitor
 from models.user import User
 from models.task import Task
+from models.task_stats import TaskStats
+from models.idempotency import IdempotencyRecord
+
+DOCUMENT_MODELS = [User, Task, TaskStats, IdempotencyRecord]
+
+def mongo_client_options() -> Dict[str, Any]:
+    # Driver keyword options from settings; None means "driver default"
+    options = {
+        "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+        "maxConnecting": settings.MONGODB_MAX_CONNECTING,
+        "maxIdleTimeMS": settings.MONGODB_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGODB_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGODB_SOCKET_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        "compressors": ",".join(settings.MONGODB_COMPRESSORS) or None,
+        "zlibCompressionLevel": settings.MONGODB_ZLIB_COMPRESSION_LEVEL,
+        "readPreference": settings.MONGODB_READ_PREFERENCE,
+        "appname": settings.MONGODB_APP_NAME or settings.PROJECT_NAME,
+    }
+    return {key: value for key, value in options.items() if value is not None}
+
+async def init_db() -> AsyncIOMotorClient:
+    """
+    Creates the application's Motor client and initializes Beanie on it.
+    The caller owns the client and must close() it on shutdown.
+    """
+    # Called from the app lifespan, i.e. in each worker after any fork: a
+    # Motor client must never be shared across processes
+    with startup_timings.phase("connect"):
+        client = AsyncIOMotorClient(
+            settings.MONGODB_URL,
+            event_listeners=[slow_query_monitor, command_metrics, pool_monitor, index_command_timer],
+            **mongo_client_options(),
+        )
+        slow_query_monitor.attach(client, asyncio.get_running_loop())
+        # The owner_id text index replaces the legacy one (one text index
+        # per collection). Also the first round trip, so it includes
+        # server selection and the first connection.
+        await drop_legacy_text_index(client[settings.DB_NAME][Task.Settings.name])
+    with startup_timings.phase("init_beanie"):
+        index_seconds = index_command_timer.seconds
+        await init_beanie(database=client[settings.DB_NAME], document_models=DOCUMENT_MODELS)
+        startup_timings.record("indexes", index_command_timer.seconds - index_seconds)
+    return client
 
-async def init_db():
-    client = AsyncIOMotorClient(settings.MONGODB_URL)
-    await init_beanie(database=client[settings.DB_NAME], document_models=[User, Task])
+def close_db(client: AsyncIOMotorClient) -> None:
+    slow_query_monitor.attach(None, None)
+    client.close()
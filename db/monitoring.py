@@ -0,0 +1,414 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import Counter, OrderedDict, deque
+from datetime import datetime, timezone
+from threading import Lock, local
+from typing import Any, Callable, Dict, List, Optional
+
+from bson import json_util
+from pymongo import monitoring
+
+from core.config import settings
+from core.metrics import mongodb_command_duration_seconds
+
+logger = logging.getLogger(__name__)
+
+# Commands that support explain; everything else (getMore, hello, ...) is ignored
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+
+# Driver/session fields that explain rejects or that only add noise
+_COMMAND_NOISE = {"lsid", "txnNumber", "$clusterTime", "$db", "$readPreference", "autocommit", "startTransaction"}
+
+
+def _clean_command(command: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in command.items() if key not in _COMMAND_NOISE}
+
+
+def _shape(value: Any) -> Any:
+    # Field names and operators, without the values
+    if isinstance(value, dict):
+        return frozenset((key, _shape(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return frozenset(_shape(item) for item in value)
+    return None
+
+
+def query_shape(command_name: str, command: Dict[str, Any], database_name: str) -> tuple:
+    """
+    Commands with the same shape (collection, filter and sort fields) almost
+    always get the same plan, so one explain per shape is enough.
+    """
+    spec = command.get("filter") or command.get("query") or {}
+    if command_name == "aggregate":
+        spec = next((stage["$match"] for stage in command.get("pipeline", []) if "$match" in stage), {})
+    elif command_name in ("update", "delete"):
+        statements = command.get("updates") or command.get("deletes") or [{}]
+        spec = statements[0].get("q", {})
+    return database_name, command_name, command.get(command_name), _shape(spec), _shape(command.get("sort", {}))
+
+
+def _iter_stages(plan: Any):
+    # Plans nest through inputStage / inputStages / queryPlan (SBE) etc.
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _iter_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _iter_stages(item)
+
+
+def summarize_explain(explain: Dict[str, Any], max_docs_ratio: float) -> Dict[str, Any]:
+    """
+    Reduces an executionStats explain result to the winning plan stages and
+    the docs examined vs returned numbers, flagging collection scans and
+    queries that read far more documents than they return.
+    """
+    planner = explain.get("queryPlanner")
+    stats = explain.get("executionStats", {})
+    if planner is None and explain.get("stages"):
+        # aggregate: the query part lives under the first $cursor stage
+        cursor_stage = explain["stages"][0].get("$cursor", {})
+        planner = cursor_stage.get("queryPlanner", {})
+        stats = cursor_stage.get("executionStats", {})
+    planner = planner or {}
+
+    stages = list(_iter_stages(planner.get("winningPlan", {})))
+    docs_examined = stats.get("totalDocsExamined")
+    n_returned = stats.get("nReturned")
+
+    flags = []
+    if "COLLSCAN" in stages:
+        flags.append("COLLSCAN")
+    ratio = None
+    if docs_examined is not None and n_returned is not None:
+        ratio = docs_examined / max(n_returned, 1)
+        if ratio > max_docs_ratio:
+            flags.append("HIGH_DOCS_EXAMINED_RATIO")
+
+    return {
+        "stages": stages,
+        "docs_examined": docs_examined,
+        "keys_examined": stats.get("totalKeysExamined"),
+        "n_returned": n_returned,
+        "docs_examined_ratio": round(ratio, 2) if ratio is not None else None,
+        "flags": flags,
+    }
+
+
+class SlowQueryMonitor(monitoring.CommandListener):
+    """
+    pymongo command listener that records commands slower than a threshold
+    into a bounded ring buffer and, for a sample of them, runs explain to
+    capture the winning plan. Each query shape is explained at most once per
+    explain_interval_seconds; its other slow runs reuse that plan, so one hot
+    slow query doesn't add an explain to every execution.
+    """
+
+    # Query shapes remembered for the explain interval
+    MAX_SHAPES = 1000
+
+    def __init__(
+        self,
+        threshold_ms: float,
+        log_size: int,
+        explain_sample_rate: float,
+        max_docs_ratio: float,
+        explain_interval_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.threshold_ms = threshold_ms
+        self.explain_sample_rate = explain_sample_rate
+        self.max_docs_ratio = max_docs_ratio
+        self.explain_interval_seconds = explain_interval_seconds
+        self._clock = clock
+        self.entries: deque = deque(maxlen=log_size)
+        # shape -> [explained at, plan summary (None until the explain returns)]
+        self._shapes: "OrderedDict[tuple, list]" = OrderedDict()
+        self._pending: Dict[tuple, tuple] = {}
+        self._lock = Lock()
+        self._client = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def attach(self, client, loop: asyncio.AbstractEventLoop) -> None:
+        # Explains are sent through the app's Motor client on its event loop
+        self._client = client
+        self._loop = loop
+
+    # pymongo may call these from driver threads, so they only touch
+    # thread-safe state and hand the explain over to the event loop.
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name not in EXPLAINABLE_COMMANDS:
+            return
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (
+                event.command_name,
+                _clean_command(event.command),
+                event.database_name,
+            )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < self.threshold_ms:
+            return
+        command_name, command, database_name = pending
+        self._record(command_name, command, database_name, duration_ms)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        with self._lock:
+            self._pending.pop((event.connection_id, event.request_id), None)
+
+    def _record(self, command_name: str, command: Dict[str, Any], database_name: str, duration_ms: float) -> None:
+        entry = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "command_name": command_name,
+            "database": database_name,
+            "collection": command.get(command_name),
+            "duration_ms": round(duration_ms, 3),
+            # Extended JSON keeps ObjectIds/datetimes readable in the admin API
+            "command": json.loads(json_util.dumps(command)),
+            "plan": None,
+        }
+        self.entries.append(entry)
+        logger.warning("Slow %s on %s.%s took %.1fms", command_name, database_name, entry["collection"], duration_ms)
+
+        if (
+            self._client is None
+            or self._loop is None
+            or self._loop.is_closed()
+            or random.random() >= self.explain_sample_rate
+        ):
+            return
+        shape = query_shape(command_name, command, database_name)
+        now = self._clock()
+        with self._lock:
+            explained = self._shapes.get(shape)
+            if explained is not None and now - explained[0] < self.explain_interval_seconds:
+                entry["plan"] = explained[1]
+                return
+            explained = self._shapes[shape] = [now, None]
+            self._shapes.move_to_end(shape)
+            while len(self._shapes) > self.MAX_SHAPES:
+                self._shapes.popitem(last=False)
+        asyncio.run_coroutine_threadsafe(self._explain(entry, command, database_name, explained), self._loop)
+
+    async def _explain(self, entry: Dict[str, Any], command: Dict[str, Any], database_name: str, explained: list) -> None:
+        try:
+            result = await self._client[database_name].command(
+                {"explain": command, "verbosity": "executionStats"}
+            )
+        except Exception as exc:
+            entry["plan"] = explained[1] = {"error": str(exc)}
+            return
+        entry["plan"] = explained[1] = summarize_explain(result, self.max_docs_ratio)
+        if entry["plan"]["flags"]:
+            logger.warning("Slow %s on %s flagged %s", entry["command_name"], entry["collection"], entry["plan"]["flags"])
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        # Newest first
+        return list(reversed(self.entries))[:limit]
+
+    def clear(self) -> None:
+        self.entries.clear()
+        with self._lock:
+            self._shapes.clear()
+
+
+slow_query_monitor = SlowQueryMonitor(
+    threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+    log_size=settings.SLOW_QUERY_LOG_SIZE,
+    explain_sample_rate=settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+    max_docs_ratio=settings.SLOW_QUERY_MAX_DOCS_RATIO,
+    explain_interval_seconds=settings.SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS,
+)
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Feeds every command's driver-measured duration into the /metrics histogram."""
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        mongodb_command_duration_seconds.observe(event.duration_micros / 1e6, event.command_name, "success")
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        mongodb_command_duration_seconds.observe(event.duration_micros / 1e6, event.command_name, "failure")
+
+
+command_metrics = CommandMetricsListener()
+
+
+INDEX_COMMANDS = {"createIndexes", "listIndexes", "dropIndexes"}
+
+
+class IndexCommandTimer(monitoring.CommandListener):
+    """
+    Totals the driver-measured time of index management commands, so the
+    startup breakdown can show index creation apart from the rest of
+    init_beanie.
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+        self._lock = Lock()
+
+    def _add(self, event) -> None:
+        if event.command_name in INDEX_COMMANDS:
+            with self._lock:
+                self.seconds += event.duration_micros / 1e6
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._add(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._add(event)
+
+
+index_command_timer = IndexCommandTimer()
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class ConnectionPoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    pymongo pool listener that keeps per-server connection counts (open,
+    checked out, peak checked out) and how long checkouts waited for a
+    connection, so the pool can be sized against the number of workers.
+    """
+
+    def __init__(self, wait_sample_size: int = 1024):
+        self.wait_sample_size = wait_sample_size
+        self._pools: Dict[Any, Dict[str, Any]] = {}
+        self._lock = Lock()
+        # Checkouts block the calling driver thread, so start times are
+        # tracked per thread and per server.
+        self._checkout_started = local()
+
+    def _pool(self, address) -> Dict[str, Any]:
+        pool = self._pools.get(address)
+        if pool is None:
+            pool = self._pools[address] = {
+                "options": {},
+                "open": 0,
+                "in_use": 0,
+                "max_in_use": 0,
+                "checkouts": 0,
+                "failures": Counter(),
+                "cleared": 0,
+                "wait_total_ms": 0.0,
+                "wait_max_ms": 0.0,
+                "waits": deque(maxlen=self.wait_sample_size),
+            }
+        return pool
+
+    def _started_at(self) -> Dict[Any, float]:
+        started = getattr(self._checkout_started, "by_address", None)
+        if started is None:
+            started = self._checkout_started.by_address = {}
+        return started
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        with self._lock:
+            self._pool(event.address)["options"] = dict(event.options)
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        with self._lock:
+            self._pool(event.address)["cleared"] += 1
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        with self._lock:
+            self._pools.pop(event.address, None)
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        with self._lock:
+            self._pool(event.address)["open"] += 1
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["open"] = max(pool["open"] - 1, 0)
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        self._started_at()[event.address] = time.perf_counter()
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        started = self._started_at().pop(event.address, None)
+        wait_ms = (time.perf_counter() - started) * 1000 if started is not None else 0.0
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["checkouts"] += 1
+            pool["in_use"] += 1
+            pool["max_in_use"] = max(pool["max_in_use"], pool["in_use"])
+            pool["wait_total_ms"] += wait_ms
+            pool["wait_max_ms"] = max(pool["wait_max_ms"], wait_ms)
+            pool["waits"].append(wait_ms)
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        self._started_at().pop(event.address, None)
+        with self._lock:
+            self._pool(event.address)["failures"][event.reason] += 1
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["in_use"] = max(pool["in_use"] - 1, 0)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            pools = [(address, dict(pool), sorted(pool["waits"])) for address, pool in self._pools.items()]
+        result = []
+        for address, pool, waits in pools:
+            result.append({
+                "address": "%s:%s" % address if isinstance(address, tuple) else str(address),
+                "max_pool_size": pool["options"].get("maxPoolSize"),
+                "open": pool["open"],
+                "in_use": pool["in_use"],
+                "available": max(pool["open"] - pool["in_use"], 0),
+                "max_in_use": pool["max_in_use"],
+                "checkouts": pool["checkouts"],
+                "checkout_failures": dict(pool["failures"]),
+                "cleared": pool["cleared"],
+                "checkout_wait_ms": {
+                    "mean": round(pool["wait_total_ms"] / pool["checkouts"], 3) if pool["checkouts"] else 0.0,
+                    "p50": round(_percentile(waits, 50), 3),
+                    "p95": round(_percentile(waits, 95), 3),
+                    "p99": round(_percentile(waits, 99), 3),
+                    "max": round(pool["wait_max_ms"], 3),
+                },
+            })
+        return result
+
+    def reset(self) -> None:
+        # Clears counters but keeps the open/in-use gauges, which track live state
+        with self._lock:
+            for pool in self._pools.values():
+                pool.update(
+                    max_in_use=pool["in_use"], checkouts=0, failures=Counter(), cleared=0,
+                    wait_total_ms=0.0, wait_max_ms=0.0,
+                )
+                pool["waits"].clear()
+
+
+pool_monitor = ConnectionPoolMonitor()
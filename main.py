@@ -1,20 +1,59 @@
+from core.startup import startup_timings
+
+# Everything imported below (FastAPI, Motor, Beanie, the routers, settings)
+# counts as the "imports" startup phase
+startup_timings.begin("imports")
+import logging
+from typing import Dict
+
 from fastapi import FastAPI, Request
 from fastapi.templating import Jinja2Templates
 from contextlib import asynccontextmanager
+import asyncio
 from api.v1.api import api_router
+from core import metrics
 from core.config import settings
-from db.mongodb import init_db
-from fastapi.responses import JSONResponse, HTMLResponse, FileResponse
+from core.formats import MessagePackBodyMiddleware
+from core.health import health_probe
+from core.reminders import reminder_scheduler
+from core.static_assets import PrecompressedAsset
+from core.task_events import task_change_feed
+from core.task_stats import reconcile_periodically
+from core.security import shutdown_hash_pool
+from db.mongodb import close_db, init_db
+from models.task import Task
+from fastapi.responses import JSONResponse, HTMLResponse, Response
 from fastapi.exceptions import RequestValidationError
+from starlette.middleware.gzip import GZipMiddleware
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from fastapi.openapi.docs import get_redoc_html
+startup_timings.end("imports")
 
+# Templates, middleware, routes and the pre-built static assets
+startup_timings.begin("app")
 templates = Jinja2Templates(directory="templates")
+logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await init_db()
+    client = await init_db()
+    with startup_timings.phase("background_tasks"):
+        task_change_feed.start(Task.get_motor_collection())
+        if settings.REMINDERS_ENABLED:
+            reminder_scheduler.start()
+        background = []
+        if settings.STATS_RECONCILE_INTERVAL_SECONDS > 0:
+            background.append(asyncio.create_task(reconcile_periodically()))
+    with startup_timings.phase("landing_page"):
+        landing_page("ok")
+    startup_timings.log()
     yield
+    for task in background:
+        task.cancel()
+    await reminder_scheduler.stop()
+    await task_change_feed.stop()
+    close_db(client)
+    shutdown_hash_pool()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -23,6 +62,13 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Added innermost first: metrics time everything, including compression
+app.add_middleware(MessagePackBodyMiddleware)
+if settings.GZIP_MINIMUM_SIZE > 0:
+    app.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_MINIMUM_SIZE, compresslevel=settings.GZIP_COMPRESS_LEVEL)
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request, exc):
     if exc.status_code == 404:
@@ -39,11 +85,13 @@ async def http_exception_handler(request, exc):
              
         return JSONResponse(
             status_code=401,
-            content={"message": message}
+            content={"message": message},
+            headers=getattr(exc, "headers", None)
         )
     return JSONResponse(
         status_code=exc.status_code,
-        content={"message": str(exc.detail)}
+        content={"message": str(exc.detail)},
+        headers=getattr(exc, "headers", None)
     )
 
 @app.exception_handler(RequestValidationError)
@@ -60,16 +108,26 @@ async def validation_exception_handler(request, exc):
 
 @app.exception_handler(Exception)
 async def generic_exception_handler(request, exc):
-    # Log the error here in a real app
-    print(f"INTERNAL ERROR: {exc}")
+    logger.exception("Unhandled error on %s %s", request.method, request.url.path, exc_info=exc)
+    metrics.http_unhandled_exceptions_total.inc(type(exc).__name__)
     return JSONResponse(
         status_code=500,
         content={"message": "Oh no! Something went wrong on our end. Please try again later."}
     )
 
+with open("templates/favicon.ico", "rb") as icon:
+    FAVICON = PrecompressedAsset(icon.read(), "image/x-icon", "public, max-age=86400")
+
 @app.get("/favicon.ico", include_in_schema=False)
-async def favicon():
-    return FileResponse("templates/favicon.ico")
+async def favicon(request: Request):
+    return FAVICON.response(request)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    if not settings.METRICS_ENABLED:
+        raise StarletteHTTPException(status_code=404)
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
 
 
 @app.get("/redoc", include_in_schema=False)
@@ -80,51 +138,77 @@ async def redoc_html():
         redoc_js_url="https://cdn.jsdelivr.net/npm/redoc@next/bundles/redoc.standalone.js",
     )
 
+# The landing page is static apart from the status panel, so it is rendered
+# once per distinct status (normally just one) and served pre-compressed.
+LANDING_CONTEXT = {
+    "project_name": "Smart To Do API",
+    "project_version": "v1.0.0",
+    "project_description": "A robust, user-centric To Do API suitable for modern applications.",
+    "project_keywords": "fastapi, mongodb, beanie, jwt, python, async, smart-todo",
+    "project_repo_url": "https://github.com/saidulalimallick04/smart-to-do-api",
+    "developers": [
+        {
+            "name": "Saidul Ali Mallick",
+            "username": "saidulalimallick04",
+            "role": "Backend Developer & AI Engineer",
+            "quote": "Building impact, not just code.",
+            "github_url": "https://github.com/saidulalimallick04",
+            "linkedin_url": "https://linkedin.com/in/saidulalimallick04",
+            "twitter_url": "https://x.com/saidulmallick04"
+        }
+    ],
+    "hero_badge_text": "Production Ready",
+    "hero_title": "Smart To Do API",
+    "hero_description": "A robust, user-centric backend designed for modern applications. Powered by FastAPI, MongoDB (Beanie), and Context-Aware AI.",
+    "api_total_endpoints": "9+",
+    "api_get_count": 3,
+    "api_post_count": 4,
+    "api_put_count": 1,
+    "api_delete_count": 1,
+    "about_description": "Use this in your next project to have a solid, secure, and smart task management backend out of the box.",
+    "tech_stack": [
+        {"icon": "fab fa-python", "name": "Python"},
+        {"icon": "fas fa-bolt", "name": "FastAPI"},
+        {"icon": "fas fa-database", "name": "MongoDB"},
+        {"icon": "fas fa-leaf", "name": "Beanie"},
+        {"icon": "fas fa-key", "name": "JWT"},
+    ],
+    "quick_links": [
+        {"icon": "fas fa-book", "name": "API Docs", "url": "/docs"},
+        {"icon": "fab fa-github", "name": "Repository", "url": "https://github.com/saidulalimallick04/smart-to-do-api"},
+    ],
+    "developer_name": "Saidul Ali Mallick"
+}
+
+LANDING_STATUSES = {
+    "ok": {"server_status": "Operational", "server_api_status": "Healthy", "server_db_status": "Connected"},
+    "degraded": {"server_status": "Degraded", "server_api_status": "Healthy", "server_db_status": "Unreachable"},
+}
+
+_landing_pages: Dict[str, PrecompressedAsset] = {}
+
+def landing_page(health_status: str) -> PrecompressedAsset:
+    page = _landing_pages.get(health_status)
+    if page is None:
+        html = templates.get_template("index_jinja.html").render(
+            **LANDING_CONTEXT, **LANDING_STATUSES[health_status]
+        )
+        # no-cache: browsers keep the page but revalidate (cheap 304) so a
+        # status change shows up on the next visit
+        page = _landing_pages[health_status] = PrecompressedAsset(
+            html.encode("utf-8"), "text/html; charset=utf-8", "public, no-cache"
+        )
+    return page
+
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
-    context = {
-        "request": request,
-        "project_name": "Smart To Do API",
-        "project_version": "v1.0.0",
-        "project_description": "A robust, user-centric To Do API suitable for modern applications.",
-        "project_keywords": "fastapi, mongodb, beanie, jwt, python, async, smart-todo",
-        "project_repo_url": "https://github.com/saidulalimallick04/smart-to-do-api",
-        "developers": [
-            {
-                "name": "Saidul Ali Mallick",
-                "username": "saidulalimallick04",
-                "role": "Backend Developer & AI Engineer",
-                "quote": "Building impact, not just code.",
-                "github_url": "https://github.com/saidulalimallick04",
-                "linkedin_url": "https://linkedin.com/in/saidulalimallick04",
-                "twitter_url": "https://x.com/saidulmallick04"
-            }
-        ],
-        "hero_badge_text": "Production Ready",
-        "hero_title": "Smart To Do API",
-        "hero_description": "A robust, user-centric backend designed for modern applications. Powered by FastAPI, MongoDB (Beanie), and Context-Aware AI.",
-        "api_total_endpoints": "9+",
-        "api_get_count": 3,
-        "api_post_count": 4,
-        "api_put_count": 1,
-        "api_delete_count": 1,
-        "about_description": "Use this in your next project to have a solid, secure, and smart task management backend out of the box.",
-        "tech_stack": [
-            {"icon": "fab fa-python", "name": "Python"},
-            {"icon": "fas fa-bolt", "name": "FastAPI"},
-            {"icon": "fas fa-database", "name": "MongoDB"},
-            {"icon": "fas fa-leaf", "name": "Beanie"},
-            {"icon": "fas fa-key", "name": "JWT"},
-        ],
-        "quick_links": [
-            {"icon": "fas fa-book", "name": "API Docs", "url": "/docs"},
-            {"icon": "fab fa-github", "name": "Repository", "url": "https://github.com/saidulalimallick04/smart-to-do-api"},
-        ],
-        "server_status": "Operational",
-        "server_api_status": "Healthy",
-        "server_db_status": "Connected",
-        "developer_name": "Saidul Ali Mallick"
-    }
-    return templates.TemplateResponse("index_jinja.html", context)
+    health = await health_probe.check()
+    return landing_page(health["status"]).response(request)
+
+@app.get("/health", include_in_schema=False)
+async def health():
+    result = await health_probe.check()
+    return JSONResponse(status_code=200 if result["status"] == "ok" else 503, content=result)
 
 app.include_router(api_router, prefix="/api/v1")
+startup_timings.end("app")
@@ -0,0 +1,24 @@
+from beanie import Document
+from pymongo import ASCENDING, IndexModel
+from datetime import datetime
+from typing import Any, Optional
+
+class IdempotencyRecord(Document):
+    # "<scope>:<Idempotency-Key>", e.g. "create_task:<user id>:<key>"
+    id: str
+    # "in_progress" while the first request runs, then "completed"
+    status: str
+    # Identifies the request holding the claim; only it renews or completes it
+    token: Optional[str] = None
+    # Keyed hash of the request body; a reused key with another body is rejected
+    fingerprint: str
+    status_code: Optional[int] = None
+    body: Optional[Any] = None
+    expires_at: datetime
+
+    class Settings:
+        name = "idempotency_keys"
+        # MongoDB's TTL monitor removes records once expires_at has passed
+        indexes = [
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+        ]
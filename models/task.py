@@ -1,8 +1,29 @@
-from beanie import Document, Link
+from beanie import Document, PydanticObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
 from pydantic import Field
 from datetime import datetime, timezone
 from typing import Optional, List
-from models.user import User
+
+from core.config import settings
+
+# The pre-migration indexes on the owner DBRef. MongoDB only uses indexes
+# for an $or when every clause has one, so they stay declared while
+# TASK_OWNER_LEGACY_FALLBACK adds an owner.$id clause to owner queries;
+# `python -m db.migrate_owner_id --finalize` drops them once it is off.
+LEGACY_OWNER_INDEXES = [
+    IndexModel(
+        [("owner.$id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+        name="owner_created",
+    ),
+    IndexModel(
+        [("owner.$id", ASCENDING), ("is_completed", ASCENDING), ("priority", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+        name="owner_completed_priority_created",
+    ),
+    IndexModel(
+        [("owner.$id", ASCENDING), ("priority", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+        name="owner_priority_created",
+    ),
+]
 
 class Task(Document):
     title: str = Field(min_length=1)
@@ -10,8 +31,58 @@ class Task(Document):
     is_completed: bool = False
     priority: str = "medium"
     tags: List[str] = []
-    owner: Link[User]
+    # Plain id of the owning User. Older documents carry an "owner" DBRef
+    # instead until db/migrate_owner_id.py has backfilled them.
+    owner_id: Optional[PydanticObjectId] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    due_at: Optional[datetime] = None
+    # Set when the reminder for due_at fired (core/reminders.py); cleared
+    # whenever due_at changes
+    reminded_at: Optional[datetime] = None
+    # Incremented by every update; documents written before it existed count as 0
+    revision: int = 0
 
     class Settings:
         name = "tasks"
+        # Equality filters first, then the (created_at, _id) sort key used by
+        # keyset pagination, so every page is an index range scan.
+        indexes = [
+            IndexModel(
+                [("owner_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                name="owner_id_created",
+            ),
+            IndexModel(
+                [("owner_id", ASCENDING), ("is_completed", ASCENDING), ("priority", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                name="owner_id_completed_priority_created",
+            ),
+            IndexModel(
+                [("owner_id", ASCENDING), ("priority", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                name="owner_id_priority_created",
+            ),
+            # overdue / due_before filters: a due_at range within one owner
+            IndexModel([("owner_id", ASCENDING), ("due_at", ASCENDING)], name="owner_id_due"),
+            # Reminder scheduler: open, not yet reminded tasks in due_at
+            # order, read a window at a time with an (due_at, _id) seek
+            IndexModel(
+                [("is_completed", ASCENDING), ("reminded_at", ASCENDING), ("due_at", ASCENDING), ("_id", ASCENDING)],
+                name="pending_reminders",
+            ),
+            # Full-text search; the owner prefix keeps each search inside
+            # one user's tasks (queries must filter on owner equality)
+            IndexModel(
+                [("owner_id", ASCENDING), ("title", TEXT), ("description", TEXT), ("tags", TEXT)],
+                weights={"title": 3, "tags": 2, "description": 1},
+                name="owner_id_text",
+            ),
+        ] + (LEGACY_OWNER_INDEXES if settings.TASK_OWNER_LEGACY_FALLBACK else [])
+
+def owner_filter(owner_id, allow_legacy: bool = True) -> dict:
+    """
+    The one filter that scopes raw task queries to an owner. While
+    TASK_OWNER_LEGACY_FALLBACK is on, tasks the owner_id migration hasn't
+    reached yet are matched through their owner DBRef (served by
+    LEGACY_OWNER_INDEXES, which are declared for as long as it is on).
+    """
+    if allow_legacy and settings.TASK_OWNER_LEGACY_FALLBACK:
+        return {"$or": [{"owner_id": owner_id}, {"owner.$id": owner_id}]}
+    return {"owner_id": owner_id}
@@ -0,0 +1,17 @@
+from beanie import Document, PydanticObjectId
+from pydantic import Field
+from datetime import datetime, timezone
+from typing import Dict
+
+class TaskStats(Document):
+    # One counters document per user, keyed by the user's id
+    id: PydanticObjectId
+    total: int = 0
+    completed: int = 0
+    by_priority: Dict[str, int] = {}
+    # Bumped by every delta; reconciliation rewrites only an unchanged revision
+    revision: int = 0
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "task_stats"
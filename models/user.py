@@ -1,13 +1,28 @@
-from beanie import Document, Indexed
+from beanie import Document, Indexed, before_event, after_event, Delete, Replace, Save, SaveChanges, Update
 from pydantic import Field
 from datetime import datetime, timezone
 from typing import Optional, List
 
+from core.cache import user_cache
+
 class User(Document):
     email: Indexed(str, unique=True)
     hashed_password: str
     full_name: Optional[str] = None
+    # Bumped on every task write; drives task ETags (see core/etag.py)
+    task_version: int = 0
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+    # Any write through the document (profile edit, password change, delete)
+    # drops the cached copy so the next request reloads it. Both hooks run so
+    # an email change clears the entry under the old and the new address.
+    @before_event(Replace, Save, SaveChanges, Update, Delete)
+    def invalidate_cached_user_before(self):
+        user_cache.invalidate(self.email)
+
+    @after_event(Replace, Save, SaveChanges, Update, Delete)
+    def invalidate_cached_user_after(self):
+        user_cache.invalidate(self.email)
+
     class Settings:
         name = "users"
@@ -1,29 +1,127 @@
-from pydantic import BaseModel, Field, BeforeValidator, ConfigDict
-from typing import Optional, List, Annotated
-from datetime import datetime
+from pydantic import AliasChoices, AfterValidator, BaseModel, Field, BeforeValidator, ConfigDict, model_validator
+from typing import Dict, Optional, List, Annotated
+from datetime import datetime, timezone
+
+from core.config import settings
 
 PyObjectId = Annotated[str, BeforeValidator(str)]
 
+def _as_utc(value: datetime) -> datetime:
+    # Times without an offset are taken as UTC, like MongoDB stores them
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+UTCDateTime = Annotated[datetime, AfterValidator(_as_utc)]
+
+# Task fields that always hold a value; an update may omit them but not null them
+_NOT_NULLABLE = {"title", "is_completed", "priority", "tags"}
+
 class TaskCreate(BaseModel):
     title: str = Field(..., min_length=1)
     description: Optional[str] = None
     priority: Optional[str] = "medium"
     tags: List[str] = []
+    due_at: Optional[UTCDateTime] = None
+
+class TaskImport(TaskCreate):
+    is_completed: bool = False
 
 class TaskUpdate(BaseModel):
-    title: Optional[str] = None
+    title: Optional[str] = Field(None, min_length=1)
     description: Optional[str] = None
     is_completed: Optional[bool] = None
     priority: Optional[str] = None
     tags: Optional[List[str]] = None
+    # Send null to clear the due date
+    due_at: Optional[UTCDateTime] = None
+
+    @model_validator(mode="after")
+    def check_not_null(self):
+        nulled = sorted(field for field in self.model_fields_set & _NOT_NULLABLE if getattr(self, field) is None)
+        if nulled:
+            raise ValueError(f"{', '.join(nulled)} cannot be null")
+        return self
+
+class TaskPatch(TaskUpdate):
+    # Tag edits that don't resend the whole list
+    add_tags: Optional[List[str]] = None
+    remove_tags: Optional[List[str]] = None
+
+    @model_validator(mode="after")
+    def check_tag_edits(self):
+        if self.tags is not None and (self.add_tags or self.remove_tags):
+            raise ValueError("use either tags or add_tags/remove_tags, not both")
+        return self
 
 class TaskOut(BaseModel):
-    id: PyObjectId
+    # "_id" lets raw MongoDB documents validate without renaming first
+    id: PyObjectId = Field(validation_alias=AliasChoices("id", "_id"))
     title: str
     description: Optional[str] = None
     is_completed: bool
     priority: str
     tags: List[str]
     created_at: datetime
+    due_at: Optional[datetime] = None
+    # Bumped on every write; send it back as ?revision= to update only if unchanged
+    revision: int = 0
     
     model_config = ConfigDict(from_attributes=True)
+
+# Only the fields TaskOut needs, for raw queries that validate straight
+# into it; owner fields never leave the database
+TASK_OUT_PROJECTION = {field: 1 for field in TaskOut.model_fields if field != "id"}
+
+class TaskSearchHit(TaskOut):
+    score: float
+
+class TaskPage(BaseModel):
+    items: List[TaskOut]
+    next_cursor: Optional[str] = None
+
+class TaskBulkCreate(BaseModel):
+    tasks: List[TaskCreate] = Field(..., min_length=1, max_length=settings.BULK_MAX_ITEMS)
+    ordered: bool = True
+
+class TaskBulkUpdateItem(TaskUpdate):
+    id: str
+
+class TaskBulkUpdate(BaseModel):
+    items: List[TaskBulkUpdateItem] = Field(..., min_length=1, max_length=settings.BULK_MAX_ITEMS)
+    ordered: bool = True
+
+class TaskBulkDelete(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=settings.BULK_MAX_ITEMS)
+    ordered: bool = True
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    status: str
+    error: Optional[str] = None
+    task: Optional[TaskOut] = None
+
+class BulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
+class ImportRowError(BaseModel):
+    row: int
+    message: str
+
+class ImportSummary(BaseModel):
+    received: int
+    inserted: int
+    failed: int
+    chunks: int
+    errors: List[ImportRowError]
+    errors_truncated: bool = False
+    # Set when an oversized row ended the import early; rows from here on
+    # weren't read
+    stopped_at_row: Optional[int] = None
+
+class TaskStatsOut(BaseModel):
+    total: int
+    completed: int
+    open: int
+    by_priority: Dict[str, int]
@@ -1,23 +1,57 @@
+import os
+
 import pytest
 from httpx import AsyncClient, ASGITransport
 from main import app
-from db.mongodb import init_db
+from db.mongodb import DOCUMENT_MODELS, init_db
 from models.user import User
 from models.task import Task
 from core.config import settings
 from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
 
+# USE_MEMORY_MONGO=1 runs the suite against the in-memory stand-in instead of
+# a MongoDB server; tests that need server-only features are skipped.
+USE_MEMORY_MONGO = os.environ.get("USE_MEMORY_MONGO", "").lower() in ("1", "true", "yes")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "requires_mongodb: needs a real MongoDB server")
+
+def pytest_collection_modifyitems(config, items):
+    if not USE_MEMORY_MONGO:
+        return
+    skip = pytest.mark.skip(reason="needs a real MongoDB server (USE_MEMORY_MONGO is set)")
+    for item in items:
+        if "requires_mongodb" in item.keywords:
+            item.add_marker(skip)
+
 @pytest.fixture(scope="session")
 def anyio_backend():
     return "asyncio"
 
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def fake_clock():
+    # Pass as the clock= of anything timed, then move time by setting .now
+    return FakeClock(0.0)
+
 @pytest.fixture(scope="module")
 async def validation_db():
     # Use a test database
     settings.DB_NAME = "smart_todo_test_db"
-    client = AsyncIOMotorClient(settings.MONGODB_URL)
-    await init_beanie(database=client[settings.DB_NAME], document_models=[User, Task])
+    if USE_MEMORY_MONGO:
+        from db.memory import create_memory_client
+        client = create_memory_client()
+    else:
+        client = AsyncIOMotorClient(settings.MONGODB_URL)
+    await init_beanie(database=client[settings.DB_NAME], document_models=DOCUMENT_MODELS)
     yield
     # Cleanup
     await client.drop_database(settings.DB_NAME)
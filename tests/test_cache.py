@@ -0,0 +1,34 @@
+import time
+
+from core.cache import TTLCache
+
+def test_cache_hit_and_miss():
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+def test_cache_lru_eviction():
+    cache = TTLCache(max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+def test_cache_ttl_expiry():
+    cache = TTLCache(max_size=10, ttl_seconds=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+def test_cache_invalidate():
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.invalidate("a")
+    assert cache.get("a") is None
@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from core.coalesce import ReadCoalescer, task_reads
+from models.task import Task
+
+def counting_loader(calls, value=b"[]"):
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return value
+    return load
+
+@pytest.mark.anyio
+async def test_concurrent_identical_reads_share_one_load():
+    reads = ReadCoalescer(ttl_seconds=0, max_owners=10, max_entries_per_owner=4)
+    calls = []
+    results = await asyncio.gather(*(reads.get("alice", 1, "list", counting_loader(calls)) for _ in range(5)))
+    assert results == [b"[]"] * 5
+    assert len(calls) == 1
+
+    stats = reads.stats()
+    assert (stats["executed"], stats["coalesced"], stats["in_flight"]) == (1, 4, 0)
+    assert stats["coalescing_rate"] == 0.8
+
+    # Without a TTL nothing outlives the flight
+    await reads.get("alice", 1, "list", counting_loader(calls))
+    assert len(calls) == 2
+
+@pytest.mark.anyio
+async def test_reads_are_keyed_by_owner_version_and_query():
+    reads = ReadCoalescer(ttl_seconds=0, max_owners=10, max_entries_per_owner=4)
+    calls = []
+    await asyncio.gather(
+        reads.get("alice", 1, "list", counting_loader(calls)),
+        reads.get("alice", 2, "list", counting_loader(calls)),
+        reads.get("alice", 1, "other", counting_loader(calls)),
+        reads.get("bob", 1, "list", counting_loader(calls)),
+    )
+    assert len(calls) == 4
+
+@pytest.mark.anyio
+async def test_micro_ttl_cache_expires_and_is_invalidated(fake_clock):
+    reads = ReadCoalescer(ttl_seconds=1.0, max_owners=10, max_entries_per_owner=4, clock=fake_clock)
+    calls = []
+    await reads.get("alice", 1, "list", counting_loader(calls))
+    await reads.get("alice", 1, "list", counting_loader(calls))
+    assert len(calls) == 1
+    assert reads.stats()["cache_hits"] == 1
+
+    fake_clock.now += 2
+    await reads.get("alice", 1, "list", counting_loader(calls))
+    assert len(calls) == 2
+
+    reads.invalidate("alice")
+    await reads.get("alice", 1, "list", counting_loader(calls))
+    assert len(calls) == 3
+    assert reads.stats()["invalidations"] == 1
+
+    # A newer version replaces the owner's older results
+    await reads.get("alice", 2, "list", counting_loader(calls))
+    await reads.get("alice", 1, "list", counting_loader(calls))
+    assert len(calls) == 5
+
+@pytest.mark.anyio
+async def test_errors_are_shared_but_not_cached():
+    reads = ReadCoalescer(ttl_seconds=1.0, max_owners=10, max_entries_per_owner=4)
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(*(reads.get("alice", 1, "list", failing) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert reads.stats()["executed"] == 1
+    calls = []
+    assert await reads.get("alice", 1, "list", counting_loader(calls)) == b"[]"
+
+@pytest.mark.anyio
+async def test_cancelled_reader_does_not_cancel_the_shared_load():
+    reads = ReadCoalescer(ttl_seconds=0, max_owners=10, max_entries_per_owner=4)
+    calls = []
+    first = asyncio.create_task(reads.get("alice", 1, "list", counting_loader(calls)))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(reads.get("alice", 1, "list", counting_loader(calls)))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == b"[]"
+    assert len(calls) == 1
+
+def test_cache_is_bounded():
+    reads = ReadCoalescer(ttl_seconds=1.0, max_owners=2, max_entries_per_owner=2)
+    for owner in ("a", "b", "c"):
+        for key in ("x", "y", "z"):
+            reads._store(owner, 1, key, b"")
+    assert list(reads._results) == ["b", "c"]
+    assert list(reads._results["c"][1]) == ["y", "z"]
+
+@pytest.mark.anyio
+async def test_writes_are_visible_to_the_next_read(authed_client):
+    task_reads.clear()
+    before = task_reads.stats()
+    lists = await asyncio.gather(*(authed_client.get("/api/v1/tasks/?limit=500") for _ in range(4)))
+    assert len({response.content for response in lists}) == 1
+    after = task_reads.stats()
+    assert after["requests"] - before["requests"] == 4
+    assert after["executed"] - before["executed"] < 4
+
+    created = (await authed_client.post("/api/v1/tasks/", json={"title": "Coalesced read"})).json()
+    listed = await authed_client.get("/api/v1/tasks/?limit=500")
+    assert created["id"] in {task["id"] for task in listed.json()}
+    assert listed.headers["ETag"] != lists[0].headers["ETag"]
+
+    fetched = [await authed_client.get(f"/api/v1/tasks/{created['id']}") for _ in range(2)]
+    assert fetched[0].content == fetched[1].content
+    assert fetched[0].json()["title"] == "Coalesced read"
+
+    await authed_client.patch(f"/api/v1/tasks/{created['id']}", json={"title": "Renamed"})
+    assert (await authed_client.get(f"/api/v1/tasks/{created['id']}")).json()["title"] == "Renamed"
+    await authed_client.delete(f"/api/v1/tasks/{created['id']}")
+    assert (await authed_client.get(f"/api/v1/tasks/{created['id']}")).status_code == 404
+    assert await Task.find_one(Task.title == "Renamed") is None
@@ -0,0 +1,25 @@
+from core.etag import if_none_match, make_etag, matching_version
+
+def test_make_etag_is_strong_and_stable():
+    etag = make_etag("user", 3, "task", "abc")
+    assert etag.startswith('"3-') and etag.endswith('"')
+    assert etag == make_etag("user", 3, "task", "abc")
+    assert etag != make_etag("user", 4, "task", "abc")
+    assert etag != make_etag("user", 3, "task", "abd")
+
+def test_if_none_match():
+    etag = make_etag("user", 1, "list")
+    assert if_none_match(etag, etag)
+    assert if_none_match(f'"other", W/{etag}', etag)
+    assert if_none_match("*", etag)
+    assert not if_none_match(None, etag)
+    assert not if_none_match('"other"', etag)
+
+def test_matching_version():
+    def etag_for(version):
+        return make_etag("user", version, "task", "abc")
+    assert matching_version(f'"other", {etag_for(7)}', etag_for) == 7
+    # Another resource's tag, a weak tag or garbage names no version
+    assert matching_version(make_etag("user", 7, "task", "abd"), etag_for) is None
+    assert matching_version(f"W/{etag_for(7)}", etag_for) is None
+    assert matching_version('"x-1"', etag_for) is None
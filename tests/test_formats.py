@@ -0,0 +1,88 @@
+import msgpack
+import pytest
+
+from core.formats import wants_msgpack
+
+MSGPACK = {"Content-Type": "application/msgpack"}
+
+def test_wants_msgpack():
+    assert wants_msgpack("application/msgpack")
+    assert wants_msgpack("application/x-msgpack, application/json;q=0.5")
+    assert not wants_msgpack("application/json, application/msgpack;q=0.5")
+    assert not wants_msgpack("*/*")
+    assert not wants_msgpack(None)
+
+@pytest.mark.anyio
+async def test_msgpack_request_and_response(authed_client):
+    created = await authed_client.post(
+        "/api/v1/tasks/", content=msgpack.packb({"title": "Packed task", "tags": ["binary"]}), headers=MSGPACK
+    )
+    assert created.status_code == 200
+    assert created.json()["title"] == "Packed task"
+
+    bulk = await authed_client.post(
+        "/api/v1/tasks/bulk", content=msgpack.packb({"tasks": [{"title": "Packed bulk"}]}), headers=MSGPACK
+    )
+    assert bulk.status_code == 200
+    assert bulk.json()["succeeded"] == 1
+
+    as_json = await authed_client.get("/api/v1/tasks/", params={"limit": 5})
+    as_msgpack = await authed_client.get("/api/v1/tasks/", params={"limit": 5}, headers={"Accept": "application/msgpack"})
+    assert as_msgpack.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(as_msgpack.content) == as_json.json()
+    # Same data, different representation: different ETags
+    assert as_msgpack.headers["etag"] != as_json.headers["etag"]
+    assert as_msgpack.headers["vary"] == "Accept, Accept-Encoding"
+
+    page = await authed_client.get("/api/v1/tasks/", params={"cursor": "", "limit": 2}, headers={"Accept": "application/msgpack"})
+    assert len(msgpack.unpackb(page.content)["items"]) == 2
+
+@pytest.mark.anyio
+async def test_invalid_msgpack_body(authed_client):
+    response = await authed_client.post("/api/v1/tasks/", content=b"\xc1", headers=MSGPACK)
+    assert response.status_code == 400
+    response = await authed_client.post("/api/v1/tasks/", content=msgpack.packb({"title": b"raw"}), headers=MSGPACK)
+    assert response.status_code == 400
+
+@pytest.mark.anyio
+async def test_large_responses_are_gzipped(authed_client):
+    await authed_client.post("/api/v1/tasks/bulk", json={"tasks": [{"title": f"Filler {n}"} for n in range(30)]})
+    response = await authed_client.get("/api/v1/tasks/", params={"limit": 30}, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()) == 30
+    small = await authed_client.get("/api/v1/tasks/", params={"limit": 1}, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+@pytest.mark.anyio
+async def test_gzip_and_identity_responses_have_different_etags(authed_client):
+    await authed_client.post("/api/v1/tasks/bulk", json={"tasks": [{"title": f"Encoded {n}"} for n in range(30)]})
+    params = {"limit": 30}
+    gzipped = await authed_client.get("/api/v1/tasks/", params=params, headers={"Accept-Encoding": "gzip"})
+    identity = await authed_client.get("/api/v1/tasks/", params=params, headers={"Accept-Encoding": "identity"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in identity.headers
+    assert gzipped.headers["etag"] != identity.headers["etag"]
+    for response in (gzipped, identity):
+        assert [field.strip() for field in response.headers["vary"].split(",")] == ["Accept", "Accept-Encoding"]
+
+    # Each client revalidates its own copy
+    revalidated = await authed_client.get(
+        "/api/v1/tasks/", params=params, headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]}
+    )
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == gzipped.headers["etag"]
+    crossed = await authed_client.get(
+        "/api/v1/tasks/", params=params, headers={"Accept-Encoding": "identity", "If-None-Match": gzipped.headers["etag"]}
+    )
+    assert crossed.status_code == 200
+
+    # A single task too, and a write accepts the ETag of either representation
+    task_id = identity.json()[0]["id"]
+    one = await authed_client.get(f"/api/v1/tasks/{task_id}", headers={"Accept-Encoding": "gzip"})
+    other = await authed_client.get(f"/api/v1/tasks/{task_id}", headers={"Accept-Encoding": "identity"})
+    assert one.headers["etag"] != other.headers["etag"]
+    assert one.headers["vary"] == other.headers["vary"] == "Accept-Encoding"
+    updated = await authed_client.patch(
+        f"/api/v1/tasks/{task_id}", json={"priority": "low"}, headers={"If-Match": one.headers["etag"]}
+    )
+    assert updated.status_code == 200
@@ -0,0 +1,173 @@
+import asyncio
+
+import pytest
+
+from core.idempotency import IdempotencyInProgress, IdempotencyKeyReused, IdempotencyStore, fingerprint, idempotency_store
+from core.rate_limit import auth_rate_limits
+from models.idempotency import IdempotencyRecord
+from models.task import Task
+
+@pytest.mark.anyio
+async def test_concurrent_duplicates_run_the_handler_once(validation_db):
+    store = IdempotencyStore(10, ttl_seconds=60, lock_seconds=30, wait_seconds=1, poll_seconds=0.01)
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 200, {"n": len(calls)}
+
+    results = await asyncio.gather(*(store.run("test", "same-key", {"a": 1}, handler) for _ in range(5)))
+    assert len(calls) == 1
+    assert [result[:2] for result in results] == [(200, {"n": 1})] * 5
+    assert sorted(result[2] for result in results) == [False, True, True, True, True]
+    assert store.stats()["in_flight"] == 0
+
+@pytest.mark.anyio
+async def test_replay_from_mongodb_and_reused_key(validation_db):
+    store = IdempotencyStore(10, ttl_seconds=60, lock_seconds=30, wait_seconds=1, poll_seconds=0.01)
+
+    async def handler():
+        return 200, {"ok": True}
+
+    await store.run("test", "stored", {"a": 1}, handler)
+    record = await IdempotencyRecord.get("test:stored")
+    assert record.status == "completed"
+    assert record.fingerprint != '{"a":1}'
+
+    # Another worker (empty cache) replays from the collection
+    other = IdempotencyStore(10, ttl_seconds=60, lock_seconds=30, wait_seconds=1, poll_seconds=0.01)
+    assert await other.run("test", "stored", {"a": 1}, handler) == (200, {"ok": True}, True)
+    with pytest.raises(IdempotencyKeyReused):
+        await other.run("test", "stored", {"a": 2}, handler)
+
+@pytest.mark.anyio
+async def test_failed_request_releases_the_key(validation_db):
+    store = IdempotencyStore(10, ttl_seconds=60, lock_seconds=30, wait_seconds=1, poll_seconds=0.01)
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await store.run("test", "retry-me", {}, failing)
+    assert await IdempotencyRecord.get("test:retry-me") is None
+
+    async def handler():
+        return 201, {"ok": True}
+
+    assert await store.run("test", "retry-me", {}, handler) == (201, {"ok": True}, False)
+
+@pytest.mark.anyio
+async def test_failure_to_store_the_response_keeps_the_key(validation_db, monkeypatch):
+    store = IdempotencyStore(10, ttl_seconds=60, lock_seconds=30, wait_seconds=1, poll_seconds=0.01)
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        return 200, {"n": len(calls)}
+
+    async def unreachable(*args, **kwargs):
+        raise ConnectionError("primary stepped down")
+
+    collection = IdempotencyRecord.get_motor_collection()
+    monkeypatch.setattr(collection, "update_one", unreachable)
+    # The task was created, so the client still gets its response
+    assert await store.run("test", "unsaved", {}, handler) == (200, {"n": 1}, False)
+    monkeypatch.undo()
+    assert store.stats()["unsaved"] == 1
+    assert (await IdempotencyRecord.get("test:unsaved")).status == "in_progress"
+
+    # Retries replay on this worker and wait on the others instead of running again
+    assert await store.run("test", "unsaved", {}, handler) == (200, {"n": 1}, True)
+    with pytest.raises(IdempotencyInProgress):
+        await IdempotencyStore(10, ttl_seconds=60, lock_seconds=30, wait_seconds=0.05, poll_seconds=0.01).run("test", "unsaved", {}, handler)
+    assert len(calls) == 1
+
+@pytest.mark.anyio
+async def test_claim_is_renewed_while_the_handler_runs(validation_db):
+    first, second = IdempotencyStore(10, ttl_seconds=60, lock_seconds=0.06, wait_seconds=1, poll_seconds=0.01), IdempotencyStore(10, ttl_seconds=60, lock_seconds=30, wait_seconds=0.3, poll_seconds=0.01)
+    calls = []
+    started = asyncio.Event()
+
+    async def slow():
+        calls.append(1)
+        started.set()
+        # Several times the lock
+        await asyncio.sleep(0.25)
+        return 200, {"n": len(calls)}
+
+    running = asyncio.create_task(first.run("test", "slow", {}, slow))
+    await started.wait()
+    assert await second.run("test", "slow", {}, slow) == (200, {"n": 1}, True)
+    assert await running == (200, {"n": 1}, False)
+    assert len(calls) == 1
+
+@pytest.mark.anyio
+async def test_duplicate_of_a_request_running_elsewhere_times_out(validation_db):
+    # A live claim held by another worker
+    first, second = IdempotencyStore(10, ttl_seconds=60, lock_seconds=30, wait_seconds=1, poll_seconds=0.01), IdempotencyStore(10, ttl_seconds=60, lock_seconds=30, wait_seconds=0.05, poll_seconds=0.01)
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(0.5)
+        return 200, {}
+
+    running = asyncio.create_task(first.run("test", "busy", {}, slow))
+    await started.wait()
+    with pytest.raises(IdempotencyInProgress):
+        await second.run("test", "busy", {}, slow)
+    assert second.stats()["conflicts"] == 1
+    await running
+
+@pytest.mark.anyio
+async def test_create_task_with_idempotency_key(authed_client):
+    idempotency_store.clear()
+    headers = {"Idempotency-Key": "create-once"}
+    body = {"title": "Pay rent urgently"}
+    first = await authed_client.post("/api/v1/tasks/", json=body, headers=headers)
+    retry = await authed_client.post("/api/v1/tasks/", json=body, headers=headers)
+    assert first.status_code == retry.status_code == 200
+    assert "Idempotent-Replayed" not in first.headers
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert await Task.find(Task.title == "Pay rent urgently").count() == 1
+
+    reused = await authed_client.post("/api/v1/tasks/", json={"title": "Something else"}, headers=headers)
+    assert reused.status_code == 422
+    too_long = await authed_client.post("/api/v1/tasks/", json=body, headers={"Idempotency-Key": "k" * 256})
+    assert too_long.status_code == 400
+
+@pytest.mark.anyio
+async def test_signup_with_idempotency_key(async_client):
+    headers = {"Idempotency-Key": "signup-once"}
+    body = {"email": "idempotent@example.com", "password": "password123"}
+    try:
+        first = await async_client.post("/api/v1/auth/signup", json=body, headers=headers)
+        # Without the key the retry would fail with "already registered"
+        retry = await async_client.post("/api/v1/auth/signup", json=body, headers=headers)
+    finally:
+        # Replays still count against the signup rate limit
+        auth_rate_limits.clear()
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    record = await IdempotencyRecord.get(f"signup:{fingerprint('idempotent@example.com')}:signup-once")
+    assert record is not None and "password" not in str(record)
+
+@pytest.mark.anyio
+async def test_signup_keys_are_scoped_per_address(async_client):
+    headers = {"Idempotency-Key": "1"}
+    try:
+        first = await async_client.post(
+            "/api/v1/auth/signup", json={"email": "scoped-a@example.com", "password": "password123"}, headers=headers
+        )
+        # An unrelated client that picked the same key
+        second = await async_client.post(
+            "/api/v1/auth/signup", json={"email": "scoped-b@example.com", "password": "password123"}, headers=headers
+        )
+    finally:
+        auth_rate_limits.clear()
+    assert first.status_code == second.status_code == 200
+    assert "Idempotent-Replayed" not in second.headers
+    assert second.json()["email"] == "scoped-b@example.com"
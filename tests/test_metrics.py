@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+import pytest
+
+from core.metrics import Counter, Histogram, http_requests_total, password_hash_duration_seconds
+from db.monitoring import CommandMetricsListener
+
+def test_counter_and_histogram_render_prometheus_text():
+    counter = Counter("demo_total", "Demo counter.", ("kind",))
+    counter.inc("a")
+    counter.inc("a", amount=2)
+    counter.inc('quo"te')
+    assert counter.render() == [
+        "# HELP demo_total Demo counter.",
+        "# TYPE demo_total counter",
+        'demo_total{kind="a"} 3',
+        'demo_total{kind="quo\\"te"} 1',
+    ]
+
+    histogram = Histogram("demo_seconds", "Demo histogram.", ("op",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "x")
+    lines = histogram.render()
+    assert 'demo_seconds_bucket{op="x",le="0.1"} 2' in lines
+    assert 'demo_seconds_bucket{op="x",le="1.0"} 3' in lines
+    assert 'demo_seconds_bucket{op="x",le="+Inf"} 4' in lines
+    assert 'demo_seconds_count{op="x"} 4' in lines
+    assert 'demo_seconds_sum{op="x"} 3.65' in lines
+
+def test_command_listener_records_durations():
+    from core.metrics import mongodb_command_duration_seconds
+
+    before = mongodb_command_duration_seconds.count("find", "success")
+    CommandMetricsListener().succeeded(SimpleNamespace(command_name="find", duration_micros=1500))
+    assert mongodb_command_duration_seconds.count("find", "success") == before + 1
+
+@pytest.mark.anyio
+async def test_metrics_endpoint_reports_routes_and_bcrypt(authed_client):
+    before = http_requests_total.value("GET", "/api/v1/tasks/{task_id}", "404")
+    await authed_client.get("/api/v1/tasks/000000000000000000000000")
+    assert http_requests_total.value("GET", "/api/v1/tasks/{task_id}", "404") == before + 1
+    # The authed_client fixture logged in, which verified a password
+    assert password_hash_duration_seconds.count("verify") >= 1
+
+    response = await authed_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/api/v1/tasks/{task_id}",le="+Inf"}' in body
+    assert "# TYPE password_hash_duration_seconds histogram" in body
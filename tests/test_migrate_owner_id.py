@@ -0,0 +1,62 @@
+import pytest
+from beanie import PydanticObjectId
+from bson import DBRef
+
+from core.config import settings
+from db import migrate_owner_id
+from db.monitoring import summarize_explain
+from models.task import Task, owner_filter
+from models.user import User
+
+@pytest.mark.anyio
+async def test_legacy_fallback_clauses_are_indexed(validation_db):
+    # MongoDB scans the whole collection unless every $or clause has an index
+    indexes = await Task.get_motor_collection().index_information()
+    prefixes = {list(info["key"])[0][0] for info in indexes.values()}
+    for clause in owner_filter(PydanticObjectId())["$or"]:
+        assert set(clause) <= prefixes
+
+@pytest.mark.anyio
+async def test_legacy_tasks_served_then_backfilled(authed_client, monkeypatch):
+    user = await User.find_one(User.email == "test_user@example.com")
+    tasks = Task.get_motor_collection()
+    db = tasks.database
+    await db[migrate_owner_id.MIGRATIONS_COLLECTION].delete_many({})
+    legacy_ids = [PydanticObjectId() for _ in range(5)]
+    await tasks.insert_many([
+        {"_id": oid, "title": f"Legacy {n}", "is_completed": False, "priority": "low", "tags": [],
+         "owner": DBRef("users", user.id), "created_at": oid.generation_time}
+        for n, oid in enumerate(legacy_ids)
+    ])
+
+    # The legacy fallback keeps unmigrated tasks visible
+    listed = {task["id"] for task in (await authed_client.get("/api/v1/tasks/", params={"limit": 1000})).json()}
+    assert {str(oid) for oid in legacy_ids} <= listed
+    assert (await authed_client.get(f"/api/v1/tasks/{legacy_ids[0]}")).status_code == 200
+
+    progress = []
+    partial = await migrate_owner_id.run(db, batch_size=2, pause=0, max_batches=1, drop_dbref=True, report=progress.append)
+    assert partial["migrated"] == 2 and partial["remaining"] == 3 and partial["completed_at"] is None
+    assert len(progress) == 1
+
+    # Resumes from the checkpoint
+    done = await migrate_owner_id.run(db, batch_size=2, pause=0, drop_dbref=True, report=progress.append)
+    assert done["migrated"] == 5 and done["remaining"] == 0 and done["completed_at"] is not None
+    migrated = await tasks.find({"_id": {"$in": legacy_ids}}).to_list(length=None)
+    assert all(doc["owner_id"] == user.id and "owner" not in doc for doc in migrated)
+
+    # The legacy indexes stay until the fallback is switched off
+    with pytest.raises(RuntimeError):
+        await migrate_owner_id.finalize(db)
+    monkeypatch.setattr(settings, "TASK_OWNER_LEGACY_FALLBACK", False)
+    assert (await migrate_owner_id.finalize(db)) == {"dropped_indexes": migrate_owner_id.LEGACY_TASK_INDEXES}
+
+@pytest.mark.anyio
+@pytest.mark.requires_mongodb  # query plans
+async def test_legacy_fallback_queries_use_indexes(validation_db):
+    owner_id = PydanticObjectId()
+    tasks = Task.get_motor_collection()
+    sort = [("created_at", -1), ("_id", -1)]
+    for query in (owner_filter(owner_id), {**owner_filter(owner_id), "is_completed": False, "priority": "high"}):
+        explain = await tasks.find(query).sort(sort).limit(10).explain()
+        assert "COLLSCAN" not in summarize_explain(explain, max_docs_ratio=10)["stages"], query
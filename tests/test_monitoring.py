@@ -0,0 +1,153 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from db.monitoring import SlowQueryMonitor, query_shape, summarize_explain
+
+def _events(command_name, duration_micros, request_id=1):
+    started = SimpleNamespace(
+        command_name=command_name,
+        command={command_name: "tasks", "filter": {"priority": "high"}, "lsid": {"id": "x"}},
+        database_name="smart_todo_test_db",
+        connection_id=("localhost", 27017),
+        request_id=request_id,
+    )
+    succeeded = SimpleNamespace(
+        command_name=command_name,
+        connection_id=("localhost", 27017),
+        request_id=request_id,
+        duration_micros=duration_micros,
+    )
+    return started, succeeded
+
+def test_monitor_records_only_slow_commands():
+    monitor = SlowQueryMonitor(threshold_ms=50, log_size=10, explain_sample_rate=0, max_docs_ratio=10)
+    for request_id, duration in [(1, 10_000), (2, 80_000)]:
+        started, succeeded = _events("find", duration, request_id)
+        monitor.started(started)
+        monitor.succeeded(succeeded)
+
+    entries = monitor.recent()
+    assert len(entries) == 1
+    assert entries[0]["duration_ms"] == 80.0
+    assert entries[0]["collection"] == "tasks"
+    # Session noise is stripped from the recorded command
+    assert "lsid" not in entries[0]["command"]
+
+def test_monitor_ignores_non_query_commands():
+    monitor = SlowQueryMonitor(threshold_ms=0, log_size=10, explain_sample_rate=0, max_docs_ratio=10)
+    started, succeeded = _events("hello", 500_000)
+    monitor.started(started)
+    monitor.succeeded(succeeded)
+    assert monitor.recent() == []
+
+def test_monitor_ring_buffer_is_bounded():
+    monitor = SlowQueryMonitor(threshold_ms=0, log_size=3, explain_sample_rate=0, max_docs_ratio=10)
+    for request_id in range(10):
+        started, succeeded = _events("find", 1000, request_id)
+        monitor.started(started)
+        monitor.succeeded(succeeded)
+    assert len(monitor.recent()) == 3
+
+@pytest.mark.anyio
+async def test_monitor_explains_each_query_shape_once_per_interval(fake_clock):
+    explains = []
+
+    class FakeDatabase:
+        async def command(self, command):
+            explains.append(command["explain"])
+            return {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}, "executionStats": {}}
+
+    monitor = SlowQueryMonitor(
+        threshold_ms=0, log_size=10, explain_sample_rate=1, max_docs_ratio=10, explain_interval_seconds=60, clock=fake_clock
+    )
+    monitor.attach({"smart_todo_test_db": FakeDatabase()}, asyncio.get_running_loop())
+
+    def slow_find(request_id, command):
+        started, succeeded = _events("find", 500_000, request_id)
+        started.command = {"find": "tasks", **command}
+        monitor.started(started)
+        monitor.succeeded(succeeded)
+
+    slow_find(1, {"filter": {"priority": "high"}})
+    await asyncio.sleep(0.01)
+    # Same shape with other values; then another filter field
+    slow_find(2, {"filter": {"priority": "low"}})
+    slow_find(3, {"filter": {"is_completed": True}})
+    await asyncio.sleep(0.01)
+    assert [command["filter"] for command in explains] == [{"priority": "high"}, {"is_completed": True}]
+    # The repeat shows the plan already captured for its shape
+    assert monitor.recent()[1]["plan"]["flags"] == ["COLLSCAN"]
+
+    fake_clock.now += 61
+    slow_find(4, {"filter": {"priority": "medium"}})
+    await asyncio.sleep(0.01)
+    assert len(explains) == 3
+
+def test_query_shape_ignores_values():
+    shape = query_shape("find", {"find": "tasks", "filter": {"$or": [{"owner_id": 1}, {"owner.$id": 1}]}}, "db")
+    assert shape == query_shape("find", {"find": "tasks", "filter": {"$or": [{"owner_id": 2}, {"owner.$id": 2}]}}, "db")
+    assert shape != query_shape("find", {"find": "tasks", "filter": {"owner_id": 2}}, "db")
+
+def test_summarize_explain_flags_collscan():
+    explain = {
+        "queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}},
+        "executionStats": {"totalDocsExamined": 5000, "totalKeysExamined": 0, "nReturned": 10},
+    }
+    summary = summarize_explain(explain, max_docs_ratio=10)
+    assert summary["flags"] == ["COLLSCAN", "HIGH_DOCS_EXAMINED_RATIO"]
+    assert summary["docs_examined_ratio"] == 500
+
+def test_summarize_explain_index_scan():
+    explain = {
+        "queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}},
+        "executionStats": {"totalDocsExamined": 10, "totalKeysExamined": 10, "nReturned": 10},
+    }
+    summary = summarize_explain(explain, max_docs_ratio=10)
+    assert summary["stages"] == ["FETCH", "IXSCAN"]
+    assert summary["flags"] == []
+
+def test_pool_monitor_tracks_connections_and_checkout_waits():
+    from pymongo import monitoring
+
+    from db.monitoring import ConnectionPoolMonitor
+
+    address = ("localhost", 27017)
+    monitor = ConnectionPoolMonitor()
+    monitor.pool_created(monitoring.PoolCreatedEvent(address, {"maxPoolSize": 5}))
+    for connection_id in (1, 2):
+        monitor.connection_created(monitoring.ConnectionCreatedEvent(address, connection_id))
+        monitor.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(address))
+        monitor.connection_checked_out(monitoring.ConnectionCheckedOutEvent(address, connection_id))
+    monitor.connection_checked_in(monitoring.ConnectionCheckedInEvent(address, 1))
+    monitor.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(address))
+    monitor.connection_check_out_failed(monitoring.ConnectionCheckOutFailedEvent(address, "timeout"))
+
+    [pool] = monitor.snapshot()
+    assert pool["address"] == "localhost:27017"
+    assert pool["max_pool_size"] == 5
+    assert (pool["open"], pool["in_use"], pool["available"], pool["max_in_use"]) == (2, 1, 1, 2)
+    assert pool["checkouts"] == 2
+    assert pool["checkout_failures"] == {"timeout": 1}
+    assert pool["checkout_wait_ms"]["max"] >= pool["checkout_wait_ms"]["p50"] >= 0
+
+    monitor.reset()
+    [pool] = monitor.snapshot()
+    assert (pool["checkouts"], pool["in_use"], pool["max_in_use"]) == (0, 1, 1)
+
+    monitor.pool_closed(monitoring.PoolClosedEvent(address))
+    assert monitor.snapshot() == []
+
+def test_mongo_client_options_follow_settings(monkeypatch):
+    from core.config import settings
+    from db.mongodb import mongo_client_options
+
+    monkeypatch.setattr(settings, "MONGODB_MAX_POOL_SIZE", 20)
+    monkeypatch.setattr(settings, "MONGODB_COMPRESSORS", ["zstd", "zlib"])
+    monkeypatch.setattr(settings, "MONGODB_WAIT_QUEUE_TIMEOUT_MS", None)
+    options = mongo_client_options()
+    assert options["maxPoolSize"] == 20
+    assert options["compressors"] == "zstd,zlib"
+    # Unset values are left to the driver
+    assert "waitQueueTimeoutMS" not in options
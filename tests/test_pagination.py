@@ -0,0 +1,20 @@
+from datetime import datetime, timezone
+
+import pytest
+from beanie import PydanticObjectId
+
+from core.pagination import decode_cursor, encode_cursor
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123000, tzinfo=timezone.utc)
+    task_id = PydanticObjectId()
+    assert decode_cursor(encode_cursor(created_at, task_id)) == (created_at, task_id)
+
+def test_cursor_accepts_naive_utc():
+    naive = datetime(2024, 5, 1, 12, 30, 15, 123000)
+    created_at, _ = decode_cursor(encode_cursor(naive, PydanticObjectId()))
+    assert created_at == naive.replace(tzinfo=timezone.utc)
+
+def test_decode_cursor_rejects_garbage():
+    with pytest.raises(ValueError):
+        decode_cursor("garbage")
@@ -0,0 +1,79 @@
+import pytest
+
+from core.rate_limit import RateLimited, RouteRateLimits, TokenBucketLimiter, parse_rate
+
+def test_parse_rate():
+    assert parse_rate("10/minute") == (10, 60.0)
+    assert parse_rate("5/30s") == (5, 30.0)
+    assert parse_rate("") is None
+    assert parse_rate("0/minute") is None
+    with pytest.raises(ValueError):
+        parse_rate("5/fortnight")
+
+def test_token_bucket_bursts_then_refills(fake_clock):
+    limiter = TokenBucketLimiter(3, 60.0, max_keys=10, clock=fake_clock)
+    assert [limiter.acquire("ip") for _ in range(3)] == [0.0, 0.0, 0.0]
+    wait = limiter.acquire("ip")
+    assert wait == pytest.approx(20.0)
+    # Other keys have their own bucket
+    assert limiter.acquire("other") == 0.0
+
+    fake_clock.now += 20.0
+    assert limiter.acquire("ip") == 0.0
+    assert limiter.acquire("ip") > 0
+
+def test_token_bucket_store_is_bounded(fake_clock):
+    limiter = TokenBucketLimiter(1, 60.0, max_keys=2, clock=fake_clock)
+    for key in ("a", "b", "c"):
+        limiter.acquire(key)
+    stats = limiter.stats()
+    assert stats["keys"] == 2
+    assert stats["evictions"] == 1
+
+def test_route_limits_check_ip_and_account(fake_clock):
+    limits = RouteRateLimits({"login": {"ip": "5/minute", "account": "2/minute"}}, max_keys=100, clock=fake_clock)
+    limits.check("login", "1.1.1.1", "Someone@Example.com")
+    limits.check("login", "2.2.2.2", "someone@example.com")
+    # Same account from a third address: the account bucket is empty
+    with pytest.raises(RateLimited):
+        limits.check("login", "3.3.3.3", "someone@example.com")
+    # Routes without rules are never limited
+    limits.check("signup", "1.1.1.1", "someone@example.com")
+
+@pytest.mark.anyio
+async def test_login_returns_429_before_touching_the_database(async_client, monkeypatch):
+    from api.v1.endpoints import auth
+    from models.user import User
+
+    limits = RouteRateLimits({"login": {"ip": "2/minute", "account": ""}}, max_keys=100)
+    monkeypatch.setattr(auth, "auth_rate_limits", limits)
+
+    async def fail_lookup(*args, **kwargs):
+        raise AssertionError("rate limited requests must not query users")
+
+    for _ in range(2):
+        response = await async_client.post("/api/v1/auth/login", data={"username": "nobody@example.com", "password": "x"})
+        assert response.status_code == 401
+    monkeypatch.setattr(User, "find_one", fail_lookup)
+    response = await async_client.post("/api/v1/auth/login", data={"username": "nobody@example.com", "password": "x"})
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+
+def test_client_ip_ignores_client_supplied_forwarded_entries(monkeypatch):
+    from starlette.requests import Request
+
+    from api.v1.endpoints.auth import _client_ip
+    from core.config import settings
+
+    def request(forwarded=None):
+        headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+        return Request({"type": "http", "headers": headers, "client": ("10.0.0.2", 1234)})
+
+    assert _client_ip(request("6.6.6.6")) == "10.0.0.2"
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUST_FORWARDED_FOR", True)
+    # The client's own (spoofed) entry is left of the one our proxy added
+    assert _client_ip(request("6.6.6.6, 7.7.7.7")) == "7.7.7.7"
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUSTED_PROXY_HOPS", 2)
+    assert _client_ip(request("6.6.6.6, 7.7.7.7, 10.0.0.1")) == "7.7.7.7"
+    # Fewer entries than proxies: the header didn't come through them
+    assert _client_ip(request("7.7.7.7")) == "10.0.0.2"
@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from beanie import PydanticObjectId
+
+from core.reminders import ReminderScheduler
+from models.task import Task
+
+NOW = datetime(2030, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+async def add_task(owner_id, title, due_in_minutes, **extra):
+    task = Task(title=title, owner_id=owner_id, due_at=NOW + timedelta(minutes=due_in_minutes), **extra)
+    await task.insert()
+    return task
+
+@pytest.mark.anyio
+async def test_scheduler_loads_only_the_next_window(validation_db, fake_clock):
+    owner_id = PydanticObjectId()
+    await Task.find(Task.due_at != None).delete()
+    for minute in (1, 2, 3, 4, 5):
+        await add_task(owner_id, f"Soon {minute}", minute)
+    await add_task(owner_id, "Later", 60)
+    await add_task(owner_id, "Done", 1, is_completed=True)
+    await add_task(owner_id, "Long overdue", -24 * 60)
+
+    fake_clock.now = NOW
+    fired = []
+
+    def record(owner_id, task):
+        fired.append((owner_id, task["title"]))
+
+    scheduler = ReminderScheduler(window_seconds=600, batch_size=2, max_pending=100, lookback_seconds=3600, handlers=[record], clock=fake_clock)
+    # Batches of 2 until the window (10 minutes) is covered
+    assert await scheduler.load_window(fake_clock.now) == 5
+    assert scheduler.stats()["loads"] == 3
+    assert scheduler.stats()["pending_in_memory"] == 5
+
+    fake_clock.now = NOW + timedelta(minutes=2)
+    assert await scheduler.fire_due(fake_clock.now) == 2
+    assert [title for _, title in fired] == ["Soon 1", "Soon 2"]
+    assert {owner for owner, _ in fired} == {owner_id}
+
+    # The next window picks up what was beyond the first one, only once
+    fake_clock.now = NOW + timedelta(minutes=55)
+    assert await scheduler.load_window(fake_clock.now) == 1
+    fake_clock.now = NOW + timedelta(minutes=61)
+    assert await scheduler.fire_due(fake_clock.now) == 4
+    assert [title for _, title in fired][-1] == "Later"
+    assert await Task.find(Task.reminded_at != None).count() == 6
+
+@pytest.mark.anyio
+async def test_reminders_fire_once_and_follow_due_date_changes(validation_db, fake_clock):
+    owner_id = PydanticObjectId()
+    await Task.find(Task.due_at != None).delete()
+    moved = await add_task(owner_id, "Moved", 1)
+    completed = await add_task(owner_id, "Completed", 1)
+
+    fake_clock.now = NOW
+    fired = []
+
+    def record(owner_id, task):
+        fired.append((owner_id, task["title"]))
+
+    scheduler = ReminderScheduler(window_seconds=600, batch_size=2, max_pending=100, lookback_seconds=3600, handlers=[record], clock=fake_clock)
+    other_worker = ReminderScheduler(window_seconds=600, batch_size=2, max_pending=100, lookback_seconds=3600, handlers=[record], clock=fake_clock)
+    await scheduler.load_window(fake_clock.now)
+    await other_worker.load_window(fake_clock.now)
+
+    # Rescheduled within the window and completed before it was due
+    new_due = NOW + timedelta(minutes=3)
+    await Task.get_motor_collection().update_one({"_id": moved.id}, {"$set": {"due_at": new_due}})
+    await Task.get_motor_collection().update_one({"_id": completed.id}, {"$set": {"is_completed": True}})
+    scheduler.notify([{"id": str(moved.id), "due_at": new_due, "is_completed": False}])
+
+    fake_clock.now = NOW + timedelta(minutes=2)
+    assert await scheduler.fire_due(fake_clock.now) == 0
+    assert scheduler.stats()["skipped"] == 2
+
+    fake_clock.now = NOW + timedelta(minutes=3)
+    assert await scheduler.fire_due(fake_clock.now) == 1
+    assert await other_worker.fire_due(fake_clock.now) == 0
+    assert fired == [(owner_id, "Moved")]
+
+@pytest.mark.anyio
+async def test_notify_respects_max_pending(validation_db, fake_clock):
+    owner_id = PydanticObjectId()
+    await Task.find(Task.due_at != None).delete()
+    fake_clock.now = NOW
+    fired = []
+
+    def record(owner_id, task):
+        fired.append((owner_id, task["title"]))
+
+    scheduler = ReminderScheduler(window_seconds=600, batch_size=2, max_pending=2, lookback_seconds=3600, handlers=[record], clock=fake_clock)
+    await scheduler.load_window(fake_clock.now)
+
+    burst = [await add_task(owner_id, f"Burst {minute}", minute) for minute in (1, 2, 3, 4)]
+    scheduler.notify([{"id": str(task.id), "due_at": task.due_at, "is_completed": False} for task in burst])
+    stats = scheduler.stats()
+    assert stats["pending_in_memory"] == 2
+    # Once the horizon is pulled back, Burst 4 is simply beyond it
+    assert stats["dropped"] == 1
+    assert scheduler.horizon == NOW + timedelta(minutes=3)
+
+    fake_clock.now = NOW + timedelta(minutes=4)
+    await scheduler.fire_due(fake_clock.now)
+    await scheduler.load_window(fake_clock.now)
+    await scheduler.fire_due(fake_clock.now)
+    assert sorted(title for _, title in fired) == ["Burst 1", "Burst 2", "Burst 3", "Burst 4"]
+
+@pytest.mark.anyio
+async def test_resending_the_same_due_date_keeps_a_sent_reminder(authed_client):
+    due_at = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
+    task = (await authed_client.post("/api/v1/tasks/", json={"title": "Rearm", "due_at": due_at})).json()
+    sent = datetime.now(timezone.utc)
+    await Task.get_motor_collection().update_one({"_id": PydanticObjectId(task["id"])}, {"$set": {"reminded_at": sent}})
+
+    async def reminded_at():
+        return (await Task.get(task["id"])).reminded_at
+
+    await authed_client.put(f"/api/v1/tasks/{task['id']}", json={"due_at": due_at, "title": "Rearm again"})
+    assert await reminded_at() is not None
+    await authed_client.patch(f"/api/v1/tasks/{task['id']}", json={"due_at": due_at, "add_tags": ["x"]})
+    assert await reminded_at() is not None
+
+    moved = (datetime.now(timezone.utc) + timedelta(days=2)).isoformat()
+    await authed_client.patch("/api/v1/tasks/bulk", json={"items": [{"id": task["id"], "due_at": moved}]})
+    assert await reminded_at() is None
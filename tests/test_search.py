@@ -0,0 +1,55 @@
+from core.search import SearchIndexRegistry, UserSearchIndex, within_edits
+
+def _index(*tasks):
+    index = UserSearchIndex(version=1)
+    for task in tasks:
+        index.add(task)
+    return index
+
+def test_within_edits():
+    assert within_edits("milk", "milk", 1)
+    assert within_edits("milk", "mlk", 1)
+    assert within_edits("groceries", "grocereis", 2)
+    assert within_edits("dentist", "dentsit", 1)
+    assert not within_edits("milk", "silky", 1)
+
+def test_title_outranks_description():
+    index = _index(
+        {"id": "a", "title": "Other", "description": "report"},
+        {"id": "b", "title": "Report", "description": None},
+    )
+    assert [task_id for task_id, _ in index.search("report", 1)] == ["b", "a"]
+
+def test_exact_beats_prefix_beats_typo():
+    index = _index(
+        {"id": "exact", "title": "car"},
+        {"id": "prefix", "title": "cargo"},
+        {"id": "typo", "title": "cat"},
+    )
+    assert [task_id for task_id, _ in index.search("car", 0)] == ["exact", "prefix"]
+    index = _index({"id": "exact", "title": "report"}, {"id": "typo", "title": "repost"})
+    assert [task_id for task_id, _ in index.search("report", 1)] == ["exact", "typo"]
+
+def test_update_and_remove():
+    index = _index({"id": "a", "title": "Buy milk", "tags": ["shopping"]})
+    index.add({"id": "a", "title": "Buy bread", "tags": []})
+    assert index.search("milk", 0) == []
+    assert index.search("bread", 0)[0][0] == "a"
+    index.remove("a")
+    assert index.search("bread", 0) == []
+    assert index.postings == {}
+
+def test_registry_versioning_and_eviction():
+    registry = SearchIndexRegistry(max_users=1)
+    registry.build("u1", 5, [{"id": "a", "title": "x"}])
+    assert registry.get("u1", 5) is not None
+    # A write elsewhere moved the version: treat as stale
+    assert registry.get("u1", 6) is None
+
+    registry.apply("u1", 6, created=[{"id": "b", "title": "y"}])
+    assert registry.get("u1", 6) is not None
+    registry.apply("u1", 8, created=[{"id": "c", "title": "z"}])
+    assert registry.get("u1", 8) is None
+
+    registry.build("u2", 1, [])
+    assert len(registry) == 1
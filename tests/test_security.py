@@ -0,0 +1,27 @@
+import asyncio
+import pytest
+
+from core import security
+from core.config import settings
+
+def test_password_needs_rehash(monkeypatch):
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+    hashed = security.get_password_hash("password123")
+    assert not security.password_needs_rehash(hashed)
+
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 5)
+    assert security.password_needs_rehash(hashed)
+    assert security.password_needs_rehash("not-a-bcrypt-hash")
+
+@pytest.mark.anyio
+async def test_hash_pool_round_trip(monkeypatch):
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+    hashed = await security.get_password_hash_async("password123")
+    assert await security.verify_password_async("password123", hashed)
+    assert not await security.verify_password_async("wrong", hashed)
+
+@pytest.mark.anyio
+async def test_hash_pool_rejects_when_full(monkeypatch):
+    monkeypatch.setattr(security, "_hash_slots", asyncio.Semaphore(0))
+    with pytest.raises(security.HashingPoolBusy):
+        await security.get_password_hash_async("password123")
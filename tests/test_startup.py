@@ -0,0 +1,49 @@
+import argparse
+import time
+
+import pytest
+
+from core import launcher
+from core.config import settings
+from core.startup import StartupTimings
+
+def test_nested_phases_report_their_own_time():
+    timings = StartupTimings()
+    with timings.phase("imports"):
+        time.sleep(0.01)
+        with timings.phase("settings"):
+            time.sleep(0.02)
+    timings.record("indexes", 0.005)
+
+    phases = timings.report()["phases_ms"]
+    assert phases["settings"] >= 20
+    # The outer phase doesn't count the inner one again
+    assert 10 <= phases["imports"] < phases["settings"]
+    assert phases["indexes"] == 5
+    assert timings.report()["total_ms"] == pytest.approx(sum(phases.values()), abs=0.01)
+
+def test_phases_must_end_in_order():
+    timings = StartupTimings()
+    timings.begin("outer")
+    timings.begin("inner")
+    with pytest.raises(RuntimeError):
+        timings.end("outer")
+
+def test_worker_count(monkeypatch):
+    monkeypatch.setattr(launcher, "available_cores", lambda: 6)
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 0)
+    assert launcher.worker_count() == 6
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 3)
+    assert launcher.worker_count() == 3
+    assert launcher.worker_count(2) == 2
+
+def test_gunicorn_preloads_the_app():
+    args = argparse.Namespace(
+        host="127.0.0.1", port=9000, workers=2, timeout=30, keepalive=5,
+        log_level="info", forwarded_allow_ips="127.0.0.1",
+    )
+    options = launcher.gunicorn_options(args)
+    assert options["preload_app"] is True
+    assert options["workers"] == 2
+    assert options["bind"] == "127.0.0.1:9000"
+    assert options["worker_class"] == "uvicorn.workers.UvicornWorker"
@@ -0,0 +1,74 @@
+import pytest
+
+from core.health import health_probe
+from core.static_assets import PrecompressedAsset, accepted_encodings
+
+def test_accepted_encodings_and_choice():
+    assert accepted_encodings("gzip, br;q=0.5, identity;q=0") == {"gzip": 1.0, "br": 0.5, "identity": 0.0}
+    asset = PrecompressedAsset(b"hello " * 200, "text/plain", "public, no-cache")
+    assert asset.choose("gzip, deflate") == "gzip"
+    assert asset.choose("gzip;q=0") == "identity"
+    assert asset.choose(None) == "identity"
+    assert asset.choose("gzip, br") == "br"
+    assert asset.choose("br;q=0, gzip") == "gzip"
+
+@pytest.mark.anyio
+async def test_landing_page_is_precompressed_and_revalidated(async_client):
+    health_probe.reset()
+    response = await async_client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert "Operational" in response.text  # httpx decodes gzip transparently
+
+    etag = response.headers["etag"]
+    cached = await async_client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert cached.status_code == 304
+
+    plain = await async_client.get("/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["etag"] != etag
+
+@pytest.mark.anyio
+async def test_landing_page_prefers_brotli(async_client):
+    health_probe.reset()
+    response = await async_client.get("/", headers={"Accept-Encoding": "gzip, br"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "br"
+    assert response.headers["etag"].endswith('-br"')
+    assert "Operational" in response.text  # httpx decodes br too
+
+@pytest.mark.anyio
+async def test_health_probe_is_cached(async_client, monkeypatch):
+    health_probe.reset()
+    calls = []
+    original = health_probe._ping
+
+    async def counting_ping():
+        calls.append(1)
+        await original()
+
+    monkeypatch.setattr(health_probe, "_ping", counting_ping)
+    for _ in range(3):
+        response = await async_client.get("/health")
+        assert response.status_code == 200
+        assert response.json()["database"]["status"] == "up"
+    assert len(calls) == 1
+
+    async def failing_ping():
+        raise ConnectionError("down")
+
+    monkeypatch.setattr(health_probe, "_ping", failing_ping)
+    health_probe.reset()
+    response = await async_client.get("/health")
+    assert response.status_code == 503
+    assert response.json()["database"] == {"status": "down", "error": "ConnectionError"}
+    assert "Unreachable" in (await async_client.get("/")).text
+    health_probe.reset()
+
+@pytest.mark.anyio
+async def test_favicon_has_long_cache(async_client):
+    response = await async_client.get("/favicon.ico")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "public, max-age=86400"
+    assert "etag" in response.headers
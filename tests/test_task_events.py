@@ -0,0 +1,196 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import pytest
+from bson import DBRef, ObjectId
+from fastapi.testclient import TestClient
+from pymongo.errors import PyMongoError
+from starlette.websockets import WebSocketDisconnect
+
+from core.task_events import TaskChangeFeed, sse_frame, task_change_feed, ws_message
+from main import app
+from models.user import User
+
+def make_task(title="Task", **extra):
+    return {
+        "_id": ObjectId(),
+        "title": title,
+        "is_completed": False,
+        "priority": "medium",
+        "tags": [],
+        "created_at": datetime.now(timezone.utc),
+        **extra,
+    }
+
+async def drain(subscription, count):
+    return [await asyncio.wait_for(subscription.next(), 1) for _ in range(count)]
+
+@pytest.mark.anyio
+async def test_events_reach_only_the_owner():
+    feed = TaskChangeFeed(buffer_size=8, replay_size=100, heartbeat_seconds=0, max_subscribers=10)
+    mine, theirs = feed.subscribe("alice"), feed.subscribe("bob")
+    task = make_task("Write report")
+    feed.publish("alice", "created", task, version=3)
+
+    kind, event = await asyncio.wait_for(mine.next(), 1)
+    assert kind == "event"
+    assert not theirs.buffer
+
+    frame = sse_frame(kind, event)
+    event_id = f"{feed.feed_id}-1"
+    assert frame.startswith(f"id: {event_id}\nevent: created\ndata: ")
+    data = json.loads(frame.split("data: ", 1)[1])
+    message = json.loads(ws_message(kind, event))
+    assert message.pop("id") == event_id
+    assert message == data
+    assert data["task"]["id"] == str(task["_id"])
+    assert data["version"] == 3
+
+    feed.unsubscribe(mine)
+    feed.unsubscribe(theirs)
+    assert feed.stats()["subscribers"] == 0
+
+@pytest.mark.anyio
+async def test_slow_subscriber_gets_a_reset_instead_of_unbounded_buffering():
+    feed = TaskChangeFeed(buffer_size=2, replay_size=100, heartbeat_seconds=0, max_subscribers=10)
+    subscription = feed.subscribe("alice")
+    for index in range(3):
+        feed.publish("alice", "created", make_task(f"Task {index}"))
+
+    assert len(subscription.buffer) == 0
+    assert await drain(subscription, 1) == [("reset", None)]
+    feed.publish("alice", "created", make_task("After"))
+    kind, _ = await asyncio.wait_for(subscription.next(), 1)
+    assert kind == "event"
+
+@pytest.mark.anyio
+async def test_resume_from_last_event_id():
+    feed = TaskChangeFeed(buffer_size=8, replay_size=3, heartbeat_seconds=0, max_subscribers=10)
+    feed.publish("alice", "created", make_task("One"))
+    feed.publish("bob", "created", make_task("Other user"))
+    feed.publish("alice", "updated", make_task("Two"))
+
+    resumed = feed.subscribe("alice", last_event_id=f"{feed.feed_id}-1")
+    events = await drain(resumed, 1)
+    assert "event: updated" in sse_frame(*events[0])
+    assert not resumed.buffer
+
+    # Ids from another process, or older than the replay ring, force a resync
+    assert await drain(feed.subscribe("alice", last_event_id="feedbeef-2"), 1) == [("reset", None)]
+    feed.publish("alice", "created", make_task("Three"))
+    feed.publish("alice", "created", make_task("Four"))
+    assert await drain(feed.subscribe("alice", last_event_id=f"{feed.feed_id}-1"), 1) == [("reset", None)]
+    assert feed.stats()["resets"] == 2
+
+@pytest.mark.anyio
+async def test_shared_heartbeat_and_close():
+    feed = TaskChangeFeed(buffer_size=8, replay_size=100, heartbeat_seconds=0.01, max_subscribers=10)
+    subscription = feed.subscribe("alice")
+    assert await drain(subscription, 1) == [("heartbeat", None)]
+    assert sse_frame("heartbeat", None) == ": heartbeat\n\n"
+
+    subscription.close()
+    assert await drain(subscription, 1) == [("closed", None)]
+    feed.unsubscribe(subscription)
+    await feed.stop()
+
+def test_change_stream_events_are_routed_by_owner():
+    feed = TaskChangeFeed(buffer_size=8, replay_size=100, heartbeat_seconds=0, max_subscribers=10)
+    owner = ObjectId()
+    feed._handle_change({"operationType": "insert", "fullDocument": make_task(owner_id=owner)})
+    feed._handle_change({"operationType": "update", "fullDocument": make_task(owner=DBRef("users", owner))})
+    feed._handle_change({"operationType": "delete", "fullDocumentBeforeChange": make_task(owner_id=owner)})
+    # No pre-image: nobody to deliver it to
+    feed._handle_change({"operationType": "delete", "documentKey": {"_id": ObjectId()}})
+    feed._handle_change({"operationType": "drop"})
+    feed._handle_change({
+        "operationType": "update",
+        "updateDescription": {"updatedFields": {"reminded_at": datetime.now(timezone.utc)}},
+        "fullDocument": make_task(owner_id=owner),
+    })
+
+    types = [json.loads(event["ws"])["type"] for event in feed._replay]
+    assert types == ["created", "updated", "deleted", "reminder"]
+    assert {event["owner"] for event in feed._replay} == {str(owner)}
+    assert feed.stats()["unroutable"] == 1
+
+@pytest.mark.anyio
+async def test_bad_change_stream_event_is_skipped_and_a_dead_stream_hands_back():
+    feed = TaskChangeFeed(buffer_size=8, replay_size=100, heartbeat_seconds=0, max_subscribers=10)
+    owner = ObjectId()
+    subscription = feed.subscribe(str(owner))
+
+    class FakeStream:
+        resume_token = {"_data": "token"}
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def __aiter__(self):
+            # A legacy document TaskOut rejects, a good one, then a bug
+            yield {"operationType": "insert", "fullDocument": {**make_task(owner_id=owner), "title": None}}
+            yield {"operationType": "insert", "fullDocument": make_task("Good", owner_id=owner)}
+            raise RuntimeError("unexpected")
+
+    class FakeCollection:
+        name = "tasks"
+
+        class database:
+            async def command(*args, **kwargs):
+                raise PyMongoError("no collMod here")
+
+        def watch(self, *args, **kwargs):
+            return FakeStream()
+
+    with pytest.raises(RuntimeError):
+        await feed._watch(FakeCollection())
+    assert feed.stats()["failed"] == 1
+    assert feed.stats()["published"] == 1
+    # The write hook publishes again, and clients resync for what was lost
+    assert feed.streaming is False
+    assert await drain(subscription, 1) == [("reset", None)]
+
+def test_write_hook_is_silent_while_the_change_stream_is_the_source():
+    feed = TaskChangeFeed(buffer_size=8, replay_size=100, heartbeat_seconds=0, max_subscribers=10)
+    feed.streaming = True
+    feed.publish_changes("alice", created=[make_task()])
+    assert feed.stats()["published"] == 0
+
+@pytest.mark.anyio
+async def test_task_writes_publish_events(authed_client):
+    user = await User.find_one(User.email == "test_user@example.com")
+    subscription = task_change_feed.subscribe(user.id)
+    try:
+        created = (await authed_client.post("/api/v1/tasks/", json={"title": "Streamed task"})).json()
+        await authed_client.patch(f"/api/v1/tasks/{created['id']}", json={"is_completed": True})
+        await authed_client.delete(f"/api/v1/tasks/{created['id']}")
+
+        messages = [json.loads(ws_message(*item)) for item in await drain(subscription, 3)]
+        assert [message["type"] for message in messages] == ["created", "updated", "deleted"]
+        assert {message["task"]["id"] for message in messages} == {created["id"]}
+        assert messages[1]["task"]["is_completed"] is True
+        assert messages[1]["version"] > messages[0]["version"]
+    finally:
+        task_change_feed.unsubscribe(subscription)
+
+@pytest.mark.anyio
+async def test_stream_refuses_when_full(authed_client):
+    max_subscribers = task_change_feed.max_subscribers
+    task_change_feed.max_subscribers = 0
+    try:
+        response = await authed_client.get("/api/v1/tasks/stream")
+    finally:
+        task_change_feed.max_subscribers = max_subscribers
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+
+def test_websocket_requires_a_token():
+    # No lifespan needed: the token is rejected before any database access
+    with pytest.raises(WebSocketDisconnect) as exc:
+        with TestClient(app).websocket_connect("/api/v1/tasks/stream?token=not-a-token"):
+            pass
+    assert exc.value.code == 1008
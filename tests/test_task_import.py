@@ -0,0 +1,31 @@
+import pytest
+
+from core.task_import import RowTooLarge, iter_import_rows
+
+async def _stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+async def _collect(stream, import_format, max_row_bytes=1024):
+    return [row async for row in iter_import_rows(stream, import_format, max_row_bytes)]
+
+@pytest.mark.anyio
+async def test_ndjson_rows_split_across_chunks():
+    rows = await _collect(_stream(b'{"title": "a"}\n{"ti', b'tle": "b"}\n\n', b'{"title": "c"}'), "ndjson")
+    assert [row for _, row in rows] == [{"title": "a"}, {"title": "b"}, {"title": "c"}]
+    assert [n for n, _ in rows] == [1, 2, 3]
+
+@pytest.mark.anyio
+async def test_csv_quoted_newline_and_tags():
+    rows = await _collect(_stream(b'id,title,description,tags\nx,"a","line1\n', b'line2",work;home\n'), "csv")
+    assert rows == [(1, {"title": "a", "description": "line1\nline2", "tags": ["work", "home"]})]
+
+@pytest.mark.anyio
+async def test_bad_rows_are_reported_not_raised():
+    rows = await _collect(_stream(b'[1, 2]\n{bad\n'), "ndjson")
+    assert all(isinstance(row, ValueError) for _, row in rows)
+
+@pytest.mark.anyio
+async def test_oversized_row_raises():
+    with pytest.raises(RowTooLarge):
+        await _collect(_stream(b"x" * 100), "ndjson", max_row_bytes=10)
@@ -0,0 +1,18 @@
+from core.task_stats import changes_delta
+
+def test_create_and_delete_cancel_out():
+    task = {"is_completed": False, "priority": "high"}
+    assert changes_delta(created=[task], deleted=[task]) == {}
+
+def test_update_only_counts_transitions():
+    before = {"is_completed": False, "priority": "high", "title": "a"}
+    after = {"is_completed": True, "priority": "low", "title": "b"}
+    assert changes_delta(updated=[(before, after)]) == {
+        "completed": 1,
+        "by_priority.high": -1,
+        "by_priority.low": 1,
+    }
+    assert changes_delta(updated=[(before, {**before, "title": "c"})]) == {}
+
+def test_unsafe_priority_names_are_bucketed():
+    assert changes_delta(created=[{"priority": "$bad.key"}]) == {"total": 1, "by_priority.other": 1}
@@ -1,3 +1,7 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
 import pytest
 
 # 1. Test Create Task
@@ -41,6 +45,30 @@ async def test_update_task(authed_client):
     assert data["title"] == "Updated Granular Task"
     assert data["is_completed"] is True
 
+@pytest.mark.anyio
+async def test_update_rejects_null_for_required_fields(authed_client):
+    task_id = (await authed_client.post("/api/v1/tasks/", json={"title": "Never null", "due_at": "2030-01-01T00:00:00Z"})).json()["id"]
+    for method, body in [
+        ("PUT", {"title": None}),
+        ("PUT", {"title": ""}),
+        ("PATCH", {"priority": None}),
+        ("PATCH", {"is_completed": None, "description": "x"}),
+        ("PUT", {"tags": None}),
+    ]:
+        response = await authed_client.request(method, f"/api/v1/tasks/{task_id}", json=body)
+        assert response.status_code == 422, body
+    bulk = await authed_client.patch("/api/v1/tasks/bulk", json={"items": [{"id": task_id, "title": None}]})
+    assert bulk.status_code == 422
+
+    # Nullable fields can still be cleared, and the task stays readable
+    cleared = await authed_client.put(f"/api/v1/tasks/{task_id}", json={"description": None, "due_at": None})
+    assert cleared.status_code == 200
+    assert cleared.json()["due_at"] is None
+    fetched = await authed_client.get(f"/api/v1/tasks/{task_id}")
+    assert fetched.status_code == 200
+    assert fetched.json()["title"] == "Never null"
+    assert (await authed_client.get("/api/v1/tasks/", params={"limit": 1000})).status_code == 200
+
 # 4. Test Delete Task
 @pytest.mark.anyio
 async def test_delete_task(authed_client):
@@ -55,3 +83,373 @@ async def test_delete_task(authed_client):
     # Verify 404
     get_res = await authed_client.get(f"/api/v1/tasks/{task_id}")
     assert get_res.status_code == 404
+
+# 5. Test Cursor Pagination
+@pytest.mark.anyio
+async def test_cursor_pagination(authed_client):
+    for i in range(5):
+        await authed_client.post("/api/v1/tasks/", json={"title": f"Paged Task {i}", "tags": ["paging"]})
+
+    seen = []
+    cursor = ""
+    while cursor is not None:
+        response = await authed_client.get("/api/v1/tasks/", params={"cursor": cursor, "limit": 2})
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) <= 2
+        seen.extend(t["id"] for t in page["items"])
+        cursor = page["next_cursor"]
+
+    # Every task shows up exactly once across pages
+    assert len(seen) == len(set(seen))
+    assert len(seen) >= 5
+
+@pytest.mark.anyio
+async def test_invalid_cursor(authed_client):
+    response = await authed_client.get("/api/v1/tasks/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+@pytest.mark.anyio
+async def test_out_of_range_paging_is_rejected(authed_client):
+    for params in ({"cursor": "", "limit": 0}, {"limit": 0}, {"limit": -1}, {"limit": 1001}, {"skip": -1}):
+        response = await authed_client.get("/api/v1/tasks/", params=params)
+        assert response.status_code == 422, params
+
+# 6. Test Bulk Create / Update / Delete
+@pytest.mark.anyio
+async def test_bulk_task_lifecycle(authed_client):
+    create_res = await authed_client.post(
+        "/api/v1/tasks/bulk",
+        json={"tasks": [
+            {"title": "Bulk buy milk"},
+            {"title": "Bulk deploy API", "description": "urgent"},
+            {"title": "Bulk plain task"},
+        ]}
+    )
+    assert create_res.status_code == 200
+    created = create_res.json()
+    assert created["succeeded"] == 3
+    assert [r["status"] for r in created["results"]] == ["created"] * 3
+    # Smart tagging still applies to bulk inserts
+    assert "shopping" in created["results"][0]["task"]["tags"]
+    assert created["results"][1]["task"]["priority"] == "high"
+    ids = [r["id"] for r in created["results"]]
+
+    update_res = await authed_client.patch(
+        "/api/v1/tasks/bulk",
+        json={"items": [
+            {"id": ids[0], "is_completed": True},
+            {"id": ids[1], "priority": "low"},
+            {"id": "000000000000000000000000", "is_completed": True},
+            {"id": "not-an-id", "is_completed": True},
+        ]}
+    )
+    assert update_res.status_code == 200
+    statuses = [r["status"] for r in update_res.json()["results"]]
+    assert statuses == ["updated", "updated", "not_found", "invalid_id"]
+
+    get_res = await authed_client.get(f"/api/v1/tasks/{ids[0]}")
+    assert get_res.json()["is_completed"] is True
+
+    delete_res = await authed_client.request("DELETE", "/api/v1/tasks/bulk", json={"ids": ids})
+    assert delete_res.status_code == 200
+    assert delete_res.json()["succeeded"] == 3
+
+    get_res = await authed_client.get(f"/api/v1/tasks/{ids[2]}")
+    assert get_res.status_code == 404
+
+# 7. Test Export
+@pytest.mark.anyio
+async def test_export_ndjson(authed_client):
+    await authed_client.post("/api/v1/tasks/", json={"title": "Export me", "priority": "high"})
+    response = await authed_client.get("/api/v1/tasks/export", params={"priority": "high", "batch_size": 2})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert any(t["title"] == "Export me" for t in lines)
+    assert all(t["priority"] == "high" for t in lines)
+
+@pytest.mark.anyio
+async def test_export_csv(authed_client):
+    response = await authed_client.get("/api/v1/tasks/export", params={"format": "csv"})
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["id", "title", "description", "is_completed", "priority", "tags", "created_at", "due_at"]
+    assert len(rows) > 1
+
+# 8. Test Import
+@pytest.mark.anyio
+async def test_import_ndjson_reports_bad_rows(authed_client):
+    body = "\n".join([
+        json.dumps({"title": "Imported buy eggs"}),
+        "{not json",
+        json.dumps({"title": ""}),
+        json.dumps({"title": "Imported done", "is_completed": True}),
+    ])
+    response = await authed_client.post(
+        "/api/v1/tasks/import",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    summary = response.json()
+    assert summary["received"] == 4
+    assert summary["inserted"] == 2
+    assert summary["failed"] == 2
+    assert [e["row"] for e in summary["errors"]] == [2, 3]
+
+@pytest.mark.anyio
+async def test_import_csv(authed_client):
+    body = 'title,description,priority,tags\nImported csv task,"multi\nline",low,a;b\n'
+    response = await authed_client.post(
+        "/api/v1/tasks/import",
+        content=body,
+        headers={"Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200
+    assert response.json()["inserted"] == 1
+
+    export = await authed_client.get("/api/v1/tasks/export", params={"priority": "low"})
+    imported = [json.loads(line) for line in export.text.splitlines() if "Imported csv task" in line]
+    assert imported[0]["description"] == "multi\nline"
+    assert set(imported[0]["tags"]) >= {"a", "b"}
+
+@pytest.mark.anyio
+async def test_import_stops_cleanly_at_an_oversized_row(authed_client, monkeypatch):
+    from core.config import settings
+    monkeypatch.setattr(settings, "IMPORT_CHUNK_SIZE", 2)
+    monkeypatch.setattr(settings, "IMPORT_MAX_ROW_BYTES", 200)
+    rows = [json.dumps({"title": f"Imported chunked {index}"}) for index in range(3)]
+    body = "\n".join([*rows, json.dumps({"title": "x" * 500}), json.dumps({"title": "Never read"})])
+    response = await authed_client.post(
+        "/api/v1/tasks/import",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    summary = response.json()
+    # The first chunk was written before the large row; the partial second one is flushed
+    assert (summary["received"], summary["inserted"], summary["failed"]) == (4, 3, 1)
+    assert summary["stopped_at_row"] == 4
+    assert summary["errors"][0]["row"] == 4
+    export = await authed_client.get("/api/v1/tasks/export")
+    assert export.text.count("Imported chunked") == 3
+    assert "Never read" not in export.text
+
+# 9. Test Conditional Requests (ETag)
+@pytest.mark.anyio
+async def test_list_etag_not_modified_until_write(authed_client):
+    first = await authed_client.get("/api/v1/tasks/", params={"limit": 5})
+    etag = first.headers["etag"]
+
+    cached = await authed_client.get("/api/v1/tasks/", params={"limit": 5}, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+    # Different query, different ETag
+    other = await authed_client.get("/api/v1/tasks/", params={"limit": 6}, headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+    await authed_client.post("/api/v1/tasks/", json={"title": "Bumps the version"})
+    after_write = await authed_client.get("/api/v1/tasks/", params={"limit": 5}, headers={"If-None-Match": etag})
+    assert after_write.status_code == 200
+    assert after_write.headers["etag"] != etag
+
+@pytest.mark.anyio
+async def test_if_match_optimistic_concurrency(authed_client):
+    res = await authed_client.post("/api/v1/tasks/", json={"title": "Concurrent edit"})
+    task_id = res.json()["id"]
+    etag = (await authed_client.get(f"/api/v1/tasks/{task_id}")).headers["etag"]
+
+    ok = await authed_client.put(f"/api/v1/tasks/{task_id}", json={"priority": "high"}, headers={"If-Match": etag})
+    assert ok.status_code == 200
+
+    # The ETag we held is stale now
+    stale = await authed_client.put(f"/api/v1/tasks/{task_id}", json={"priority": "low"}, headers={"If-Match": etag})
+    assert stale.status_code == 412
+
+    # Writes to other tasks leave this task's ETag valid
+    await authed_client.post("/api/v1/tasks/", json={"title": "Unrelated edit"})
+    fresh = ok.headers["etag"]
+    assert (await authed_client.get(f"/api/v1/tasks/{task_id}")).headers["etag"] == fresh
+    deleted = await authed_client.delete(f"/api/v1/tasks/{task_id}", headers={"If-Match": fresh})
+    assert deleted.status_code == 200
+
+    # A deleted task is gone, whatever ETag the client still holds
+    gone = await authed_client.get(f"/api/v1/tasks/{task_id}", headers={"If-None-Match": fresh})
+    assert gone.status_code == 404
+
+# 10. Test Stats Counters
+@pytest.mark.anyio
+async def test_stats_follow_writes(authed_client):
+    before = (await authed_client.get("/api/v1/tasks/stats")).json()
+
+    res = await authed_client.post("/api/v1/tasks/", json={"title": "Stats task", "priority": "high"})
+    task_id = res.json()["id"]
+    stats = (await authed_client.get("/api/v1/tasks/stats")).json()
+    assert stats["total"] == before["total"] + 1
+    assert stats["by_priority"].get("high", 0) == before["by_priority"].get("high", 0) + 1
+
+    await authed_client.put(f"/api/v1/tasks/{task_id}", json={"is_completed": True, "priority": "low"})
+    stats = (await authed_client.get("/api/v1/tasks/stats")).json()
+    assert stats["completed"] == before["completed"] + 1
+    assert stats["open"] == stats["total"] - stats["completed"]
+    assert stats["by_priority"].get("high", 0) == before["by_priority"].get("high", 0)
+
+    await authed_client.delete(f"/api/v1/tasks/{task_id}")
+    assert (await authed_client.get("/api/v1/tasks/stats")).json() == before
+
+@pytest.mark.anyio
+async def test_stats_reconcile_repairs_drift(authed_client):
+    from core import task_stats
+    from models.task_stats import TaskStats
+    from models.user import User
+
+    user = await User.find_one(User.email == "test_user@example.com")
+    expected = (await authed_client.get("/api/v1/tasks/stats")).json()
+    await TaskStats.get_motor_collection().update_one({"_id": user.id}, {"$inc": {"total": 7}})
+
+    result = await task_stats.reconcile(user.id)
+    assert result["repaired"] == 1
+    assert (await authed_client.get("/api/v1/tasks/stats")).json() == expected
+
+@pytest.mark.anyio
+async def test_stats_count_tasks_from_before_the_counters(authed_client):
+    from models.task import Task
+    from models.task_stats import TaskStats
+    from models.user import User
+
+    user = await User.find_one(User.email == "test_user@example.com")
+    # Tasks written before counters existed, then the first counted write
+    await TaskStats.get_motor_collection().delete_one({"_id": user.id})
+    await Task.get_motor_collection().insert_many([
+        {"title": f"Legacy {index}", "is_completed": index == 0, "priority": "low", "tags": [],
+         "created_at": datetime.now(timezone.utc), "owner_id": user.id}
+        for index in range(3)
+    ])
+    await authed_client.post("/api/v1/tasks/", json={"title": "First counted write"})
+
+    stats = (await authed_client.get("/api/v1/tasks/stats")).json()
+    assert stats["total"] == await Task.find(Task.owner_id == user.id).count()
+    assert stats["completed"] == await Task.find(Task.owner_id == user.id, Task.is_completed == True).count()  # noqa: E712
+
+@pytest.mark.anyio
+async def test_stats_reconcile_keeps_concurrent_writes(authed_client, monkeypatch):
+    from core import task_stats
+    from models.task import Task
+    from models.task_stats import TaskStats
+    from models.user import User
+
+    compute = task_stats._compute
+    writes = []
+
+    async def compute_with_a_write_landing(owner_id=None):
+        computed = await compute(owner_id)
+        if not writes:
+            writes.append("Mid-reconcile")
+            # A task write and its delta land after the stored counters were read
+            await authed_client.post("/api/v1/tasks/", json={"title": "Mid-reconcile"})
+        return computed
+
+    user = await User.find_one(User.email == "test_user@example.com")
+    await TaskStats.get_motor_collection().update_one({"_id": user.id}, {"$inc": {"total": 7}})
+    monkeypatch.setattr(task_stats, "_compute", compute_with_a_write_landing)
+
+    await task_stats.reconcile(user.id)
+    stats = (await authed_client.get("/api/v1/tasks/stats")).json()
+    assert writes
+    assert stats["total"] == await Task.find(Task.owner_id == user.id).count()
+
+# 11. Test Search
+@pytest.mark.anyio
+@pytest.mark.requires_mongodb  # $text index
+async def test_search_text(authed_client):
+    await authed_client.post("/api/v1/tasks/", json={"title": "Renew passport", "description": "photos needed"})
+    response = await authed_client.get("/api/v1/tasks/search", params={"q": "passport"})
+    assert response.status_code == 200
+    hits = response.json()
+    assert hits[0]["title"] == "Renew passport"
+    assert hits[0]["score"] > 0
+
+@pytest.mark.anyio
+async def test_search_fuzzy_prefix_and_typos(authed_client):
+    await authed_client.post("/api/v1/tasks/", json={"title": "Schedule dentist appointment"})
+
+    for q in ["dentist", "dent", "dentsit", "appointmnet"]:
+        response = await authed_client.get("/api/v1/tasks/search", params={"q": q, "mode": "fuzzy"})
+        assert response.status_code == 200
+        assert any(hit["title"] == "Schedule dentist appointment" for hit in response.json()), q
+
+    # Writes keep the warm index current
+    res = await authed_client.post("/api/v1/tasks/", json={"title": "Water the orchids"})
+    hits = (await authed_client.get("/api/v1/tasks/search", params={"q": "orchid", "mode": "fuzzy"})).json()
+    assert [hit["id"] for hit in hits] == [res.json()["id"]]
+
+    await authed_client.delete(f"/api/v1/tasks/{res.json()['id']}")
+    hits = (await authed_client.get("/api/v1/tasks/search", params={"q": "orchid", "mode": "fuzzy"})).json()
+    assert hits == []
+
+# 12. Test Atomic Patch / Revisions
+@pytest.mark.anyio
+async def test_patch_tags_and_revision(authed_client):
+    res = await authed_client.post("/api/v1/tasks/", json={"title": "Revision target", "tags": ["a", "b"]})
+    task_id = res.json()["id"]
+    assert res.json()["revision"] == 0
+
+    added = await authed_client.patch(f"/api/v1/tasks/{task_id}", json={"add_tags": ["c", "a"]})
+    assert added.status_code == 200
+    assert set(added.json()["tags"]) >= {"a", "b", "c"}
+    assert added.json()["revision"] == 1
+
+    both = await authed_client.patch(
+        f"/api/v1/tasks/{task_id}",
+        json={"add_tags": ["d"], "remove_tags": ["a", "c"], "title": "$literal title"},
+        params={"revision": 1},
+    )
+    assert both.status_code == 200
+    body = both.json()
+    assert "a" not in body["tags"] and "c" not in body["tags"] and "d" in body["tags"]
+    assert body["title"] == "$literal title"
+    assert body["revision"] == 2
+    # The response mirrors what was stored
+    stored = (await authed_client.get(f"/api/v1/tasks/{task_id}")).json()
+    assert stored["tags"] == body["tags"] and stored["revision"] == 2
+
+    stale = await authed_client.put(f"/api/v1/tasks/{task_id}", json={"is_completed": True}, params={"revision": 1})
+    assert stale.status_code == 409
+    assert (await authed_client.delete(f"/api/v1/tasks/{task_id}", params={"revision": 0})).status_code == 409
+    assert (await authed_client.delete(f"/api/v1/tasks/{task_id}", params={"revision": 2})).status_code == 200
+    assert (await authed_client.patch(f"/api/v1/tasks/{task_id}", json={"title": "gone"})).status_code == 404
+
+@pytest.mark.anyio
+async def test_patch_rejects_tags_with_tag_edits(authed_client):
+    res = await authed_client.post("/api/v1/tasks/", json={"title": "Mixed tag edit"})
+    response = await authed_client.patch(
+        f"/api/v1/tasks/{res.json()['id']}", json={"tags": ["x"], "add_tags": ["y"]}
+    )
+    assert response.status_code == 422
+    assert (await authed_client.put("/api/v1/tasks/not-an-id", json={"title": "x"})).status_code == 404
+
+# 13. Test Due Dates
+@pytest.mark.anyio
+async def test_due_date_filters(authed_client):
+    now = datetime.now(timezone.utc)
+    past = await authed_client.post("/api/v1/tasks/", json={"title": "Due filter past", "due_at": (now - timedelta(days=1)).isoformat()})
+    future = await authed_client.post("/api/v1/tasks/", json={"title": "Due filter future", "due_at": (now + timedelta(days=2)).isoformat()})
+    done = await authed_client.post("/api/v1/tasks/", json={"title": "Due filter done", "due_at": (now - timedelta(days=3)).isoformat()})
+    await authed_client.put(f"/api/v1/tasks/{done.json()['id']}", json={"is_completed": True})
+    assert past.json()["due_at"] is not None
+
+    def titles(response):
+        return {task["title"] for task in response.json() if task["title"].startswith("Due filter")}
+
+    overdue = await authed_client.get("/api/v1/tasks/", params={"overdue": "true"})
+    assert titles(overdue) == {"Due filter past"}
+    assert "ETag" not in overdue.headers
+    not_overdue = await authed_client.get("/api/v1/tasks/", params={"overdue": "false"})
+    assert titles(not_overdue) == {"Due filter future", "Due filter done"}
+    due_soon = await authed_client.get("/api/v1/tasks/", params={"due_before": (now + timedelta(days=3)).isoformat()})
+    assert titles(due_soon) == {"Due filter past", "Due filter future", "Due filter done"}
+
+    # Clearing the due date takes the task out of the due filters
+    await authed_client.patch(f"/api/v1/tasks/{past.json()['id']}", json={"due_at": None})
+    assert titles(await authed_client.get("/api/v1/tasks/", params={"overdue": "true"})) == set()
@@ -0,0 +1,43 @@
+import pytest
+
+from core.smart_rules import RuleEngine
+from core.utils import enhance_many, enhance_task_context
+
+def test_priority_inference():
+    assert enhance_task_context("Submit report ASAP", "", [])[0] == "high"
+    assert enhance_task_context("Clean garage", "whenever", [])[0] == "low"
+    assert enhance_task_context("Clean garage", "", [])[0] == "medium"
+    # High wins when both kinds of keyword appear
+    assert enhance_task_context("Urgent", "maybe later", [])[0] == "high"
+
+def test_tag_inference_keeps_existing_tags():
+    _, tags = enhance_task_context("Buy groceries", "then call mom", ["family"])
+    assert set(tags) == {"shopping", "communication", "family"}
+
+def test_keywords_match_whole_words_only():
+    # Substring matching used to tag these as health/work
+    _, tags = enhance_task_context("Sunday brunch", "rapid planning", [])
+    assert tags == []
+
+def test_common_suffixes_match():
+    _, tags = enhance_task_context("Weekly meetings", "deploying fixes, workouts", [])
+    assert set(tags) == {"communication", "work", "health"}
+
+def test_enhance_many_matches_single_calls():
+    items = [("Buy milk", None, []), ("Deploy API", "urgent", ["ops"]), ("Nothing here", "", [])]
+    batch = enhance_many(items)
+    single = [enhance_task_context(t, d or "", tags) for t, d, tags in items]
+    assert [(p, set(tags)) for p, tags in batch] == [(p, set(tags)) for p, tags in single]
+
+def test_custom_rules():
+    engine = RuleEngine([{"kind": "tag", "value": "pets", "keywords": ["dog", "vet"]}])
+    assert engine.analyze("Take the dog to the vet") == (None, {"pets"})
+
+def test_invalid_rule_rejected():
+    with pytest.raises(ValueError):
+        RuleEngine([{"kind": "colour", "value": "red", "keywords": ["x"]}])
+
+def test_phrase_rules():
+    engine = RuleEngine([{"kind": "priority", "value": "high", "keywords": ["due today"]}])
+    assert engine.analyze("Report is DUE   today!")[0] == "high"
+    assert engine.analyze("Report due tomorrow, today is fine")[0] is None